@@ -0,0 +1,45 @@
+"""
+사용자 캐시 인증 백엔드 (AUTHENTICATION_BACKENDS)
+
+세션의 사용자 id로 User를 읽을 때 캐시를 먼저 본다. User가 저장/삭제되면
+signals.py에서 캐시를 지운다. (QuerySet.update()로 바꾼 경우는 지워지지 않으므로
+COMMON_USER_CACHE_TIMEOUT이 지나야 반영된다)
+비밀번호 해시는 캐시에 두지 않는다. 세션 확인에 쓰는 get_session_auth_hash() 값만 두고
+CachedUser(models.py)로 돌려준다. password는 지연 필드라 save()해도 비밀번호는 바뀌지 않는다.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+from .models import CachedUser
+
+
+def user_cache_key(user_id):
+    return "common:user:{}".format(user_id)
+
+
+def _cached_fields():
+    fields = CachedUser._meta.concrete_fields
+    return [f.attname for f in fields if f.attname != "password"]
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        fields = _cached_fields()
+        key = user_cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                values = [getattr(user, name) for name in fields]
+                cached = (values, user.get_session_auth_hash())
+                cache.set(key, cached, settings.COMMON_USER_CACHE_TIMEOUT)
+            return user
+
+        values, session_auth_hash = cached
+        user = CachedUser.from_db(router.db_for_read(CachedUser), fields, values)
+        user.session_auth_hash = session_auth_hash
+        # is_active 등 확인은 ModelBackend와 같게 한다
+        return user if self.user_can_authenticate(user) else None
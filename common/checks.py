@@ -0,0 +1,38 @@
+"""
+common 설정 검사 (manage.py check, check --deploy)
+
+요청마다 설정을 확인하면 잘못된 설정 하나가 모든 요청의 오류가 되므로 시작할 때 한 번 본다.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+
+@register(Tags.security)
+def check_ratelimit_ip_meta(app_configs, **kwargs):
+    meta = settings.COMMON_RATELIMIT_IP_META
+    if meta == "REMOTE_ADDR" or meta.startswith("HTTP_"):
+        return []
+    return [
+        Error(
+            "COMMON_RATELIMIT_IP_META는 REMOTE_ADDR이나 HTTP_로 시작하는 헤더여야 합니다.",
+            hint="예: HTTP_X_REAL_IP",
+            id="common.E001",
+        )
+    ]
+
+
+@register(Tags.security, deploy=True)
+def check_ratelimit_behind_proxy(app_configs, **kwargs):
+    if not settings.COMMON_RATELIMIT_ENABLED:
+        return []
+    if settings.COMMON_RATELIMIT_IP_META != "REMOTE_ADDR":
+        return []
+    return [
+        Warning(
+            "COMMON_RATELIMIT_IP_META가 REMOTE_ADDR입니다. 프록시 뒤에서는 모든 요청이 "
+            "프록시 주소의 IP 버킷 하나를 함께 씁니다.",
+            hint="프록시가 넣는 헤더(예: HTTP_X_REAL_IP)로 바꾸세요.",
+            id="common.W001",
+        )
+    ]
@@ -0,0 +1,109 @@
+"""
+응답 gzip 압축 (COMMON_COMPRESS_*)
+
+CompressionMiddleware는 브라우저가 gzip을 받고, Content-Type이 COMMON_COMPRESS_TYPES에
+있고, 본문이 COMMON_COMPRESS_MIN_SIZE 이상인 응답을 압축한다.
+- 스트리밍 응답(내보내기 등)은 조각마다 압축해서 바로 보낸다.
+- 목록 페이지 캐시(pybo/caching.py)는 처음 gzip을 받는 요청이 왔을 때 압축한 본문도
+  함께 저장해두므로 캐시에서 나온 페이지는 다시 압축하지 않는다. (response.compressed_content)
+- CSRF 토큰을 넣은 응답(CSRF_COOKIE_USED)은 압축하지 않는다. BREACH(압축 후 길이로
+  비밀값을 알아내는 공격)를 막는다. 임의 길이의 패딩은 요청을 여러 번 보내 평균을 내면
+  소용이 없다. 글쓰기 화면과 상세 화면 등은 압축하지 않고 보내고, 토큰이 없는 목록
+  페이지는 압축한다.
+"""
+
+import gzip
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .middleware import AsyncCapableMiddleware
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+def accepts_gzip(request):
+    return bool(_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
+
+def compress(content):
+    # mtime=0: 같은 본문이면 같은 결과 (캐시에 넣어 다시 쓴다)
+    return gzip.compress(content, compresslevel=settings.COMMON_COMPRESS_LEVEL, mtime=0)
+
+
+def compress_sequence(chunks):
+    """
+    조각마다 압축해서 바로 돌려준다. (Z_SYNC_FLUSH로 모아두지 않는다)
+    """
+    compressor = zlib.compressobj(
+        settings.COMMON_COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """
+    MIDDLEWARE에서 본문을 읽거나 바꾸는 미들웨어보다 앞(바깥)에 둔다.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.types = tuple(settings.COMMON_COMPRESS_TYPES)
+
+    def call(self, request):
+        return self.process(request, self.get_response(request))
+
+    async def acall(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if not self.compressible(response) or request.META.get("CSRF_COOKIE_USED"):
+            return response
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if not accepts_gzip(request):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            content = self.compressed_content(request, response)
+            if content is None:
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # 본문이 달라지므로 강한 ETag는 약한 ETag로 바꾼다 (GZipMiddleware와 같다)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "gzip"
+        return response
+
+    def compressible(self, response):
+        if response.has_header("Content-Encoding") or response.status_code == 304:
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip()
+        if content_type not in self.types:
+            return False
+        if response.streaming:
+            return True
+        return len(response.content) >= settings.COMMON_COMPRESS_MIN_SIZE
+
+    def compressed_content(self, request, response):
+        """
+        압축한 본문. 압축하지 않는 편이 나으면 None
+        """
+        cached = getattr(response, "compressed_content", None)
+        if cached is not None:
+            return cached
+        compressed = compress(response.content)
+        if len(compressed) >= len(response.content):
+            return None
+        return compressed
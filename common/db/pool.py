@@ -0,0 +1,216 @@
+"""
+프로세스별 DB 연결 풀
+
+요청마다 원격 PostgreSQL에 새로 연결(TCP+TLS+인증)하지 않도록 닫힌 연결을 버리지 않고
+풀에 돌려놓았다가 다음 요청이 다시 쓴다. WSGI 스레드와 ASGI의 sync_to_async 스레드가
+같은 풀을 쓰므로 threading.Condition으로 보호한다. DB 종류와는 상관없고
+연결을 만들고(connect) 확인하고(ping) 돌려놓기 전에 정리하는(reset) 함수만 받는다.
+(PostgreSQL 백엔드는 common/db/postgresql_pool)
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    max_size: 열어둘 수 있는 최대 연결 수 (빌려간 연결 포함)
+    idle_timeout: 이보다 오래 쉬고 있던 연결은 닫는다(초)
+    timeout: 연결이 모두 빌려갔을 때 기다리는 최대 시간(초). 넘으면 PoolTimeout
+    ping_after: 이보다 오래 쉬고 있던 연결은 빌려주기 전에 ping으로 확인한다(초, 0이면 항상)
+    """
+
+    def __init__(
+        self,
+        connect,
+        ping=None,
+        reset=None,
+        max_size=10,
+        idle_timeout=300,
+        timeout=10,
+        ping_after=0,
+        name="default",
+    ):
+        self.connect = connect
+        self.ping = ping
+        self.reset = reset
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.name = name
+        self._condition = threading.Condition()
+        self._idle = deque()  # (연결, 돌려놓은 시각). 오른쪽이 가장 최근
+        self._size = 0
+        self._stats = {
+            "acquired": 0,
+            "created": 0,
+            "closed": 0,
+            "ping_failed": 0,
+            "exhausted": 0,  # 남은 연결이 없어 기다린 횟수
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def stats(self):
+        with self._condition:
+            return {
+                **self._stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection, idle_since = self._checkout(deadline)
+            if connection is None:
+                try:
+                    connection = self.connect()
+                except BaseException:
+                    self._forget()
+                    raise
+                self._count("created")
+                break
+            stale = time.monotonic() - idle_since >= self.ping_after
+            if self.ping is None or not stale or self._ping(connection):
+                break
+            self._count("ping_failed")
+            self._discard(connection)
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._stats["acquired"] += 1
+            self._stats["wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(
+                self._stats["max_wait_seconds"], waited
+            )
+        return connection
+
+    def _checkout(self, deadline):
+        """
+        쉬고 있는 연결 (연결, 쉬기 시작한 시각) 또는 새로 만들 자리 (None, None)
+        """
+        waited = False
+        with self._condition:
+            while True:
+                self._close_idle_locked()
+                if self._idle:
+                    # 가장 최근에 쓴 연결부터 (오래 쉰 연결은 idle_timeout으로 닫히게)
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                if not waited:
+                    waited = True
+                    self._stats["exhausted"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    logger.warning(
+                        "DB 연결 풀(%s)에 남은 연결이 없습니다. (max_size=%d)",
+                        self.name,
+                        self.max_size,
+                    )
+                    raise PoolTimeout(
+                        "{}초 동안 DB 연결을 얻지 못했습니다.".format(self.timeout)
+                    )
+                self._condition.wait(remaining)
+
+    def release(self, connection, discard=False):
+        """
+        연결을 돌려놓는다. discard이거나 정리(reset)에 실패하면 닫는다.
+        """
+        if not discard and self.reset is not None:
+            try:
+                discard = not self.reset(connection)
+            except Exception:
+                logger.exception("DB 연결을 정리하지 못했습니다.")
+                discard = True
+        if discard:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close_idle(self):
+        """
+        쉬고 있는 연결을 모두 닫는다. (테스트 DB를 지우기 전 등)
+        """
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
+
+    def _close_idle_locked(self):
+        limit = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < limit:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._close(connection)
+
+    def _ping(self, connection):
+        try:
+            return self.ping(connection)
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        self._close(connection)
+        self._count("closed")
+        self._forget()
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _count(self, name):
+        with self._condition:
+            self._stats[name] += 1
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def get_pool(key, factory):
+    """
+    key(DB 별칭과 연결 인자)마다 프로세스에 하나인 풀. 없으면 factory()로 만든다.
+    """
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = factory()
+        return _pools[key]
+
+
+def all_pools():
+    with _pools_lock:
+        return list(_pools.values())
+
+
+def stats():
+    """
+    이 프로세스의 모든 풀 통계 {이름: {...}}
+    """
+    return {pool.name: pool.stats() for pool in all_pools()}
@@ -0,0 +1,104 @@
+"""
+연결 풀을 쓰는 PostgreSQL 백엔드 (ENGINE: common.db.postgresql_pool)
+
+Django가 연결을 닫을 때(요청이 끝날 때 등) 실제로 닫지 않고 풀(common/db/pool.py)에
+돌려놓고, 다음 연결은 풀에서 빌린다. CONN_MAX_AGE는 0으로 두고 풀 설정은
+DATABASES의 POOL에 쓴다.
+
+    "POOL": {
+        "MAX_SIZE": 10,  # 프로세스당 최대 연결 수
+        "IDLE_TIMEOUT": 300,  # 이보다 오래 쉰 연결은 닫는다(초)
+        "TIMEOUT": 10,  # 연결을 기다리는 최대 시간(초)
+        "PING_AFTER": 30,  # 이보다 오래 쉰 연결은 SELECT 1로 확인한 뒤 빌려준다(초)
+    }
+"""
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base, creation
+
+from common.db import pool as pool_module
+
+POOL_DEFAULTS = {
+    "MAX_SIZE": 10,
+    "IDLE_TIMEOUT": 300,
+    "TIMEOUT": 10,
+    "PING_AFTER": 30,
+}
+
+
+def ping(connection):
+    if connection.closed:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if not connection.autocommit:
+        connection.rollback()
+    return True
+
+
+def reset(connection):
+    """
+    풀에 돌려놓기 전에 끝나지 않은 트랜잭션을 되돌린다. 다시 쓸 수 없으면 False
+    """
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # 풀에 남은 테스트 DB 연결이 있으면 DROP DATABASE가 실패한다
+        for pool in pool_module.all_pools():
+            pool.close_idle()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        key = (self.alias, tuple(sorted((k, str(v)) for k, v in conn_params.items())))
+        options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+
+        def factory():
+            return pool_module.ConnectionPool(
+                connect=lambda: psycopg2.connect(**conn_params),
+                ping=ping,
+                reset=reset,
+                max_size=options["MAX_SIZE"],
+                idle_timeout=options["IDLE_TIMEOUT"],
+                timeout=options["TIMEOUT"],
+                ping_after=options["PING_AFTER"],
+                name="{}:{}".format(self.alias, conn_params.get("database", "")),
+            )
+
+        return pool_module.get_pool(key, factory)
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.acquire()
+        # 아래는 base.DatabaseWrapper.get_new_connection과 같다 (빌린 연결에도 매번 적용)
+        options = self.settings_dict["OPTIONS"]
+        try:
+            self.isolation_level = options["isolation_level"]
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        self.pool.release(self.connection, discard=self.connection.closed != 0)
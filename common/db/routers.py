@@ -0,0 +1,132 @@
+"""
+읽기는 복제 DB(COMMON_DB_REPLICAS), 쓰기는 기본 DB(default)로 보내는 라우터
+
+복제는 늦게 따라오므로 다음 요청은 기본 DB에서 읽는다. (PrimaryPinningMiddleware)
+- POST 등 쓰기 요청과 COMMON_DB_PRIMARY_VIEWS의 view(글쓰기/수정/추천 화면)
+- 쓰기 요청 뒤 COMMON_DB_PIN_SECONDS 동안 같은 브라우저의 요청 (쿠키)
+  GET이라도 기본 DB에 썼으면(옛 GET 추천 주소 등) 쓰기 요청으로 본다.
+  답변을 등록하고 리다이렉트된 상세화면에서 방금 쓴 답변이 보이게 한다.
+요청별 상태는 contextvar에 두므로 WSGI 스레드와 ASGI에서 요청끼리 섞이지 않고,
+contextvar를 넘겨받는 스레드(sync_to_async, 비동기 view의 DB 스레드 풀)도 같은 값을 본다.
+요청 밖(관리 명령, 셸)은 항상 기본 DB를 쓴다.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from ..middleware import AsyncCapableMiddleware
+
+PIN_COOKIE = "pybo_primary"
+
+_replica = contextvars.ContextVar("common_db_replica", default=False)
+# 요청 중에 쓴 모델. 풀 스레드(복사한 context)에서 쓴 것도 보이도록 set을 함께 쓴다
+_written = contextvars.ContextVar("common_db_written", default=None)
+
+
+def replica_allowed():
+    return _replica.get()
+
+
+def pin():
+    """
+    현재 요청의 남은 읽기를 모두 기본 DB에서 한다.
+    """
+    _replica.set(False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.COMMON_DB_REPLICAS
+        if not replicas or not replica_allowed():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # 트랜잭션 안의 읽기는 같은 트랜잭션에서
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        written = _written.get()
+        if written is not None:
+            written.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 복제 DB는 기본 DB와 같은 데이터다
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinningMiddleware(AsyncCapableMiddleware):
+    """
+    세션/인증보다 먼저 상태를 정하도록 SessionMiddleware 앞에 둔다.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMMON_DB_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.primary_views = tuple(settings.COMMON_DB_PRIMARY_VIEWS)
+        if self.is_async:
+            # 동기 process_view는 Django가 요청마다 스레드로 넘기므로 코루틴을 쓴다
+            self.process_view = self.aprocess_view
+
+    def call(self, request):
+        write = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.set(False)
+            written = _written.get()
+            _written.set(None)
+        return self.finish(response, write or written)
+
+    async def acall(self, request):
+        write = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.set(False)
+            written = _written.get()
+            _written.set(None)
+        return self.finish(response, write or written)
+
+    def start(self, request):
+        write = request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+        _replica.set(not write and PIN_COOKIE not in request.COOKIES)
+        _written.set(set())
+        return write
+
+    def finish(self, response, write):
+        if write:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.COMMON_DB_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_primary_view(view_func):
+            pin()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_primary_view(view_func):
+            pin()
+
+    def is_primary_view(self, view_func):
+        """
+        COMMON_DB_PRIMARY_VIEWS에는 모듈이나 view 함수의 경로를 쓴다
+        """
+        name = "{}.{}".format(view_func.__module__, view_func.__qualname__)
+        return name.startswith(self.primary_views)
@@ -0,0 +1,34 @@
+"""
+동기/비동기 겸용 미들웨어
+
+ASGI에서 동기 전용 미들웨어는 Django가 async_to_sync로 감싸므로 요청마다 스레드 하나를
+거쳐야 하고, 비동기 view(pybo/views/async_views.py)가 스레드를 쓰지 않는 의미가 없어진다.
+AsyncCapableMiddleware를 상속하면 get_response가 코루틴일 때(ASGI) acall()을,
+아니면(WSGI, 테스트 클라이언트) call()을 쓴다. 하위 클래스는 필요한 쪽을 바꾼다.
+(기본은 다음 단계를 그대로 부른다)
+"""
+
+import asyncio
+
+
+class AsyncCapableMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Django가 이 인스턴스를 코루틴 함수로 알아보게 한다 (MiddlewareMixin과 같다)
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        return self.get_response(request)
+
+    async def acall(self, request):
+        return await self.get_response(request)
@@ -1,3 +1,22 @@
-from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class CachedUser(User):
+    """
+    캐시에서 만든 User (common/backends.py)
+    비밀번호 해시는 읽지 않았으므로 세션 확인 값(get_session_auth_hash)을 캐시한 값으로 쓴다.
+    """
+
+    session_auth_hash = None
+
+    class Meta:
+        proxy = True
+
+    def get_session_auth_hash(self):
+        if self.session_auth_hash is not None:
+            return self.session_auth_hash
+        return super().get_session_auth_hash()
+
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self.session_auth_hash = None  # 새 비밀번호로 다시 만든다
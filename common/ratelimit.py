@@ -0,0 +1,182 @@
+"""
+요청 수 제한 (COMMON_RATELIMITS)
+
+답변/댓글 등록, 추천처럼 쓰기가 있는 view를 스크립트가 몰아서 부르면 모두가 느려지므로
+사용자별, IP별 토큰 버킷으로 제한하고 넘으면 바로 429와 Retry-After를 돌려준다.
+- @ratelimit("정책") 데코레이터나, 직접 고칠 수 없는 view(로그인 등)는
+  RateLimitMiddleware + COMMON_RATELIMIT_VIEWS로 건다.
+- 버킷은 COMMON_RATELIMIT_CACHE 캐시에 두므로 여러 프로세스(prod의 memcached)가 함께 쓰고
+  DB는 조회하지 않는다.
+- 버킷마다 정수 하나만 둔다. (GCRA: 토큰 수 대신 버킷이 다시 가득 차는 시각(ms)을 저장)
+  요청마다 cache.incr()로 토큰 하나만큼 시각을 늦추므로 동시에 와도 잃어버리는 요청이 없고,
+  그 시각이 지금보다 버킷 크기 이상 앞서 있으면 토큰이 없는 것이다. (늦춘 만큼 되돌린다)
+"""
+
+import logging
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+# 키를 오래 남겨둔다. 쉬는 동안 가득 찬 버킷은 take()가 알아서 지금으로 옮긴다
+KEY_TIMEOUT = 60 * 60
+
+MESSAGE = "リクエストが多すぎます。しばらくしてから再度お試しください。"
+
+
+def _interval(per_minute):
+    return math.ceil(60000 / per_minute)  # 토큰 하나가 차는 시간(ms)
+
+
+def take(key, per_minute, burst, now=None):
+    """
+    key의 버킷에서 토큰 하나를 꺼낸다. 꺼냈으면 0, 없으면 기다릴 시간(초)
+    per_minute: 분당 다시 차는 토큰 수, burst: 버킷 크기(한 번에 허용하는 요청 수)
+    """
+    cache = caches[settings.COMMON_RATELIMIT_CACHE]
+    interval = _interval(per_minute)
+    now = int(time.time() * 1000) if now is None else now
+    while True:
+        try:
+            full_at = cache.incr(key, interval)
+            break
+        except ValueError:
+            # 처음이거나 만료된 버킷. 동시에 와도 add()는 하나만 성공한다
+            if cache.add(key, now + interval, KEY_TIMEOUT):
+                return 0
+    if full_at < now + interval:
+        # 쉬는 동안 가득 찼다. 겹쳐서 옮겨도 가득 찬 버킷이라 토큰 몇 개 차이뿐이다
+        cache.set(key, now + interval, KEY_TIMEOUT)
+        return 0
+    wait = full_at - now - interval * burst
+    if wait <= 0:
+        return 0
+    cache.decr(key, interval)
+    return wait / 1000
+
+
+def give_back(key, per_minute):
+    """
+    take()로 꺼낸 토큰을 돌려놓는다.
+    """
+    try:
+        caches[settings.COMMON_RATELIMIT_CACHE].decr(key, _interval(per_minute))
+    except ValueError:
+        pass
+
+
+def client_ip(request):
+    """
+    COMMON_RATELIMIT_IP_META의 클라이언트 IP. 요청에 없으면 REMOTE_ADDR
+    (설정은 common/checks.py가 시작할 때 확인한다. 헤더는 클라이언트가 바꿀 수 있으므로
+    요청 내용으로 오류를 내지 않는다)
+    """
+    meta = settings.COMMON_RATELIMIT_IP_META
+    ip = request.META.get(meta)
+    if not ip:
+        logger.warning(
+            "요청에 %s가 없어 REMOTE_ADDR을 씁니다. 프록시 설정을 확인하세요.", meta
+        )
+        ip = request.META.get("REMOTE_ADDR", "")
+    return ip
+
+
+def check(request, policy):
+    """
+    policy의 사용자 버킷과 IP 버킷에서 토큰을 꺼낸다. 기다릴 시간(초), 통과하면 0
+    """
+    limits = settings.COMMON_RATELIMITS[policy]
+    buckets = []
+    user = getattr(request, "user", None)
+    if "user" in limits and user is not None and user.is_authenticated:
+        buckets.append(("user", user.pk))
+    if "ip" in limits:
+        buckets.append(("ip", client_ip(request)))
+    taken = []
+    for kind, value in buckets:
+        key = "common:ratelimit:{}:{}:{}".format(policy, kind, value)
+        wait = take(key, *limits[kind])
+        if wait:
+            # 거절한 요청은 앞의 버킷에서도 세지 않는다
+            for taken_key, per_minute in taken:
+                give_back(taken_key, per_minute)
+            return wait
+        taken.append((key, limits[kind][0]))
+    return 0
+
+
+def too_many_requests(request, wait):
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        response = JsonResponse({"error": MESSAGE}, status=429)
+    else:
+        response = HttpResponse(MESSAGE, status=429, content_type="text/plain")
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+def ratelimit(policy, methods=("POST",)):
+    """
+    methods 요청에 policy를 적용하는 view 데코레이터 (login_required 아래에 둔다)
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if settings.COMMON_RATELIMIT_ENABLED and request.method in methods:
+                wait = check(request, policy)
+                if wait:
+                    return too_many_requests(request, wait)
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RateLimitMiddleware(AsyncCapableMiddleware):
+    """
+    COMMON_RATELIMIT_VIEWS {URL 이름: 정책}의 POST 요청을 제한한다.
+    request.user를 쓰므로 AuthenticationMiddleware 뒤에 둔다.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMMON_RATELIMIT_ENABLED or not settings.COMMON_RATELIMIT_VIEWS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.views = settings.COMMON_RATELIMIT_VIEWS
+        if self.is_async:
+            # 동기 process_view는 Django가 요청마다 스레드로 넘기므로 코루틴을 쓴다
+            self.process_view = self.aprocess_view
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        policy = self.policy(request)
+        if policy is None:
+            return None
+        wait = check(request, policy)
+        if wait:
+            return too_many_requests(request, wait)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        policy = self.policy(request)
+        if policy is None:
+            return None
+        # 캐시를 부르는 제한할 요청만 스레드로 넘긴다 (request.user도 거기서 읽는다)
+        wait = await sync_to_async(check)(request, policy)
+        if wait:
+            return too_many_requests(request, wait)
+        return None
+
+    def policy(self, request):
+        if request.method != "POST":
+            return None
+        return self.views.get(request.resolver_match.view_name)
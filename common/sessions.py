@@ -0,0 +1,37 @@
+"""
+캐시 세션 (SESSION_ENGINE)
+
+장고의 cached_db와 같이 캐시를 먼저 읽고, 저장할 때는 DB와 캐시에 함께 쓴다.
+(캐시가 비워져도 DB에서 다시 읽으므로 로그인이 풀리지 않는다)
+여기에 더해 읽었을 때와 내용이 같으면 저장하지 않는다.
+"""
+
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+LEGACY_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+class SessionStore(CachedDBStore):
+    _loaded = None  # 읽었을 때(또는 마지막으로 저장했을 때)의 직렬화 값
+
+    def _serialize(self, data):
+        return self.serializer().dumps(data)
+
+    def load(self):
+        data = super().load()
+        if data.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            # AUTHENTICATION_BACKENDS에서 뺀 ModelBackend로 로그인한 세션도 풀리지 않게
+            data[BACKEND_SESSION_KEY] = "common.backends.CachedModelBackend"
+        self._loaded = self._serialize(data)
+        return data
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key is not None
+            and self._loaded == self._serialize(self._get_session())
+        ):
+            return  # 같은 값을 다시 넣기만 한 경우 (modified=True이지만 바뀐 것이 없다)
+        super().save(must_create)
+        self._loaded = self._serialize(self._session)
@@ -0,0 +1,19 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache_key
+from .models import CachedUser
+
+
+# 캐시에서 만든 User(CachedUser)를 저장해도 지운다
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=CachedUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=CachedUser)
+def invalidate_user(sender, instance, **kwargs):
+    """
+    사용자 정보(비밀번호, last_login 등)가 바뀌면 캐시한 User를 지운다
+    """
+    cache.delete(user_cache_key(instance.pk))
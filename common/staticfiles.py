@@ -0,0 +1,142 @@
+"""
+정적 파일 (collectstatic + 앱에서 직접 서빙)
+
+CompressedManifestStaticFilesStorage는 collectstatic 때 내용 해시가 붙은 파일명
+(bootstrap.min.3f2a...css)과 그 gzip 파일(.gz)을 STATIC_ROOT에 함께 만든다.
+StaticFilesMiddleware는 STATIC_URL 요청을 STATIC_ROOT에서 바로 보내는데,
+브라우저가 gzip을 받으면 미리 압축한 파일을 보내고, 해시가 붙은 파일명이면
+내용이 바뀌지 않으므로 Cache-Control: immutable로 1년간 다시 확인하지 않게 한다.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage,
+    staticfiles_storage,
+)
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .middleware import AsyncCapableMiddleware
+
+COMPRESS_EXTENSIONS = (".css", ".js", ".svg", ".txt", ".json", ".xml", ".map")
+COMPRESS_MIN_SIZE = 200  # 이보다 작은 파일은 압축해도 헤더 때문에 이득이 없다
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage + 해시가 붙은 파일의 gzip 파일
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESS_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as f:
+            content = f.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return
+        # mtime=0: 같은 내용이면 collectstatic을 다시 해도 같은 .gz가 나온다
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            return
+        with open(path + ".gz", "wb") as f:
+            f.write(compressed)
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware):
+    """
+    STATIC_URL 아래 요청을 STATIC_ROOT의 파일로 바로 응답한다. (COMMON_SERVE_STATIC)
+    세션/인증 미들웨어를 거치지 않도록 SecurityMiddleware 바로 뒤에 둔다.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMMON_SERVE_STATIC or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.prefix = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT)
+        # manifest에 있는 해시 파일명. collectstatic을 다시 하면 프로세스를 재시작한다.
+        self.immutable = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def call(self, request):
+        response = self.serve_static(request)
+        if response is None:
+            return self.get_response(request)
+        return response
+
+    async def acall(self, request):
+        # 파일을 찾고 여는 것뿐이라 이벤트 루프에서 바로 한다
+        response = self.serve_static(request)
+        if response is None:
+            return await self.get_response(request)
+        return response
+
+    def serve_static(self, request):
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            return self.serve(request, request.path[len(self.prefix) :])
+        return None
+
+    def find(self, name):
+        """
+        name의 파일 경로와 os.stat(). 없으면 (None, None)
+        """
+        try:
+            path = safe_join(self.root, name)
+            stat = os.stat(path)
+        except (ValueError, OSError):
+            return None, None
+        if not os.path.isfile(path) or name.endswith(".gz"):
+            return None, None
+        return path, stat
+
+    def serve(self, request, name):
+        path, stat = self.find(name)
+        if path is None:
+            return None
+        if not was_modified_since(
+            request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime, stat.st_size
+        ):
+            return HttpResponseNotModified()
+
+        content_type, _ = mimetypes.guess_type(path)
+        compressed = os.path.isfile(path + ".gz")
+        encoding = None
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if compressed and _accepts_gzip.search(accept):
+            path, encoding = path + ".gz", "gzip"
+
+        response = FileResponse(
+            open(path, "rb"), content_type=content_type or "application/octet-stream"
+        )
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+        if compressed:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        if name in self.immutable:
+            response["Cache-Control"] = "public, max-age={}, immutable".format(
+                IMMUTABLE_MAX_AGE
+            )
+        else:
+            # 해시가 없는 원래 파일명은 바뀔 수 있으므로 짧게 캐시한다
+            response["Cache-Control"] = "public, max-age=60"
+        return response
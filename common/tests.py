@@ -1,3 +1,518 @@
-from django.test import TestCase
+import contextvars
+import gzip
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.test import (
+    AsyncClient,
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from .backends import CachedModelBackend, user_cache_key
+from .checks import check_ratelimit_behind_proxy, check_ratelimit_ip_meta
+from .compression import CompressionMiddleware
+from .db import routers
+from .db.pool import ConnectionPool, PoolTimeout
+from .ratelimit import client_ip, ratelimit, take
+from .sessions import SessionStore
+from .staticfiles import StaticFilesMiddleware
+
+
+class CachedSessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_session_is_not_saved(self):
+        session = SessionStore()
+        session["page"] = 1
+        session.save()
+
+        session = SessionStore(session.session_key)
+        session["page"] = 1
+        with self.assertNumQueries(0):
+            session.save()
+        session["page"] = 2
+        session.save()
+        self.assertEqual(SessionStore(session.session_key)["page"], 2)
+
+    def test_user_is_cached_until_saved(self):
+        user = User.objects.create(username="user")
+        backend = CachedModelBackend()
+        backend.get_user(user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(user.pk), user)
+
+        user.is_active = False
+        user.save()
+        self.assertIsNone(backend.get_user(user.pk))
+
+    def test_password_hash_is_not_cached(self):
+        user = User.objects.create_user(username="user", password="secret")
+        CachedModelBackend().get_user(user.pk)
+        self.assertNotIn(user.password, repr(cache.get(user_cache_key(user.pk))))
+
+        # 캐시에서 만든 User를 저장해도 비밀번호는 그대로다
+        cached = CachedModelBackend().get_user(user.pk)
+        cached.email = "user@example.com"
+        cached.save()
+        user.refresh_from_db()
+        self.assertEqual(user.email, "user@example.com")
+        self.assertTrue(user.check_password("secret"))
+
+    def test_cached_user_password_change_updates_session_hash(self):
+        user = User.objects.create_user(username="user", password="secret")
+        CachedModelBackend().get_user(user.pk)
+        cached = CachedModelBackend().get_user(user.pk)
+        cached.set_password("changed")
+        cached.save()
+        self.assertEqual(
+            cached.get_session_auth_hash(),
+            User.objects.get(pk=user.pk).get_session_auth_hash(),
+        )
+
+    def test_failed_login_checks_password_once(self):
+        User.objects.create_user(username="user", password="secret")
+        with mock.patch.object(
+            User, "check_password", autospec=True, return_value=False
+        ) as check_password:
+            self.assertFalse(self.client.login(username="user", password="wrong"))
+        check_password.assert_called_once()
+
+    def test_legacy_backend_session_stays_logged_in(self):
+        user = User.objects.create_user(username="user", password="secret")
+        self.client.force_login(user, "django.contrib.auth.backends.ModelBackend")
+        response = self.client.get(reverse("index"))
+        self.assertEqual(response.wsgi_request.user, user)
+
+    def test_logged_in_request_skips_user_query(self):
+        user = User.objects.create_user(username="user", password="secret")
+        self.client.login(username="user", password="secret")
+        self.client.get(reverse("index"))
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get(reverse("index"))
+        self.assertEqual(response.wsgi_request.user, user)  # 세션 확인도 통과한다
+        cache.delete(user_cache_key(user.pk))
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(reverse("index"))
+        self.assertEqual(len(cached), len(uncached) - 1)
+
+
+class StaticFilesTest(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(
+            STATIC_ROOT=root.name,
+            STATICFILES_STORAGE=(
+                "common.staticfiles.CompressedManifestStaticFilesStorage"
+            ),
+            COMMON_SERVE_STATIC=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.url = staticfiles_storage.url("bootstrap.min.css")
+
+    def test_hashed_file_is_precompressed_and_immutable(self):
+        self.assertRegex(self.url, r"/static/bootstrap\.min\.[0-9a-f]{12}\.css$")
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        content = gzip.decompress(b"".join(response.streaming_content))
+        with open(staticfiles_storage.path("bootstrap.min.css"), "rb") as f:
+            self.assertEqual(content, f.read())
+
+    def test_plain_file_without_gzip(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.client.get("/static/bootstrap.min.css")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+        response = self.client.get("/static/missing.css")
+        self.assertFalse(response.has_header("Cache-Control"))  # 미들웨어가 넘긴다
+
+    async def test_async_requests(self):
+        async def view(request):
+            return HttpResponse("view")
+
+        middleware = StaticFilesMiddleware(view)
+        response = await middleware(RequestFactory().get(self.url))
+        self.assertIn("immutable", response["Cache-Control"])
+        response = await middleware(RequestFactory().get("/"))
+        self.assertEqual(response.content, b"view")
+
+
+class CompressionTest(TestCase):
+    body = b"<p>pybo</p>" * 200
+
+    def respond(self, response, **headers):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip", **headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_large_html_is_compressed(self):
+        response = self.respond(HttpResponse(self.body))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_or_other_types_are_not_compressed(self):
+        response = self.respond(HttpResponse(b"<p>pybo</p>"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.respond(HttpResponse(self.body, content_type="image/png"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming_is_compressed_per_chunk(self):
+        chunks = [b'{"id": %d}\n' % i * 50 for i in range(3)]
+        response = self.respond(
+            StreamingHttpResponse(iter(chunks), content_type="application/x-ndjson")
+        )
+        parts = list(response.streaming_content)
+        self.assertGreater(len(parts), len(chunks))  # 조각마다 바로 보낸다
+        self.assertEqual(gzip.decompress(b"".join(parts)), b"".join(chunks))
+
+    def test_csrf_pages_are_not_compressed(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        request.META["CSRF_COOKIE_USED"] = True
+        response = HttpResponse(self.body)
+        response.compressed_content = gzip.compress(self.body)
+        response = CompressionMiddleware(lambda request: response)(request)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.body)
+
+    async def test_async_response_is_compressed(self):
+        async def view(request):
+            return HttpResponse(self.body)
+
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        response = await CompressionMiddleware(view)(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_cached_list_page_reuses_compressed_body(self):
+        cache.clear()
+        first = self.client.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        second = self.client.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(second["X-Pybo-Cache"], "hit")
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertEqual(second.content, first.content)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(TestCase):
+    def pool(self, **options):
+        return ConnectionPool(
+            connect=FakeConnection,
+            ping=lambda connection: connection.healthy,
+            reset=lambda connection: not connection.closed,
+            **options,
+        )
+
+    def test_released_connection_is_reused(self):
+        pool = self.pool()
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["acquired"]), (1, 2))
+
+    def test_exhausted_pool_waits_then_times_out(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout), self.assertLogs("common.db.pool"):
+            pool.acquire()
+
+        threading.Timer(0.01, pool.release, [held]).start()
+        pool.timeout = 5
+        self.assertIs(pool.acquire(), held)
+        stats = pool.stats()
+        self.assertEqual((stats["exhausted"], stats["timeouts"]), (2, 1))
+        self.assertGreater(stats["max_wait_seconds"], 0)
+
+    def test_unhealthy_and_idle_connections_are_replaced(self):
+        pool = self.pool(idle_timeout=0.05)
+        broken = pool.acquire()
+        broken.healthy = False
+        pool.release(broken)
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, broken)
+        self.assertTrue(broken.closed)
+
+        pool.release(replacement)
+        time.sleep(0.06)
+        self.assertIsNot(pool.acquire(), replacement)
+        self.assertTrue(replacement.closed)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_threads_share_max_size_connections(self):
+        pool = self.pool(max_size=3)
+        seen = set()
+
+        def work():
+            for _ in range(20):
+                connection = pool.acquire()
+                seen.add(id(connection))
+                pool.release(connection)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        self.assertLessEqual(len(seen), 3)
+        self.assertEqual((stats["acquired"], stats["in_use"]), (160, 0))
+
+
+@skipUnless(
+    connection.settings_dict["ENGINE"] == "common.db.postgresql_pool",
+    "PYBO_POSTGRES_DB로 로컬 PostgreSQL을 지정했을 때만 실행한다",
+)
+class PooledPostgresTest(TransactionTestCase):
+    def test_connection_is_reused_after_close(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertGreaterEqual(connection.pool.stats()["acquired"], 2)
+
+
+@override_settings(COMMON_DB_REPLICAS=["replica"])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def request(self, method="get", cookies=None, module=__name__):
+        """
+        미들웨어를 거친 view 안에서 router가 고른 읽기 DB
+        """
+        seen = []
+
+        def view(request):
+            seen.append(routers.PrimaryReplicaRouter().db_for_read(User))
+            return HttpResponse()
+
+        view.__module__ = module
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+
+        def handler(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = routers.PrimaryPinningMiddleware(handler)
+        response = middleware(request)
+        return seen[0], response
+
+    def test_reads_go_to_replica_outside_requests_only_when_allowed(self):
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(User), "default")  # 관리 명령, 셸
+        self.assertEqual(self.request()[0], "replica")
+        self.assertEqual(router.db_for_write(User), "default")
+
+    def test_write_pins_following_requests_to_primary(self):
+        db, response = self.request("post")
+        self.assertEqual(db, "default")
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 10)
+        db, _ = self.request(cookies={routers.PIN_COOKIE: cookie.value})
+        self.assertEqual(db, "default")
+
+    def test_write_views_read_from_primary(self):
+        db, _ = self.request(module="pybo.views.answer_views")
+        self.assertEqual(db, "default")
+
+    def test_async_vote_views_read_from_primary(self):
+        from pybo.views import async_views
+
+        middleware = routers.PrimaryPinningMiddleware(lambda request: None)
+        self.assertTrue(middleware.is_primary_view(async_views.vote_question))
+        self.assertTrue(middleware.is_primary_view(async_views.vote_answer))
+        self.assertFalse(middleware.is_primary_view(async_views.detail))
+
+    def test_get_that_writes_pins_following_requests(self):
+        def view(request):
+            # 옛 GET 추천 주소처럼 GET에서 쓰는 view. async_views처럼 풀 스레드에서 쓴다
+            context = contextvars.copy_context()
+            router = routers.PrimaryReplicaRouter()
+            with ThreadPoolExecutor(1) as executor:
+                executor.submit(context.run, router.db_for_write, User).result()
+            return HttpResponse()
+
+        response = routers.PrimaryPinningMiddleware(view)(RequestFactory().get("/"))
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        _, response = self.request()
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    async def test_async_requests(self):
+        seen = []
+
+        def view(request):
+            seen.append(routers.PrimaryReplicaRouter().db_for_read(User))
+            return HttpResponse()
+
+        async def handler(request):
+            await middleware.process_view(request, view, (), {})
+            # ASGI에서 동기 view는 스레드에서 실행된다
+            return await sync_to_async(view)(request)
+
+        middleware = routers.PrimaryPinningMiddleware(handler)
+        await middleware(RequestFactory().get("/"))
+        view.__module__ = "pybo.views.answer_views"
+        await middleware(RequestFactory().get("/"))
+        self.assertEqual(seen, ["replica", "default"])
+        self.assertFalse(routers.replica_allowed())
+
+    def test_state_follows_context_into_thread_pools(self):
+        router = routers.PrimaryReplicaRouter()
+        seen = []
+
+        def view(request):
+            # async_views.run_db처럼 contextvar를 복사해 풀 스레드에서 읽는다
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(1) as executor:
+                future = executor.submit(context.run, router.db_for_read, User)
+                seen.append(future.result())
+            return HttpResponse()
+
+        routers.PrimaryPinningMiddleware(view)(RequestFactory().get("/"))
+        self.assertEqual(seen, ["replica"])
+
+
+@override_settings(
+    COMMON_RATELIMITS={
+        "post": {"user": (1, 3), "ip": (1, 5)},
+        "login": {"ip": (1, 2)},
+    }
+)
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def burst(self, func, count):
+        """
+        count개의 스레드가 동시에 func()를 부른 결과
+        """
+        barrier = threading.Barrier(count)
+        results = []
+
+        def run():
+            barrier.wait()
+            results.append(func())
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_burst_takes_exactly_burst_tokens(self):
+        waits = self.burst(lambda: take("bucket", 60, 5), 20)
+        self.assertEqual(waits.count(0), 5)
+        self.assertTrue(all(0 < wait <= 1 for wait in waits if wait))
+
+    def test_bucket_refills_over_time(self):
+        now = int(time.time() * 1000)
+        self.assertEqual([take("bucket", 60, 2, now) for _ in range(3)][:2], [0, 0])
+        self.assertEqual(take("bucket", 60, 2, now), 1)  # 거절한 요청은 세지 않는다
+        self.assertEqual(take("bucket", 60, 2, now + 1000), 0)
+        self.assertEqual(take("bucket", 60, 2, now + 60000), 0)  # 쉬면 다시 가득 찬다
+        self.assertEqual(take("bucket", 60, 2, now + 60000), 0)
+        self.assertGreater(take("bucket", 60, 2, now + 60000), 0)
+
+    def test_users_and_ips_have_separate_buckets(self):
+        view = ratelimit("post")(lambda request: HttpResponse("ok"))
+        factory = RequestFactory()
+        users = [User.objects.create(username=name) for name in ("a", "b")]
+
+        def post(user, ip="10.0.0.1"):
+            request = factory.post("/", REMOTE_ADDR=ip)
+            request.user = user
+            return view(request).status_code
+
+        codes = self.burst(lambda: post(users[0]), 6)
+        self.assertEqual(sorted(codes), [200] * 3 + [429] * 3)
+        codes = self.burst(lambda: post(users[1]), 6)  # IP 버킷(5)은 함께 쓴다
+        self.assertEqual(sorted(codes), [200] * 2 + [429] * 4)
+        self.assertEqual(post(users[1], "10.0.0.2"), 200)
+
+    def test_client_ip_never_fails_the_request(self):
+        factory = RequestFactory()
+        # 클라이언트가 넣은 헤더는 REMOTE_ADDR 설정에서 쓰지 않는다
+        spoofed = factory.post("/", HTTP_X_REAL_IP="10.0.0.1")
+        self.assertEqual(client_ip(spoofed), "127.0.0.1")
+        with override_settings(COMMON_RATELIMIT_IP_META="HTTP_X_REAL_IP"):
+            self.assertEqual(client_ip(spoofed), "10.0.0.1")
+            # 프록시를 거치지 않은 요청은 REMOTE_ADDR로 제한한다
+            with self.assertLogs("common.ratelimit", "WARNING"):
+                self.assertEqual(client_ip(factory.post("/")), "127.0.0.1")
+
+    def test_ip_meta_is_checked_at_startup(self):
+        with override_settings(COMMON_RATELIMIT_IP_META="X_REAL_IP"):
+            self.assertEqual(
+                [e.id for e in check_ratelimit_ip_meta(None)], ["common.E001"]
+            )
+        self.assertEqual(
+            [w.id for w in check_ratelimit_behind_proxy(None)], ["common.W001"]
+        )
+        with override_settings(COMMON_RATELIMIT_IP_META="HTTP_X_REAL_IP"):
+            self.assertEqual(check_ratelimit_ip_meta(None), [])
+            self.assertEqual(check_ratelimit_behind_proxy(None), [])
+
+    def test_rejected_request_is_fast_429(self):
+        user = User.objects.create(username="user")
+        self.client.force_login(user)
+        self.client.get("/")  # 세션과 사용자를 캐시에 올린다
+        url = reverse("pybo:comment_create_question", args=[1])
+        for _ in range(3):
+            self.client.get(url, {"page": 1})  # GET은 세지 않는다
+        for _ in range(3):
+            self.client.post(url)
+        with self.assertNumQueries(0):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+
+        ajax = self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertIn("error", ajax.json())
+
+    def test_middleware_limits_login_attempts(self):
+        url = reverse("common:login")
+        data = {"username": "nobody", "password": "wrong"}
+        codes = [Client().post(url, data).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+
+    async def test_middleware_limits_async_requests(self):
+        url = reverse("common:login")
+        data = {"username": "nobody", "password": "wrong"}
+        codes = [(await AsyncClient().post(url, data)).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
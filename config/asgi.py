@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("PYBO_ASYNC_VIEWS", "1")  # 읽기 화면과 추천은 비동기 view 사용
 
 application = get_asgi_application()
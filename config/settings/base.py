@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,11 +45,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pybo.perf.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "common.compression.CompressionMiddleware",
+    "common.staticfiles.StaticFilesMiddleware",
+    "common.db.routers.PrimaryPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "common.ratelimit.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -57,6 +63,7 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
+        # PYBO_PERF_ENABLED이면 pybo.perf.DjangoTemplates로 바꾼다 (렌더링 시간 계측)
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
@@ -84,6 +91,21 @@ DATABASES = {
     }
 }
 
+# 읽기는 복제 DB, 쓰기는 default (common/db/routers.py). 복제가 없으면 모두 default
+DATABASE_ROUTERS = ["common.db.routers.PrimaryReplicaRouter"]
+COMMON_DB_REPLICAS = []  # 복제 DB 별칭
+COMMON_DB_PIN_SECONDS = 10  # 쓰기 뒤 기본 DB에서 읽는 시간(초). 복제 지연보다 길게
+# 이 모듈이나 view 함수는 GET도 기본 DB에서 읽는다 (수정 화면이 예전 내용을 보여주지 않게)
+COMMON_DB_PRIMARY_VIEWS = [
+    "pybo.views.question_views",
+    "pybo.views.answer_views",
+    "pybo.views.comment_views",
+    "pybo.views.vote_views",
+    # ASGI의 추천 view (나머지 async_views는 읽기 화면)
+    "pybo.views.async_views.vote_question",
+    "pybo.views.async_views.vote_answer",
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -126,6 +148,36 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# collectstatic이 해시 파일명과 gzip 파일을 만들고 StaticFilesMiddleware가 서빙한다.
+# (common/staticfiles.py) prod.py에서 켠다.
+COMMON_SERVE_STATIC = False
+
+# 응답 gzip 압축 (common/compression.py)
+COMMON_COMPRESS_MIN_SIZE = 1024  # 이보다 작은 응답은 압축하지 않는다
+COMMON_COMPRESS_LEVEL = 6
+COMMON_COMPRESS_TYPES = [
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+]
+
+# 요청 수 제한 (common/ratelimit.py). 사용자별, IP별 토큰 버킷
+# {정책: {"user"/"ip": (분당 요청 수, 한 번에 허용하는 요청 수)}}
+COMMON_RATELIMIT_ENABLED = True
+COMMON_RATELIMITS = {
+    "post": {"user": (6, 5), "ip": (30, 20)},  # 질문/답변/댓글 등록
+    "vote": {"user": (60, 20), "ip": (300, 60)},
+    "login": {"ip": (10, 10)},
+}
+# 데코레이터를 달 수 없는 view는 RateLimitMiddleware가 POST에 정책을 건다
+COMMON_RATELIMIT_VIEWS = {"common:login": "login", "common:signup": "login"}
+COMMON_RATELIMIT_CACHE = "default"  # 여러 프로세스가 함께 쓰는 캐시여야 한다
+# 클라이언트 IP. 프록시 뒤에서는 프록시가 넣는 헤더로 바꾼다 (예: HTTP_X_REAL_IP)
+COMMON_RATELIMIT_IP_META = "REMOTE_ADDR"
+
 # 로그인 성공 후 이동하는 URL
 
 LOGIN_REDIRECT_URL = "/"
@@ -135,6 +187,76 @@ LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/"
 
 
+# 캐시
+# 프로세스마다 따로 쓰는 메모리 캐시. 여러 프로세스로 띄우는 prod.py는 memcached를 쓴다.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+# 세션/인증
+# 세션은 캐시에서 읽고 DB와 캐시에 함께 저장한다. 로그인 사용자도 캐시한다. (common/)
+
+SESSION_ENGINE = "common.sessions"
+
+# 하나만 둔다. (로그인 실패마다 비밀번호 해시를 백엔드 수만큼 계산한다)
+# 예전 ModelBackend로 로그인한 세션은 common/sessions.py가 이 백엔드로 바꿔 읽는다
+AUTHENTICATION_BACKENDS = ["common.backends.CachedModelBackend"]
+
+COMMON_USER_CACHE_TIMEOUT = 300
+
+
+# pybo 설정
+
+# 목록 페이지 번호 UI에 쓰는 전체 건수(근사값) 캐시 시간(초)
+PYBO_COUNT_CACHE_TIMEOUT = 60
+# 목록에서 번호로 갈 수 있는 마지막 페이지. 번호 이동은 OFFSET이라 그 뒤는 이전/다음 커서로만
+PYBO_LIST_MAX_PAGE_NUMBER = 10
+
+# 목록 페이지 응답 캐시 (pybo/caching.py)
+PYBO_LIST_CACHE_TIMEOUT = 300
+PYBO_LIST_CACHE_LOCK_TIMEOUT = 5  # 한 요청이 페이지를 다시 만드는 최대 시간(초)
+
+# ASGI 비동기 view (pybo/views/async_views.py). config/asgi.py가 켠다.
+PYBO_ASYNC_VIEWS = os.environ.get("PYBO_ASYNC_VIEWS") == "1"
+PYBO_ASYNC_DB_THREADS = 8  # DB 작업용 스레드 수
+PYBO_ASYNC_RENDER_THREADS = 4  # 템플릿/Markdown 렌더링용 스레드 수
+
+# hot 순위 (pybo/ranking.py). decay_hot_scores를 주기적으로(예: 1시간마다) 실행한다.
+PYBO_HOT_HALF_LIFE = 24 * 60 * 60  # 점수가 절반이 되는 시간(초)
+PYBO_HOT_QUESTION_WEIGHT = 1.0
+PYBO_HOT_VOTE_WEIGHT = 1.0
+PYBO_HOT_ANSWER_WEIGHT = 2.0
+PYBO_HOT_MIN_SCORE = 0.01  # decay 후 이보다 작은 점수는 0
+
+# 질문 추천 버퍼 (pybo/votes.py). 켜면 flush_pending_votes --interval을 함께 실행한다.
+PYBO_VOTE_BUFFER = os.environ.get("PYBO_VOTE_BUFFER") == "1"
+PYBO_VOTE_FLUSH_INTERVAL = 5  # 버퍼를 반영하는 주기(초)
+
+# 백그라운드 작업 큐 (pybo/tasks.py). 끄면(prod.py) run_pybo_worker를 함께 실행한다.
+PYBO_TASKS_EAGER = os.environ.get("PYBO_TASKS_EAGER", "1") == "1"  # 그 자리에서 실행
+PYBO_TASKS_THREADS = 4  # 워커 스레드 수
+PYBO_TASKS_POLL_INTERVAL = 1  # 작업이 없을 때 다시 확인하는 주기(초)
+PYBO_TASKS_MAX_ATTEMPTS = 5
+PYBO_TASKS_RETRY_DELAY = 10  # 첫 재시도까지(초). 재시도마다 두 배
+PYBO_TASKS_TIMEOUT = 300  # 이보다 오래 실행 중인 작업은 다시 대기로 돌린다(초)
+
+# 스팸 사용자 정리 (pybo/moderation.py)
+PYBO_PURGE_BATCH_SIZE = 1000  # 트랜잭션 하나에서 지우는 행 수
+PYBO_PURGE_TASK_SECONDS = 60  # 작업 하나가 지우는 시간. 넘으면 이어서 할 작업을 넣는다
+
+# 요청별 성능 계측 (pybo/perf.py). Server-Timing 헤더와 pybo.perf 로그
+# 기본은 끈다. 켜도 Server-Timing 헤더는 관리자(is_staff)와 INTERNAL_IPS에만 보낸다
+PYBO_PERF_ENABLED = os.environ.get("PYBO_PERF_ENABLED", "0") == "1"
+if PYBO_PERF_ENABLED:
+    TEMPLATES[0]["BACKEND"] = "pybo.perf.DjangoTemplates"
+PYBO_PERF_SLOW_REQUEST_MS = 500  # 이보다 느린 요청은 실행한 SQL도 로그에 남긴다
+PYBO_PERF_MAX_QUERIES = 200  # 느린 요청 로그에 남길 SQL 최대 개수
+
+
 # 로깅 설정
 
 LOGGING = {
@@ -1,3 +1,35 @@
+import os
+
 from .base import *
 
 ALLOWED_HOSTS = []
+INTERNAL_IPS = ["127.0.0.1"]
+
+# 개발 서버에서는 성능 계측을 켠다 (PYBO_PERF_ENABLED=0으로 끌 수 있다)
+PYBO_PERF_ENABLED = os.environ.get("PYBO_PERF_ENABLED", "1") == "1"
+if PYBO_PERF_ENABLED:
+    TEMPLATES[0]["BACKEND"] = "pybo.perf.DjangoTemplates"
+
+# PYBO_POSTGRES_DB를 주면 로컬 PostgreSQL을 연결 풀 백엔드로 쓴다 (테스트 포함)
+if os.environ.get("PYBO_POSTGRES_DB"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "common.db.postgresql_pool",
+            "NAME": os.environ["PYBO_POSTGRES_DB"],
+            "USER": os.environ.get("PYBO_POSTGRES_USER", ""),
+            "PASSWORD": os.environ.get("PYBO_POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("PYBO_POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("PYBO_POSTGRES_PORT", "5432"),
+            "POOL": {"MAX_SIZE": 4, "PING_AFTER": 0},
+        }
+    }
+
+# PYBO_REPLICA_DB를 주면 그 DB를 읽기 전용 복제로 쓴다 (common/db/routers.py)
+# SQLite는 파일 경로, PostgreSQL(PYBO_POSTGRES_DB)은 DB 이름
+if os.environ.get("PYBO_REPLICA_DB"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["PYBO_REPLICA_DB"],
+        "TEST": {"MIRROR": "default"},
+    }
+    COMMON_DB_REPLICAS = ["replica"]
@@ -1,16 +1,34 @@
 from .base import *
 
 ALLOWED_HOSTS = ["35.72.146.206", "pybobbs.ga"]
-STATIC_ROOT = BASE_DIR / "static/"
-STATICFILES_DIRS = []
+# collectstatic 결과는 원본(static/)과 다른 곳에 모은다
+STATIC_ROOT = BASE_DIR / "staticfiles"
+STATICFILES_STORAGE = "common.staticfiles.CompressedManifestStaticFilesStorage"
+COMMON_SERVE_STATIC = True
+# 글쓰기 뒤 작업은 run_pybo_worker가 실행한다
+PYBO_TASKS_EAGER = False
+# gunicorn은 127.0.0.1에서 프록시 뒤에 있으므로 REMOTE_ADDR은 항상 프록시 주소다
+# (프록시: proxy_set_header X-Real-IP $remote_addr;)
+COMMON_RATELIMIT_IP_META = "HTTP_X_REAL_IP"
 DEBUG = False
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "common.db.postgresql_pool",  # 연결 풀 (common/db/pool.py)
         "NAME": "pybo",
         "USER": "dbmasteruser",
         "PASSWORD": "uyh>Y>$Vjgqwb#T8]OM5gh5XHQ%an9H!",
         "HOST": "ls-2c9541fba25656f1fc14a134908ed69936494f00.chyzn53nkdwf.ap-northeast-1.rds.amazonaws.com",
         "PORT": "5432",
+        # 연결은 풀이 유지하므로 Django는 요청마다 풀에 돌려놓는다
+        "CONN_MAX_AGE": 0,
+        # 요청 스레드와 ASGI 비동기 view의 DB 스레드(PYBO_ASYNC_DB_THREADS)보다 크게
+        "POOL": {"MAX_SIZE": 12, "IDLE_TIMEOUT": 300, "TIMEOUT": 10, "PING_AFTER": 30},
+    }
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": "127.0.0.1:11211",
     }
 }
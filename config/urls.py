@@ -16,7 +16,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from pybo.views import base_views
+from pybo.urls import read_views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -24,7 +24,7 @@ urlpatterns = [
         "pybo/", include("pybo.urls")
     ),  # pybo로 시작되는 URL은 pybo/urls.py 파일에 있는 URL 매핑을 참고하여 처리하라는 의미.
     path("common/", include("common.urls")),
-    path("", base_views.index, name="index"),
+    path("", read_views.index, name="index"),
 ]
 
 handler404 = "common.views.page_not_found"
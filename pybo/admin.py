@@ -1,10 +1,41 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+
+from . import moderation, tasks
 from .models import Question, Answer
 
 
 class QuestionAdmin(admin.ModelAdmin):
     search_fields = ["subject"]
+    list_filter = ["hidden"]
+
+
+class PyboUserAdmin(UserAdmin):
+    actions = ["purge_spam"]
+
+    def purge_spam(self, request, queryset):
+        """
+        스팸 사용자의 글을 바로 숨기고 삭제는 작업 큐에서 나눠서 한다. (pybo/moderation.py)
+        사용자를 delete()하면 CASCADE로 모든 글을 메모리에 읽어 시간을 넘긴다.
+        """
+        count = 0
+        for user in queryset.exclude(pk=request.user.pk):
+            moderation.hide(user)
+            tasks.enqueue(tasks.purge_user, user.id, key=tasks.purge_key(user.id))
+            count += 1
+        self.message_user(
+            request,
+            "{}人のユーザーの投稿を非表示にしました。削除はバックグラウンドで行います。".format(
+                count
+            ),
+            messages.SUCCESS,
+        )
+
+    purge_spam.short_description = "スパムとして投稿を非表示にして削除"
 
 
 admin.site.register(Question, QuestionAdmin)
 admin.site.register(Answer)
+admin.site.unregister(User)
+admin.site.register(User, PyboUserAdmin)
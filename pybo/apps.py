@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PyboConfig(AppConfig):
     name = "pybo"
+
+    def ready(self):
+        from . import perf, signals  # noqa: F401
@@ -0,0 +1,114 @@
+"""
+pybo 목록 페이지 응답 캐시
+
+캐시 키에 목록 버전을 넣어두고, 질문/답변/추천이 바뀌면 signals.py에서 버전만 올린다.
+(트랜잭션이 커밋된 뒤에 올린다)
+이전 버전의 항목은 다시 읽히지 않고 만료되므로 전체 삭제가 필요 없다.
+버전이 바뀐 직후에는 한 요청만 페이지를 다시 만들고(cache.add 잠금), 나머지는 새 페이지가
+저장될 때까지 기다린다. 이전 버전의 페이지는 주지 않는다.
+(PYBO_LIST_CACHE_LOCK_TIMEOUT이 지나도 없으면 직접 만든다)
+gzip을 받는 요청이 오면 압축한 본문도 한 번만 만들어 함께 저장해서
+CompressionMiddleware가 요청마다 다시 압축하지 않게 한다.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from common import compression
+
+LIST_VERSION_KEY = "pybo:list:version"
+LIST_PARAMS = ("page", "so", "kw", "cursor")
+
+
+def get_list_version():
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        # 버전 키가 사라졌을 때 예전 버전 번호를 다시 쓰지 않도록 시간값으로 시작한다
+        cache.add(LIST_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def bump_list_version():
+    """
+    현재 트랜잭션이 커밋되면 목록 버전을 올린다. (트랜잭션 밖이면 바로)
+    커밋 전에 올리면 다른 요청이 커밋 전 데이터로 만든 페이지가 새 버전으로 저장된다
+    """
+    transaction.on_commit(_bump)
+
+
+def _bump():
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        cache.add(LIST_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _params_key(request):
+    params = "&".join(
+        "{}={}".format(name, request.GET.get(name, "")) for name in LIST_PARAMS
+    )
+    return hashlib.md5(params.encode("utf-8")).hexdigest()
+
+
+def _hit(request, key, cached):
+    content, content_type, compressed = cached
+    if compressed is None and compression.accepts_gzip(request):
+        compressed = compression.compress(content)
+        cache.set(
+            key, (content, content_type, compressed), settings.PYBO_LIST_CACHE_TIMEOUT
+        )
+    response = HttpResponse(content, content_type=content_type)
+    response.compressed_content = compressed  # common/compression.py
+    response["X-Pybo-Cache"] = "hit"
+    return response
+
+
+def cache_list_page(view):
+    """
+    비로그인 GET 요청의 목록 페이지를 캐시한다.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "GET" or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        params = _params_key(request)
+        key = "pybo:list:{}:{}".format(get_list_version(), params)
+        lock_key = key + ":lock"
+
+        cached = cache.get(key)
+        if cached is not None:
+            return _hit(request, key, cached)
+
+        if not cache.add(lock_key, 1, settings.PYBO_LIST_CACHE_LOCK_TIMEOUT):
+            # 다른 요청이 다시 만드는 중: 새 페이지가 저장될 때까지 기다린다
+            deadline = time.monotonic() + settings.PYBO_LIST_CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                cached = cache.get(key)
+                if cached is not None:
+                    return _hit(request, key, cached)
+            return view(request, *args, **kwargs)
+
+        try:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                compressed = None
+                if compression.accepts_gzip(request):
+                    compressed = compression.compress(response.content)
+                    response.compressed_content = compressed
+                entry = (response.content, response["Content-Type"], compressed)
+                cache.set(key, entry, settings.PYBO_LIST_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return response
+
+    return wrapper
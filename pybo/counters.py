@@ -0,0 +1,68 @@
+"""
+pybo 집계 컬럼(vote_count, answer_count, comment_count) 보정
+
+평소에는 views에서 F() 로 증감하고, 여기서는 실제 행 수와 어긋난 값만 다시 계산한다.
+숨긴 답변/댓글(hidden)은 세지 않고, 숨긴 글의 집계값은 지워질 때까지 그대로 둔다.
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Question, Answer, Comment
+
+
+def _count(queryset, field):
+    """
+    OuterRef("pk") 에 대한 행 수 서브쿼리
+    """
+    subquery = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def _repair(queryset, counters):
+    """
+    counters = {컬럼명: 실제값 식}. 하나라도 어긋난 행만 갱신하고 갱신한 행 수를 돌려준다.
+    """
+    annotations = {"real_" + name: expression for name, expression in counters.items()}
+    drift = Q()
+    for name in counters:
+        drift |= ~Q(**{name: F("real_" + name)})
+    stale = queryset.annotate(**annotations).filter(drift).values("pk")
+    return queryset.model.objects.filter(pk__in=stale).update(**counters)
+
+
+def reconcile(question_ids=None):
+    """
+    question_ids가 주어지면 해당 질문과 그 답변만 보정한다.
+    """
+    questions = Question.objects.filter(hidden=False)
+    answers = Answer.objects.filter(hidden=False)
+    if question_ids is not None:
+        questions = questions.filter(pk__in=question_ids)
+        answers = answers.filter(question_id__in=question_ids)
+
+    repaired_questions = _repair(
+        questions,
+        {
+            "vote_count": _count(Question.voter.through.objects, "question"),
+            "answer_count": _count(Answer.objects.filter(hidden=False), "question"),
+            # 답변 댓글도 question을 가지므로 질문 댓글만 센다
+            "comment_count": _count(
+                Comment.objects.filter(answer=None, hidden=False), "question"
+            ),
+        },
+    )
+    repaired_answers = _repair(
+        answers,
+        {
+            "vote_count": _count(Answer.voter.through.objects, "answer"),
+            "comment_count": _count(Comment.objects.filter(hidden=False), "answer"),
+        },
+    )
+    return repaired_questions, repaired_answers
@@ -0,0 +1,100 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "실행 중인 서버(WSGI 또는 ASGI)에 동시 요청을 보내 처리량과 응답시간을 잰다. "
+        "--slow로 요청을 천천히 보내는 느린 클라이언트를 흉내낼 수 있다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="예) http://127.0.0.1:8000/pybo/1/")
+        parser.add_argument("-c", "--concurrency", type=int, default=50)
+        parser.add_argument("-d", "--duration", type=float, default=10.0, help="초")
+        parser.add_argument(
+            "--slow",
+            type=float,
+            default=0.0,
+            help="요청 헤더를 한 줄 보낼 때마다 기다릴 시간(초)",
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for url in options["urls"]:
+            parts = urlsplit(url)
+            if parts.scheme != "http" or not parts.hostname:
+                raise CommandError("http:// URL만 지원합니다: {}".format(url))
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            targets.append((parts.hostname, parts.port or 80, path))
+
+        latencies, errors = asyncio.run(self.run(targets, options))
+        elapsed = options["duration"]
+        if not latencies:
+            raise CommandError("성공한 요청이 없습니다. (오류 {}건)".format(errors))
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+        self.stdout.write(
+            "요청 {}건, 오류 {}건, {:.1f} req/s".format(
+                len(latencies), errors, len(latencies) / elapsed
+            )
+        )
+        self.stdout.write(
+            "응답시간(ms) 평균 {:.1f}, p50 {:.1f}, p95 {:.1f}, p99 {:.1f}, 최대 {:.1f}".format(
+                statistics.mean(latencies) * 1000,
+                percentile(0.50),
+                percentile(0.95),
+                percentile(0.99),
+                latencies[-1] * 1000,
+            )
+        )
+
+    async def run(self, targets, options):
+        latencies = []
+        errors = 0
+        deadline = time.monotonic() + options["duration"]
+
+        async def client(number):
+            nonlocal errors
+            host, port, path = targets[number % len(targets)]
+            while time.monotonic() < deadline:
+                started = time.monotonic()
+                try:
+                    await self.request(host, port, path, options["slow"])
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    continue
+                latencies.append(time.monotonic() - started)
+
+        await asyncio.gather(*(client(n) for n in range(options["concurrency"])))
+        return latencies, errors
+
+    async def request(self, host, port, path, slow):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            lines = [
+                "GET {} HTTP/1.1".format(path),
+                "Host: {}:{}".format(host, port),
+                "Connection: close",
+                "",
+            ]
+            for line in lines:
+                writer.write((line + "\r\n").encode("latin-1"))
+                await writer.drain()
+                if slow:
+                    await asyncio.sleep(slow)
+            status = await reader.readline()
+            if not status.startswith(b"HTTP/1.") or int(status.split()[1]) >= 500:
+                raise ValueError(status)
+            await reader.read()
+        finally:
+            writer.close()
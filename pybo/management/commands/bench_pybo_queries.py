@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from pybo.models import Question
+
+# (이름, 바꿀 설정)
+CONFIGS = [
+    (
+        "DB 세션",
+        {
+            "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+            "AUTHENTICATION_BACKENDS": ["django.contrib.auth.backends.ModelBackend"],
+        },
+    ),
+    (
+        "캐시 세션",
+        {
+            "SESSION_ENGINE": "common.sessions",
+            "AUTHENTICATION_BACKENDS": ["common.backends.CachedModelBackend"],
+        },
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "로그인한 사용자로 주요 화면을 요청해, DB 세션/사용자 조회와 "
+        "캐시 세션/사용자 캐시(common/)의 화면별 쿼리 수와 시간을 비교한다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", default=None, help="생략하면 첫 번째 사용자")
+        parser.add_argument("-n", "--requests", type=int, default=5)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk")
+        if options["username"]:
+            users = users.filter(username=options["username"])
+        user = users.first()
+        question = Question.objects.order_by("-answer_count").first()
+        if user is None or question is None:
+            raise CommandError("사용자와 질문이 필요합니다. seed_pybo로 만드세요.")
+
+        pages = [
+            ("목록", reverse("index")),
+            ("상세", reverse("pybo:detail", args=[question.id])),
+            ("API 목록", reverse("pybo:api_question_list")),
+            ("API 상세", reverse("pybo:api_question_thread", args=[question.id])),
+        ]
+        results = {}
+        for label, overrides in CONFIGS:
+            with override_settings(ALLOWED_HOSTS=["testserver"], **overrides):
+                client = Client()
+                client.force_login(user)
+                for name, url in pages:
+                    client.get(url)  # 캐시를 채운다
+                    results[label, name] = self.measure(client, url, options)
+                client.logout()
+
+        self.stdout.write(
+            "{:<10}{:>12}{:>12}{:>10}".format(
+                "화면", *(label for label, _ in CONFIGS), "줄어든 쿼리"
+            )
+        )
+        for name, _ in pages:
+            before, after = (results[label, name] for label, _ in CONFIGS)
+            self.stdout.write(
+                "{:<10}{:>8} ({:.0f}ms){:>8} ({:.0f}ms){:>10}".format(
+                    name, before[0], before[1], after[0], after[1], before[0] - after[0]
+                )
+            )
+
+    def measure(self, client, url, options):
+        """
+        요청 한 번의 (쿼리 수, 평균 시간 ms)
+        """
+        counts, elapsed = [], 0.0
+        for _ in range(options["requests"]):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            counts.append(len(queries))
+            timing = response.get("Server-Timing", "")
+            elapsed += self.total_ms(timing)
+        return max(counts), elapsed / options["requests"]
+
+    def total_ms(self, timing):
+        # pybo.perf.PerformanceMiddleware가 붙인 total 값
+        for metric in timing.split(","):
+            name, _, params = metric.strip().partition(";")
+            if name == "total":
+                return float(params.partition("dur=")[2] or 0)
+        return 0.0
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from pybo import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "hot_score의 기준 시각을 지금으로 옮기고 점수를 줄인다. cron 등으로 주기적으로 실행한다. "
+        "--recompute이면 추천/답변 시각으로 모든 점수를 다시 계산한다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recompute", action="store_true", help="모든 점수를 다시 계산한다."
+        )
+
+    def handle(self, *args, **options):
+        if options["recompute"]:
+            ranking.recompute()
+            self.stdout.write(self.style.SUCCESS("hot_score를 다시 계산했습니다."))
+            return
+        updated = ranking.decay()
+        self.stdout.write(
+            self.style.SUCCESS("질문 {}개의 hot_score를 줄였습니다.".format(updated))
+        )
@@ -0,0 +1,129 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from pybo.models import Question, load_comments
+from pybo.views.base_views import SORT_ORDERS, list_questions, paginate_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "목록/검색/상세화면이 실행하는 쿼리에 EXPLAIN을 실행해 실행계획을 보여주고, "
+        "테이블 전체를 읽는 쿼리(SQLite: SCAN, PostgreSQL: Seq Scan)가 있으면 실패한다. "
+        "플래너가 실제 데이터 양을 보고 고른 계획이어야 하므로 "
+        "seed_pybo로 데이터를 만든 DB에서 실행한다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kw", default="django", help="검색 쿼리에 쓸 검색어")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError("지원하지 않는 DB입니다: {}".format(connection.vendor))
+        question = Question.objects.order_by("-answer_count").first()
+        if question is None:
+            raise CommandError("질문이 없습니다. seed_pybo로 데이터를 먼저 만드세요.")
+
+        failures = []
+        for name, run in self.cases(question, options["kw"]):
+            for sql, params in self.capture(run):
+                plan = self.explain(sql, params)
+                scans = self.full_scans(plan)
+                style = self.style.ERROR if scans else self.style.SUCCESS
+                self.stdout.write(style("[{}] {}".format(name, sql[:120])))
+                for line in plan:
+                    self.stdout.write("    " + line)
+                if scans:
+                    failures.append(name)
+
+        if failures:
+            raise CommandError(
+                "전체 테이블을 읽는 쿼리가 있습니다: {}".format(
+                    ", ".join(sorted(set(failures)))
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("모든 쿼리가 인덱스를 사용합니다."))
+
+    def cases(self, question, kw):
+        """
+        (이름, 쿼리를 실행하는 함수) 목록. 화면과 같은 queryset이 되도록 view의 함수
+        (list_questions, paginate_questions, with_thread)로 만든다.
+        목록의 전체 건수(COUNT)는 캐시되므로 제외한다.
+        """
+
+        def list_pages(so):
+            def run():
+                queryset = list_questions(so, "")
+                first = paginate_questions(queryset, so, "")
+                second = paginate_questions(queryset, so, "", first.next_cursor)
+                paginate_questions(queryset, so, "", second.previous_cursor)
+
+            return run
+
+        def search_page():
+            # 검색은 페이지 번호 방식이라 paginate_questions는 COUNT도 실행한다
+            list(list_questions("recent", kw)[:10])
+
+        def detail():
+            Question.objects.thread_version(question.id)
+            load_comments(Question.objects.with_thread().filter(pk=question.id))
+
+        cases = [("list:" + so, list_pages(so)) for so in SORT_ORDERS]
+        cases.append(("search", search_page))
+        cases.append(("detail", detail))
+        return cases
+
+    def capture(self, run):
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            run()
+        return queries
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                return [row[3] for row in cursor.fetchall()]
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines = []
+        self.walk(plan[0]["Plan"], 0, lines)
+        return lines
+
+    def walk(self, node, depth, lines):
+        line = node["Node Type"]
+        if "Relation Name" in node:
+            line += " on " + node["Relation Name"]
+        if "Index Name" in node:
+            line += " using " + node["Index Name"]
+        lines.append("  " * depth + line)
+        for child in node.get("Plans", []):
+            self.walk(child, depth + 1, lines)
+
+    def full_scans(self, plan):
+        """
+        plan에서 테이블 전체를 읽는 줄
+        """
+        if connection.vendor == "postgresql":
+            return [line for line in plan if line.strip().startswith("Seq Scan")]
+        # SQLite: "SCAN 테이블"은 전체 읽기, "SCAN 테이블 USING INDEX"는 인덱스 순서대로
+        # 읽기다. 인덱스로 읽어도 따로 정렬(TEMP B-TREE)한다면 LIMIT 전에 전부 읽는다.
+        sorted_later = any("TEMP B-TREE FOR ORDER BY" in line for line in plan)
+        scans = []
+        for line in plan:
+            line = line.strip()
+            if not line.startswith("SCAN ") or "VIRTUAL TABLE" in line:
+                continue
+            if "CONSTANT ROW" in line:
+                continue
+            if "USING" not in line or sorted_later:
+                scans.append(line)
+        return scans
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pybo import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "사용자, 질문, 답변, 댓글, 추천을 JSONL 파일로 내보낸다. "
+        "--resume이면 파일의 마지막 줄 다음 행부터 이어서 쓴다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="내보낼 파일. -이면 표준출력")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--resume", action="store_true", help="중단된 내보내기를 이어서 한다."
+        )
+        parser.add_argument(
+            "--no-passwords",
+            action="store_true",
+            help="사용자의 비밀번호 해시를 빼고 내보낸다.",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        after = None
+        if output == "-":
+            if options["resume"]:
+                raise CommandError("표준출력으로는 이어서 내보낼 수 없습니다.")
+            stream = sys.stdout
+        else:
+            if options["resume"] and os.path.exists(output):
+                after = self.last_row(output)
+            stream = open(output, "a" if after else "w", encoding="utf-8")
+
+        lines = transfer.export_lines(
+            chunk_size=options["chunk_size"],
+            after=after,
+            passwords=not options["no_passwords"],
+        )
+        count = 0
+        try:
+            for line in lines:
+                stream.write(line)
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        if output != "-":
+            self.stdout.write(self.style.SUCCESS("{}줄을 내보냈습니다.".format(count)))
+
+    def last_row(self, path):
+        """
+        마지막으로 다 쓴 줄의 (종류, id). 쓰다 만 마지막 줄은 잘라낸다.
+        """
+        with open(path, "rb+") as f:
+            end = rfind_newline(f, f.seek(0, os.SEEK_END))
+            f.truncate(end + 1)
+            if end < 0:
+                return None
+            start = rfind_newline(f, end) + 1
+            f.seek(start)
+            row = json.loads(f.read(end - start))
+        return row["type"], row["id"]
+
+
+def rfind_newline(f, before, block_size=64 * 1024):
+    """
+    파일에서 before 위치 앞의 마지막 줄바꿈 위치. 없으면 -1 (끝에서부터 블록 단위로 읽는다)
+    """
+    while before > 0:
+        start = max(before - block_size, 0)
+        f.seek(start)
+        index = f.read(before - start).rfind(b"\n")
+        if index >= 0:
+            return start + index
+        before = start
+    return -1
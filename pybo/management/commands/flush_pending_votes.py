@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pybo import votes
+
+
+class Command(BaseCommand):
+    help = (
+        "버퍼(PendingVote)에 쌓인 질문 추천을 반영한다. "
+        "--interval이면 끝나지 않고 PYBO_VOTE_FLUSH_INTERVAL초마다 반복한다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", action="store_true", help="주기적으로 계속 반영한다."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="트랜잭션 하나에 반영할 추천 수",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            added = votes.flush(options["batch_size"])
+            if added or not options["interval"]:
+                self.stdout.write("추천 {}개를 반영했습니다.".format(added))
+            if not options["interval"]:
+                return
+            close_old_connections()
+            time.sleep(settings.PYBO_VOTE_FLUSH_INTERVAL)
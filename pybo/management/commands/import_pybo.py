@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pybo import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "export_pybo로 내보낸 JSONL 파일을 가져온다. id는 새로 매기고, "
+        "같은 username의 사용자는 기존 사용자로 연결한다. "
+        "중단되면 같은 --job으로 다시 실행해 이어서 가져온다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="가져올 JSONL 파일")
+        parser.add_argument(
+            "--job", default=None, help="진행 상황을 기록할 이름. 생략하면 파일 경로"
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["input"])
+        if not os.path.exists(path):
+            raise CommandError("파일이 없습니다: {}".format(path))
+        importer = transfer.Importer(
+            options["job"] or path, chunk_size=options["chunk_size"]
+        )
+        if importer.finished:
+            raise CommandError(
+                "이미 가져온 파일입니다. (job: {})".format(importer.checkpoint.job)
+            )
+        if importer.checkpoint.line:
+            self.stdout.write(
+                "{}번째 줄부터 이어서 가져옵니다.".format(importer.checkpoint.line + 1)
+            )
+
+        def progress(number):
+            self.stdout.write("{}줄".format(number))
+
+        with open(path, encoding="utf-8") as f:
+            try:
+                count = importer.run(f, progress)
+            except transfer.TransferError as e:
+                raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS("{}줄을 가져왔습니다.".format(count)))
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from pybo import moderation
+
+
+class Command(BaseCommand):
+    help = (
+        "스팸 사용자의 글을 숨기고 batch-size개씩 나눠 지운 뒤 사용자도 지운다. "
+        "(CASCADE로 한 번에 지우면 모든 행을 메모리에 읽는다)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", nargs="+")
+        parser.add_argument(
+            "--batch-size", type=int, help="트랜잭션 하나에서 지울 행 수"
+        )
+        parser.add_argument(
+            "--hide-only", action="store_true", help="숨기기만 하고 지우지 않는다."
+        )
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__in=options["username"]))
+        missing = set(options["username"]) - {user.username for user in users}
+        if missing:
+            raise CommandError(
+                "없는 사용자입니다: {}".format(", ".join(sorted(missing)))
+            )
+
+        for user in users:
+            repaired = moderation.hide(user)
+            self.stdout.write(
+                "{}: 글을 숨겼습니다. (집계값을 고친 질문 {}개)".format(
+                    user.username, repaired
+                )
+            )
+            if options["hide_only"]:
+                continue
+            deleted = {}
+
+            def progress(name, count):
+                deleted[name] = deleted.get(name, 0) + count
+                self.stdout.write("  {} {}개 삭제".format(name, deleted[name]))
+
+            moderation.purge(user.id, options["batch_size"], progress)
+            self.stdout.write("{}: 삭제했습니다.".format(user.username))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pybo import search
+
+
+class Command(BaseCommand):
+    help = "pybo 질문 검색 인덱스를 처음부터 다시 만든다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recreate",
+            action="store_true",
+            help="인덱스 테이블을 지우고 새로 만든 뒤 채운다.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["recreate"]:
+                search.drop_index_table()
+                search.create_index_table()
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS("검색 인덱스를 다시 만들었습니다."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pybo import counters
+
+
+class Command(BaseCommand):
+    help = "질문/답변의 추천수, 답변수, 댓글수 집계 컬럼을 실제 행 수에 맞춘다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "question_ids",
+            nargs="*",
+            type=int,
+            help="보정할 질문 id (생략하면 전체)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            questions, answers = counters.reconcile(options["question_ids"] or None)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "질문 {}건, 답변 {}건의 집계값을 보정했습니다.".format(
+                    questions, answers
+                )
+            )
+        )
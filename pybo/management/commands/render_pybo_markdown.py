@@ -0,0 +1,70 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from pybo import rendering
+from pybo.models import Question, Answer
+
+
+class Command(BaseCommand):
+    help = "질문/답변의 Markdown을 여러 프로세스에서 렌더링해 content_html에 저장한다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="한 번에 렌더링/저장할 행 수"
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="content_hash가 최신이어도 다시 렌더링한다.",
+        )
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            for model in (Question, Answer):
+                count = self.render_model(pool, model, options)
+                self.stdout.write("{}: {}건 렌더링".format(model.__name__, count))
+        self.stdout.write(self.style.SUCCESS("Markdown 렌더링을 마쳤습니다."))
+
+    def batches(self, model, options):
+        rows = (
+            model.objects.order_by("pk")
+            .values_list("pk", "content", "content_hash")
+            .iterator(chunk_size=options["batch_size"])
+        )
+        batch = []
+        for pk, content, content_hash in rows:
+            if options["force"] or content_hash != rendering.digest(content):
+                batch.append((pk, content))
+            if len(batch) >= options["batch_size"]:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def render_model(self, pool, model, options):
+        count = 0
+        pending = deque()
+        # Executor.map은 모든 배치를 한꺼번에 제출하므로 진행 중인 배치 수를 직접 제한한다
+        for batch in self.batches(model, options):
+            pending.append(pool.submit(rendering.render_rows, batch))
+            if len(pending) >= options["workers"] * 2:
+                count += self.save(model, pending.popleft().result())
+        while pending:
+            count += self.save(model, pending.popleft().result())
+        return count
+
+    def save(self, model, rendered):
+        model.objects.bulk_update(
+            [
+                model(pk=pk, content_html=html, content_hash=content_hash)
+                for pk, html, content_hash in rendered
+            ],
+            ["content_html", "content_hash"],
+        )
+        return len(rendered)
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from pybo import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "백그라운드 작업 큐(Task)의 작업을 실행한다. "
+        "--once가 없으면 끝나지 않고 새 작업을 기다린다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, help="작업을 실행할 스레드 수")
+        parser.add_argument(
+            "--once", action="store_true", help="대기 중인 작업만 실행하고 끝낸다."
+        )
+        parser.add_argument(
+            "--stats", action="store_true", help="큐 길이와 대기 시간만 출력한다."
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(tasks.stats()))
+            return
+        worker = tasks.Worker(threads=options["threads"])
+        if not options["once"]:
+            worker.run()
+        total = 0
+        while True:
+            count = worker.run_once()
+            if not count:
+                break
+            total += count
+        worker.executor.shutdown()
+        self.stdout.write("작업 {}개를 실행했습니다.".format(total))
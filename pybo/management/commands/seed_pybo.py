@@ -0,0 +1,262 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from pybo import caching, ranking, rendering, search
+from pybo.models import Question, Answer, Comment, QuestionVote, AnswerVote
+
+WORDS = (
+    "django python query index cache page 질문 답변 댓글 파이썬 장고 데이터베이스 "
+    "모델 뷰 템플릿 배포 서버 성능 質問 回答 設定 エラー 検索 速度 レスポンス "
+    "migration queryset template request response session static markdown"
+).split()
+
+CODE = (
+    "from django.db import models\n\n\n"
+    "class Question(models.Model):\n"
+    "    subject = models.CharField(max_length=200)\n",
+    "Question.objects.order_by('-create_date')[:10]\n",
+    "$ python manage.py migrate\n$ python manage.py runserver\n",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "벤치마크용 pybo 데이터를 만든다. 같은 --seed, --end이면 같은 데이터가 만들어진다. "
+        "답변/댓글/추천 수는 일부 질문에 몰리는 분포를 따른다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--questions", type=int, default=10000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="한 번에 bulk_create할 질문 수"
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="작성일시를 퍼뜨릴 기간"
+        )
+        parser.add_argument(
+            "--end",
+            default=None,
+            help="가장 최근 작성일(YYYY-MM-DD). 생략하면 오늘",
+        )
+        parser.add_argument("--max-answers", type=int, default=50)
+        parser.add_argument(
+            "--bodies", type=int, default=1000, help="미리 만들어 돌려쓸 본문 수"
+        )
+        parser.add_argument(
+            "--no-index", action="store_true", help="검색 인덱스를 다시 만들지 않는다."
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        end = (
+            datetime.strptime(options["end"], "%Y-%m-%d").date()
+            if options["end"]
+            else timezone.localdate()
+        )
+        self.end = timezone.make_aware(datetime.combine(end, time.min))
+        self.span = options["days"] * 24 * 60 * 60
+        self.bodies = self.make_bodies(options["bodies"])
+
+        user_ids = self.create_users(options["users"])
+        self.stdout.write("사용자 {}명".format(len(user_ids)))
+
+        next_ids = {
+            model: (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+            for model in (Question, Answer)
+        }
+        totals = {"questions": 0, "answers": 0, "comments": 0, "votes": 0}
+        remaining = options["questions"]
+        while remaining > 0:
+            size = min(options["chunk_size"], remaining)
+            with transaction.atomic():
+                self.create_chunk(size, user_ids, next_ids, totals, options)
+            remaining -= size
+            self.stdout.write(
+                "질문 {questions}, 답변 {answers}, 댓글 {comments}, 추천 {votes}".format(
+                    **totals
+                )
+            )
+
+        self.reset_sequences()
+        ranking.recompute()
+        if not options["no_index"]:
+            search.rebuild()
+        caching.bump_list_version()
+        self.stdout.write(self.style.SUCCESS("데이터를 만들었습니다."))
+
+    def make_bodies(self, count):
+        """
+        Markdown 본문을 미리 만들고 렌더링해 둔다. (content, content_html, content_hash)
+        """
+        rng = self.rng
+        bodies = []
+        for _ in range(count):
+            blocks = []
+            for _ in range(rng.randint(1, 6)):
+                kind = rng.random()
+                words = rng.choices(WORDS, k=rng.randint(5, 60))
+                if kind < 0.1:
+                    blocks.append("## " + " ".join(words[:5]))
+                elif kind < 0.25:
+                    blocks.append("\n".join("- " + word for word in words[:6]))
+                elif kind < 0.35:
+                    blocks.append("```\n" + rng.choice(CODE) + "```")
+                else:
+                    words[0] = "**{}**".format(words[0])
+                    blocks.append(" ".join(words))
+            content = "\n\n".join(blocks)
+            bodies.append(
+                (content, rendering.render(content), rendering.digest(content))
+            )
+        return bodies
+
+    def create_users(self, count):
+        existing = User.objects.filter(username__startswith="seed").count()
+        password = make_password("pybo1234")  # 해시는 한 번만 계산한다
+        users = [
+            User(
+                username="seed{}".format(n),
+                email="seed{}@example.com".format(n),
+                password=password,
+                date_joined=self.end,
+            )
+            for n in range(existing, count)
+        ]
+        User.objects.bulk_create(users, batch_size=5000)
+        return list(
+            User.objects.filter(username__startswith="seed")
+            .order_by("pk")
+            .values_list("pk", flat=True)[:count]
+        )
+
+    def skewed(self, alpha, limit):
+        # 파레토 분포: 대부분 0~1개, 일부 질문에 많이 몰린다
+        return min(int(self.rng.paretovariate(alpha)) - 1, limit)
+
+    def date_after(self, start):
+        remaining = max((self.end - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.random() * remaining)
+
+    def body(self):
+        return self.rng.choice(self.bodies)
+
+    def create_chunk(self, size, user_ids, next_ids, totals, options):
+        rng = self.rng
+        questions, answers, comments = [], [], []
+        question_votes, answer_votes = [], []
+
+        for _ in range(size):
+            question_id = next_ids[Question]
+            next_ids[Question] += 1
+            author = rng.choice(user_ids)
+            created = self.end - timedelta(seconds=rng.random() * self.span)
+            content, html, digest = self.body()
+            question = Question(
+                id=question_id,
+                subject=" ".join(rng.choices(WORDS, k=rng.randint(2, 8))),
+                content=content,
+                content_html=html,
+                content_hash=digest,
+                author_id=author,
+                create_date=created,
+            )
+
+            voters = self.voters(user_ids, author, self.skewed(1.2, len(user_ids)))
+            question.vote_count = len(voters)
+            question_votes += [
+                QuestionVote(
+                    question_id=question_id,
+                    user_id=user,
+                    create_date=self.date_after(created),
+                )
+                for user in voters
+            ]
+
+            question.comment_count = self.skewed(2.0, 20)
+            comments += [
+                Comment(
+                    question_id=question_id,
+                    author_id=rng.choice(user_ids),
+                    content=" ".join(rng.choices(WORDS, k=rng.randint(3, 20))),
+                    create_date=self.date_after(created),
+                )
+                for _ in range(question.comment_count)
+            ]
+
+            question.answer_count = self.skewed(1.5, options["max_answers"])
+            for _ in range(question.answer_count):
+                answer_id = next_ids[Answer]
+                next_ids[Answer] += 1
+                answer_author = rng.choice(user_ids)
+                answer_created = self.date_after(created)
+                content, html, digest = self.body()
+                answer = Answer(
+                    id=answer_id,
+                    question_id=question_id,
+                    content=content,
+                    content_html=html,
+                    content_hash=digest,
+                    author_id=answer_author,
+                    create_date=answer_created,
+                )
+                voters = self.voters(
+                    user_ids, answer_author, self.skewed(1.4, len(user_ids))
+                )
+                answer.vote_count = len(voters)
+                answer_votes += [
+                    AnswerVote(
+                        answer_id=answer_id,
+                        user_id=user,
+                        create_date=self.date_after(answer_created),
+                    )
+                    for user in voters
+                ]
+                answer.comment_count = self.skewed(2.0, 20)
+                comments += [
+                    Comment(
+                        question_id=question_id,
+                        answer_id=answer_id,
+                        author_id=rng.choice(user_ids),
+                        content=" ".join(rng.choices(WORDS, k=rng.randint(3, 20))),
+                        create_date=self.date_after(answer_created),
+                    )
+                    for _ in range(answer.comment_count)
+                ]
+                answers.append(answer)
+            questions.append(question)
+
+        batch_size = options["chunk_size"]
+        Question.objects.bulk_create(questions, batch_size=batch_size)
+        Answer.objects.bulk_create(answers, batch_size=batch_size)
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        QuestionVote.objects.bulk_create(question_votes, batch_size=batch_size)
+        AnswerVote.objects.bulk_create(answer_votes, batch_size=batch_size)
+
+        totals["questions"] += len(questions)
+        totals["answers"] += len(answers)
+        totals["comments"] += len(comments)
+        totals["votes"] += len(question_votes) + len(answer_votes)
+
+    def voters(self, user_ids, author, count):
+        """
+        글쓴이를 제외한 서로 다른 사용자 count명
+        """
+        voters = self.rng.sample(user_ids, min(count + 1, len(user_ids)))
+        return [user for user in voters if user != author][:count]
+
+    def reset_sequences(self):
+        # id를 직접 넣었으므로 PostgreSQL 시퀀스를 맞춘다 (SQLite는 필요 없음)
+        statements = connection.ops.sequence_reset_sql(no_style(), [Question, Answer])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# 이 마이그레이션을 만들 때의 pybo/search.py SQL.
+# 나중에 search.py가 바뀌어도 새로 migrate한 DB가 달라지지 않도록 복사해둔다
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pybo_question_search "
+    "USING fts5(subject, content, authors, tokenize='trigram')",
+]
+
+SQLITE_INDEX = """
+    INSERT INTO pybo_question_search (rowid, subject, content, authors)
+    SELECT q.id, q.subject, q.content,
+           u.username || ' ' || coalesce((
+               SELECT group_concat(DISTINCT au.username)
+               FROM pybo_answer a JOIN auth_user au ON au.id = a.author_id
+               WHERE a.question_id = q.id
+           ), '')
+    FROM pybo_question q JOIN auth_user u ON u.id = q.author_id
+"""
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS pybo_question_search (
+        question_id integer PRIMARY KEY
+            REFERENCES pybo_question (id)
+            ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document text NOT NULL,
+        vector tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS pybo_question_search_vector "
+    "ON pybo_question_search USING gin (vector)",
+    "CREATE INDEX IF NOT EXISTS pybo_question_search_document_trgm "
+    "ON pybo_question_search USING gin (document gin_trgm_ops)",
+]
+
+POSTGRES_INDEX = """
+    INSERT INTO pybo_question_search (question_id, document, vector)
+    SELECT src.id,
+           concat_ws(' ', src.subject, src.content, src.authors),
+           setweight(to_tsvector('simple', src.subject), 'A')
+           || setweight(to_tsvector('simple', src.authors), 'B')
+           || setweight(to_tsvector('simple', src.content), 'C')
+    FROM (
+        SELECT q.id, q.subject, q.content,
+               u.username || ' ' || coalesce((
+                   SELECT string_agg(DISTINCT au.username, ' ')
+                   FROM pybo_answer a JOIN auth_user au ON au.id = a.author_id
+                   WHERE a.question_id = q.id
+               ), '')
+        FROM pybo_question q JOIN auth_user u ON u.id = q.author_id
+    ) AS src (id, subject, content, authors)
+"""
+
+SQL = {
+    'sqlite': (SQLITE_CREATE, SQLITE_INDEX),
+    'postgresql': (POSTGRES_CREATE, POSTGRES_INDEX),
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in SQL:
+        raise NotImplementedError(
+            '검색 인덱스는 {} 데이터베이스를 지원하지 않습니다.'.format(vendor)
+        )
+    create, index = SQL[vendor]
+    with schema_editor.connection.cursor() as cursor:
+        for sql in create:
+            cursor.execute(sql)
+        cursor.execute(index)
+
+
+def drop_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS pybo_question_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0006_auto_20210720_2016'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
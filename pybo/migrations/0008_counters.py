@@ -0,0 +1,75 @@
+# Generated by Django 3.1.3 on 2026-10-18 15:46
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    subquery = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Question = apps.get_model('pybo', 'Question')
+    Answer = apps.get_model('pybo', 'Answer')
+    Comment = apps.get_model('pybo', 'Comment')
+    Question.objects.update(
+        vote_count=_count(Question.voter.through.objects, 'question'),
+        answer_count=_count(Answer.objects, 'question'),
+        comment_count=_count(Comment.objects, 'question'),
+    )
+    Answer.objects.update(
+        vote_count=_count(Answer.voter.through.objects, 'answer'),
+        comment_count=_count(Comment.objects, 'answer'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0007_question_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-vote_count', '-create_date'], name='pybo_q_vote_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-answer_count', '-create_date'], name='pybo_q_answer_count_idx'),
+        ),
+    ]
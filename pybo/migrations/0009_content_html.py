@@ -0,0 +1,33 @@
+# Generated by Django 3.1.3 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
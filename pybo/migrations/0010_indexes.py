@@ -0,0 +1,90 @@
+# Generated by Django 3.1.3 on 2026-10-18 15:57
+
+import logging
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+logger = logging.getLogger(__name__)
+
+
+def fix_comment_parents(apps, schema_editor):
+    # 제약조건을 걸기 전에 부모가 둘 다 있거나 없는 댓글을 확인한다
+    Comment = apps.get_model('pybo', 'Comment')
+    orphans = list(
+        Comment.objects.filter(question__isnull=True, answer__isnull=True)
+        .values_list('pk', flat=True)
+    )
+    if orphans:
+        # 지우지 않는다. 어디에 달린 댓글인지 확인한 뒤 직접 고치고 다시 실행한다
+        raise RuntimeError(
+            '질문도 답변도 없는 댓글이 있습니다: {}'.format(orphans)
+        )
+    both = Comment.objects.filter(question__isnull=False, answer__isnull=False)
+    ids = list(both.values_list('pk', flat=True))
+    if ids:
+        # 답변 댓글로 둔다 (0013에서 그 답변의 질문을 다시 채운다)
+        logger.warning('질문과 답변이 둘 다 있는 댓글을 답변 댓글로 고칩니다: %s', ids)
+        both.update(question=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0009_content_html'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='question',
+            name='pybo_q_vote_count_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='question',
+            name='pybo_q_answer_count_idx',
+        ),
+        migrations.AlterField(
+            model_name='answer',
+            name='question',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='pybo.question'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='answer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='pybo.answer'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='question',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='pybo.question'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'create_date', 'id'], name='pybo_a_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(question__isnull=False), fields=['question', 'create_date', 'id'], name='pybo_c_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(answer__isnull=False), fields=['answer', 'create_date', 'id'], name='pybo_c_answer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-create_date', '-id'], name='pybo_q_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-vote_count', '-create_date', '-id'], name='pybo_q_vote_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-answer_count', '-create_date', '-id'], name='pybo_q_answer_count_idx'),
+        ),
+        migrations.RunPython(fix_comment_parents, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='comment',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('answer__isnull', True), ('question__isnull', False)), models.Q(('answer__isnull', False), ('question__isnull', True)), _connector='OR'), name='pybo_comment_one_parent'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.3 on 2026-10-18 16:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0010_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=255, unique=True)),
+                ('line', models.PositiveIntegerField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('modify_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransferIdMap',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('old_id', models.BigIntegerField()),
+                ('new_id', models.BigIntegerField()),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pybo.transfercheckpoint')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='transferidmap',
+            constraint=models.UniqueConstraint(fields=('checkpoint', 'kind', 'old_id'), name='pybo_transfer_id_unique'),
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 3.1.3 on 2026-10-18 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_vote_dates(apps, schema_editor):
+    # 추천 시각을 모르는 기존 추천은 글 작성일로 둔다
+    Question = apps.get_model('pybo', 'Question')
+    Answer = apps.get_model('pybo', 'Answer')
+    QuestionVote = apps.get_model('pybo', 'QuestionVote')
+    AnswerVote = apps.get_model('pybo', 'AnswerVote')
+    QuestionVote.objects.update(
+        create_date=Subquery(
+            Question.objects.filter(pk=OuterRef('question_id')).values('create_date')
+        )
+    )
+    AnswerVote.objects.update(
+        create_date=Subquery(
+            Answer.objects.filter(pk=OuterRef('answer_id')).values('create_date')
+        )
+    )
+
+
+# 이 마이그레이션을 만들 때의 pybo/ranking.py 계산과 설정값.
+# 나중에 코드나 설정이 바뀌어도 이 마이그레이션의 결과는 바뀌지 않도록 복사해둔다
+HALF_LIFE = 24 * 60 * 60
+QUESTION_WEIGHT = 1.0
+VOTE_WEIGHT = 1.0
+ANSWER_WEIGHT = 2.0
+MIN_SCORE = 0.01
+MAX_EXPONENT = 1000
+
+
+def weight_at(weight, when, epoch):
+    exponent = (when - epoch).total_seconds() / HALF_LIFE
+    return weight * 2 ** min(exponent, MAX_EXPONENT)
+
+
+def fill_hot_scores(apps, schema_editor):
+    # pybo/ranking.py의 recompute()와 같은 계산 (역사적 모델 사용)
+    Question = apps.get_model('pybo', 'Question')
+    Answer = apps.get_model('pybo', 'Answer')
+    QuestionVote = apps.get_model('pybo', 'QuestionVote')
+    HotEpoch = apps.get_model('pybo', 'HotEpoch')
+    epoch = HotEpoch.objects.create(pk=1, date=django.utils.timezone.now()).date
+    scores = {}
+    for pk, date in Question.objects.values_list('pk', 'create_date').iterator():
+        scores[pk] = weight_at(QUESTION_WEIGHT, date, epoch)
+    sources = (
+        (QuestionVote.objects, VOTE_WEIGHT),
+        (Answer.objects, ANSWER_WEIGHT),
+    )
+    for queryset, weight in sources:
+        rows = queryset.values_list('question_id', 'create_date').iterator()
+        for pk, date in rows:
+            scores[pk] += weight_at(weight, date, epoch)
+    Question.objects.bulk_update(
+        [
+            Question(pk=pk, hot_score=score)
+            for pk, score in scores.items()
+            if score >= MIN_SCORE
+        ],
+        ['hot_score'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pybo', '0011_transfer'),
+    ]
+
+    operations = [
+        # 자동으로 만들어진 중간 테이블(pybo_question_voter, pybo_answer_voter)을
+        # 그대로 쓰는 모델로 바꾼다. DB는 바뀌지 않는다.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='QuestionVote',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pybo.question')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'pybo_question_voter',
+                        'unique_together': {('question', 'user')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='AnswerVote',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pybo.answer')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'pybo_answer_voter',
+                        'unique_together': {('answer', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='question',
+                    name='voter',
+                    field=models.ManyToManyField(related_name='voter_question', through='pybo.QuestionVote', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='answer',
+                    name='voter',
+                    field=models.ManyToManyField(related_name='voter_answer', through='pybo.AnswerVote', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='questionvote',
+            name='create_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='answervote',
+            name='create_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_vote_dates, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='HotEpoch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-hot_score', '-create_date', '-id'], name='pybo_q_hot_idx'),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.1.3 on 2026-10-18 18:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_comment_questions(apps, schema_editor):
+    # 답변 댓글에 그 답변의 질문을 채운다
+    Answer = apps.get_model('pybo', 'Answer')
+    Comment = apps.get_model('pybo', 'Comment')
+    Comment.objects.filter(answer__isnull=False).update(
+        question=models.Subquery(
+            Answer.objects.filter(pk=models.OuterRef('answer_id')).values('question_id')[:1]
+        )
+    )
+
+
+def clear_comment_questions(apps, schema_editor):
+    Comment = apps.get_model('pybo', 'Comment')
+    Comment.objects.filter(answer__isnull=False).update(question=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0012_vote_dates_hot_score'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='comment',
+            name='pybo_comment_one_parent',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='pybo_c_question_idx',
+        ),
+        migrations.RunPython(fill_comment_questions, clear_comment_questions),
+        migrations.AlterField(
+            model_name='comment',
+            name='question',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='pybo.question'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['question', 'create_date', 'id'], name='pybo_c_question_idx'),
+        ),
+    ]
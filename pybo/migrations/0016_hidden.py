@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-18 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pybo', '0015_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='hidden',
+            field=models.BooleanField(default=False),
+        ),
+    ]
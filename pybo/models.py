@@ -1,30 +1,260 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import rendering
+
+
+def load_comments(questions):
+    """
+    질문들의 스레드에 달린 댓글을 쿼리 한 번으로 읽어 부모별로 나눈다.
+    question.thread_comments에 질문 댓글, answer.thread_comments에 답변 댓글이 들어간다.
+    (답변은 answer_set이 prefetch된 경우에만)
+    """
+    questions = list(questions)
+    if not questions:
+        return
+    by_parent = {}
+    comment_list = (
+        Comment.objects.filter(
+            question_id__in=[question.id for question in questions], hidden=False
+        )
+        .select_related("author")
+        .order_by("create_date", "id")
+    )
+    for comment in comment_list:
+        by_parent.setdefault((comment.question_id, comment.answer_id), []).append(
+            comment
+        )
+    for question in questions:
+        question.thread_comments = by_parent.get((question.id, None), [])
+        answers = getattr(question, "_prefetched_objects_cache", {}).get("answer_set")
+        for answer in answers or ():
+            answer.thread_comments = by_parent.get((question.id, answer.id), [])
+
+
+class QuestionQuerySet(models.QuerySet):
+    def with_thread(self, answers=True, user=None):
+        """
+        상세화면에 필요한 질문, 답변과 글쓴이를 질문 수와 상관없이 2번의 쿼리로 읽는다.
+        (질문+글쓴이, 답변+글쓴이) 댓글은 읽은 질문을 load_comments()에 넘겨 1번 더 읽는다.
+        추천수/답변수/댓글수는 집계 컬럼을 쓰므로 추가 쿼리가 없다.
+        answers가 False이면 답변은 읽지 않는다. (JSON API의 fields=)
+        user가 로그인한 사용자이면 질문과 답변의 voted에 추천 여부를 넣는다. (EXISTS 서브쿼리)
+        """
+        queryset = self.filter(hidden=False).select_related("author")
+        voter = user if user is not None and user.is_authenticated else None
+        if voter is not None:
+            queryset = queryset.annotate(
+                voted=models.Exists(
+                    QuestionVote.objects.filter(
+                        question=models.OuterRef("pk"), user=voter
+                    )
+                )
+            )
+        if answers:
+            answer_list = (
+                Answer.objects.filter(hidden=False)
+                .select_related("author")
+                .order_by("create_date", "id")
+            )
+            if voter is not None:
+                answer_list = answer_list.annotate(
+                    voted=models.Exists(
+                        AnswerVote.objects.filter(
+                            answer=models.OuterRef("pk"), user=voter
+                        )
+                    )
+                )
+            queryset = queryset.prefetch_related(
+                models.Prefetch("answer_set", queryset=answer_list)
+            )
+        return queryset
+
+    def thread_version(self, question_id):
+        """
+        질문 스레드의 변경 여부를 판단하는 값들을 쿼리 한 번으로 읽는다. 질문이 없으면 None
+        (숨긴 글은 없는 것으로 본다)
+        (질문/답변/댓글의 최신 작성·수정일시와 추천수, 답변수, 댓글수)
+        """
+
+        def latest(queryset, parent):
+            return models.Subquery(
+                queryset.filter(**{parent: models.OuterRef("pk")}, hidden=False)
+                .order_by()
+                .values(parent)
+                .annotate(latest=models.Max(Coalesce("modify_date", "create_date")))
+                .values("latest")
+            )
+
+        def answer_sum(field):
+            return models.Subquery(
+                Answer.objects.filter(question=models.OuterRef("pk"), hidden=False)
+                .order_by()
+                .values("question")
+                .annotate(total=models.Sum(field))
+                .values("total")
+            )
+
+        row = (
+            self.filter(pk=question_id, hidden=False)
+            .values(
+                "vote_count",
+                "answer_count",
+                "comment_count",
+                question_date=Coalesce("modify_date", "create_date"),
+                answer_date=latest(Answer.objects, "question"),
+                comment_date=latest(Comment.objects, "question"),  # 답변 댓글 포함
+                answer_votes=answer_sum("vote_count"),
+                answer_comments=answer_sum("comment_count"),
+            )
+            .first()
+        )
+        if row is None:
+            return None
+        row["last_modified"] = max(
+            date
+            for date in (
+                row["question_date"],
+                row["answer_date"],
+                row["comment_date"],
+            )
+            if date is not None
+        )
+        return row
 
 
 class Question(models.Model):
     subject = models.CharField(max_length=200)  # 글자수 제한이 있는 데이터
     content = models.TextField()  # 글자수 제한이 없는 데이터
+    content_html = models.TextField(blank=True, default="", editable=False)
+    content_hash = models.CharField(
+        max_length=64, blank=True, default="", editable=False
+    )
     create_date = models.DateTimeField()  # 시간 관련 속성
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="author_question"
     )
     modify_date = models.DateTimeField(null=True, blank=True)
-    voter = models.ManyToManyField(User, related_name="voter_question")  # voter 추가
+    voter = models.ManyToManyField(
+        User, related_name="voter_question", through="QuestionVote"
+    )  # voter 추가
+    # 목록 정렬과 화면 표시에 쓰는 집계값 (views에서 F() 로 갱신, reconcile_pybo_counters로 보정)
+    vote_count = models.PositiveIntegerField(default=0)
+    answer_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # 최근 추천/답변일수록 큰 값 (pybo/ranking.py, so=hot)
+    hot_score = models.FloatField(default=0)
+    # 스팸 사용자의 글. 지우기 전까지 화면과 집계값에서 뺀다 (pybo/moderation.py)
+    hidden = models.BooleanField(default=False)
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        # 목록 정렬(views/base_views.py의 SORT_ORDERS)과 같은 순서의 인덱스
+        # explain_pybo_queries로 실행계획을 확인한다
+        indexes = [
+            models.Index(fields=["-create_date", "-id"], name="pybo_q_recent_idx"),
+            models.Index(
+                fields=["-vote_count", "-create_date", "-id"],
+                name="pybo_q_vote_count_idx",
+            ),
+            models.Index(
+                fields=["-answer_count", "-create_date", "-id"],
+                name="pybo_q_answer_count_idx",
+            ),
+            models.Index(
+                fields=["-hot_score", "-create_date", "-id"], name="pybo_q_hot_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.subject
 
+    def save(self, *args, render=True, **kwargs):
+        # Markdown은 저장할 때 한 번만 렌더링. render=False이면 tasks.render_post가 한다
+        if render:
+            rendering.render_content(self)
+        super().save(*args, **kwargs)
+
 
 class Answer(models.Model):
-    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # 질문별 조회는 pybo_a_question_idx가 맡는다
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, db_index=False)
     content = models.TextField()
+    content_html = models.TextField(blank=True, default="", editable=False)
+    content_hash = models.CharField(
+        max_length=64, blank=True, default="", editable=False
+    )
     create_date = models.DateTimeField()
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="author_answer"
     )
     modify_date = models.DateTimeField(null=True, blank=True)
-    voter = models.ManyToManyField(User, related_name="voter_answer")
+    voter = models.ManyToManyField(
+        User, related_name="voter_answer", through="AnswerVote"
+    )
+    vote_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    hidden = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # 상세화면의 질문별 답변 조회 (question_id IN ... ORDER BY create_date, id)
+            models.Index(
+                fields=["question", "create_date", "id"], name="pybo_a_question_idx"
+            ),
+        ]
+
+    def save(self, *args, render=True, **kwargs):
+        if render:
+            rendering.render_content(self)
+        super().save(*args, **kwargs)
+
+
+class QuestionVote(models.Model):
+    """
+    질문 추천 (Question.voter의 중간 테이블). 추천한 시각은 hot 순위에 쓴다.
+    """
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "pybo_question_voter"  # 자동으로 만들어졌던 테이블을 그대로 쓴다
+        unique_together = [("question", "user")]
+
+
+class AnswerVote(models.Model):
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    create_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "pybo_answer_voter"
+        unique_together = [("answer", "user")]
+
+
+class PendingVote(models.Model):
+    """
+    아직 반영하지 않은 질문 추천 (PYBO_VOTE_BUFFER, pybo/votes.py). 추가만 하고
+    flush_pending_votes가 QuestionVote와 vote_count에 반영한 뒤 지운다.
+    """
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    create_date = models.DateTimeField(default=timezone.now)
+
+
+class HotEpoch(models.Model):
+    """
+    hot_score의 기준 시각 (한 행). decay_hot_scores가 옮긴다.
+    """
+
+    date = models.DateTimeField()
 
 
 class Comment(models.Model):
@@ -32,7 +262,99 @@ class Comment(models.Model):
     content = models.TextField()
     create_date = models.DateTimeField()
     modify_date = models.DateTimeField(null=True, blank=True)
-    question = models.ForeignKey(
-        Question, null=True, blank=True, on_delete=models.CASCADE
+    # 답변 댓글도 그 답변의 질문을 가진다. 질문 댓글은 answer가 비어 있다.
+    # 조회는 아래 인덱스가 맡으므로 FK 인덱스는 만들지 않는다
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, db_index=False)
+    answer = models.ForeignKey(
+        Answer, null=True, blank=True, on_delete=models.CASCADE, db_index=False
     )
-    answer = models.ForeignKey(Answer, null=True, blank=True, on_delete=models.CASCADE)
+    hidden = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # 스레드의 모든 댓글 조회 (load_comments)
+            models.Index(
+                fields=["question", "create_date", "id"], name="pybo_c_question_idx"
+            ),
+            models.Index(
+                fields=["answer", "create_date", "id"],
+                name="pybo_c_answer_idx",
+                condition=models.Q(answer__isnull=False),
+            ),
+        ]
+
+    def clean(self):
+        # 답변 댓글의 질문은 그 답변의 질문이다. 다른 테이블의 값이라 DB 제약조건으로는
+        # 걸 수 없으므로 여기서 확인한다 (bulk_create, update()는 확인하지 않는다)
+        if self.answer_id is not None and self.question_id != self.answer.question_id:
+            raise ValidationError("답변 댓글의 질문이 그 답변의 질문과 다릅니다.")
+
+    def save(self, *args, **kwargs):
+        if self.answer_id is not None and self.question_id is None:
+            self.question_id = self.answer.question_id
+        self.clean()
+        super().save(*args, **kwargs)
+
+
+class Task(models.Model):
+    """
+    백그라운드 작업 큐 (pybo/tasks.py). 끝난 작업은 지우고 실패한 작업만 남긴다.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    # 같은 key의 대기 중인 작업은 하나만 둔다 (예: 같은 질문의 검색 인덱스 갱신)
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=32, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    create_date = models.DateTimeField(default=timezone.now)
+    started_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # 워커가 실행할 작업을 고르는 순서
+            models.Index(fields=["status", "run_at", "id"], name="pybo_task_queue_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="pending"),
+                name="pybo_task_pending_key",
+            ),
+        ]
+
+
+class TransferCheckpoint(models.Model):
+    """
+    import_pybo 진행 상황. job마다 처리한 줄 수를 남겨 중단된 곳부터 다시 시작한다.
+    """
+
+    job = models.CharField(max_length=255, unique=True)
+    line = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    modify_date = models.DateTimeField(auto_now=True)
+
+
+class TransferIdMap(models.Model):
+    """
+    import_pybo가 가져온 행의 (원래 id -> 새 id). 가져오기가 끝나면 지운다.
+    """
+
+    checkpoint = models.ForeignKey(TransferCheckpoint, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20)
+    old_id = models.BigIntegerField()
+    new_id = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["checkpoint", "kind", "old_id"], name="pybo_transfer_id_unique"
+            ),
+        ]
@@ -0,0 +1,154 @@
+"""
+pybo 스팸 사용자 정리
+
+User를 바로 지우면 CASCADE 때문에 Django가 그 사용자의 질문/답변/댓글/추천과
+거기 달린 다른 사용자의 글까지 모두 메모리에 읽은 뒤 지우므로, 글이 많은 사용자는 시간을 넘긴다.
+1. hide(): 사용자를 비활성화하고 글에 hidden을 표시한다. UPDATE 몇 번이라 바로 끝나고
+   화면에서 사라진다. 숨긴 글은 집계값에서 빠지므로 다른 사용자의 질문의 답변수, 댓글수,
+   hot_score도 여기서 고친다.
+2. purge(): 남은 행을 말단 테이블(추천 -> 댓글 -> 답변 -> 질문)부터 batch_size개씩 지우고
+   마지막에 User를 지운다. 배치마다 트랜잭션 하나이고, 사용자가 한 추천을 지우는 배치는
+   추천수와 hot_score도 함께 뺀다. 남은 CASCADE 대상이 없으므로 각 delete()는 가볍다.
+관리 화면(admin.py)은 1을 하고 2는 작업 큐(tasks.purge_user)로 넘긴다. purge_pybo_user 명령은
+둘 다 그 자리에서 하면서 진행 상황을 출력한다.
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from . import caching, counters, ranking
+from .models import Answer, AnswerVote, Comment, PendingVote, Question, QuestionVote
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_CHUNK = 1000
+
+
+def hide(user):
+    """
+    user를 비활성화하고 글을 숨긴다. 집계값을 고친 질문 수를 돌려준다.
+    """
+    with transaction.atomic():
+        # save()여야 common/signals.py가 캐시한 User를 지워 바로 로그아웃된다
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+
+        answers = Answer.objects.filter(author=user, hidden=False)
+        comments = Comment.objects.filter(author=user, hidden=False)
+        # 다른 사용자의 질문에 단 답변/댓글 (자기 질문은 함께 숨겨진다)
+        answer_dates = defaultdict(list)
+        others = answers.exclude(question__author=user)
+        for question_id, date in others.values_list("question_id", "create_date"):
+            answer_dates[question_id].append(date)
+        affected = set(answer_dates)
+        affected.update(
+            comments.exclude(question__author=user)
+            .order_by()
+            .values_list("question_id", flat=True)
+            .distinct()
+        )
+
+        Question.objects.filter(author=user, hidden=False).update(hidden=True)
+        answers.update(hidden=True)
+        comments.update(hidden=True)
+
+        for question_id, dates in answer_dates.items():
+            ranking.add_many(question_id, -settings.PYBO_HOT_ANSWER_WEIGHT, dates)
+        affected = sorted(affected)
+        for start in range(0, len(affected), RECONCILE_CHUNK):
+            counters.reconcile(affected[start : start + RECONCILE_CHUNK])
+    caching.bump_list_version()
+    return len(affected)
+
+
+def _unvote_questions(batch):
+    dates = defaultdict(list)
+    for question_id, date in batch.values_list("question_id", "create_date"):
+        dates[question_id].append(date)
+    for question_id, question_dates in dates.items():
+        Question.objects.filter(pk=question_id).update(
+            vote_count=F("vote_count") - len(question_dates)
+        )
+        ranking.add_many(question_id, -settings.PYBO_HOT_VOTE_WEIGHT, question_dates)
+
+
+def _unvote_answers(batch):
+    votes = defaultdict(int)
+    for answer_id in batch.values_list("answer_id", flat=True):
+        votes[answer_id] += 1
+    for answer_id, count in votes.items():
+        Answer.objects.filter(pk=answer_id).update(vote_count=F("vote_count") - count)
+
+
+def purge_steps(user_id):
+    """
+    [(이름, 지울 행의 queryset, 지우기 전에 배치로 부를 함수)] 지우는 순서대로
+    """
+    own_questions = {"question__author_id": user_id}
+    own_answers = {"answer__author_id": user_id}
+    return [
+        # 이 사용자의 추천: 보이는 글의 추천수에서 뺀다
+        (
+            "question_vote",
+            QuestionVote.objects.filter(user_id=user_id),
+            _unvote_questions,
+        ),
+        ("answer_vote", AnswerVote.objects.filter(user_id=user_id), _unvote_answers),
+        ("pending_vote", PendingVote.objects.filter(user_id=user_id), None),
+        # 여기부터는 숨긴 글과 거기 달린 행이라 집계값과 상관없다
+        ("comment", Comment.objects.filter(author_id=user_id), None),
+        ("comment", Comment.objects.filter(**own_questions), None),
+        ("comment", Comment.objects.filter(**own_answers), None),
+        ("question_vote", QuestionVote.objects.filter(**own_questions), None),
+        ("pending_vote", PendingVote.objects.filter(**own_questions), None),
+        ("answer_vote", AnswerVote.objects.filter(**own_answers), None),
+        (
+            "answer_vote",
+            AnswerVote.objects.filter(answer__question__author_id=user_id),
+            None,
+        ),
+        ("answer", Answer.objects.filter(**own_questions), None),
+        ("answer", Answer.objects.filter(author_id=user_id), None),
+        ("question", Question.objects.filter(author_id=user_id), None),
+    ]
+
+
+def purge(user_id, batch_size=None, progress=None, deadline=None):
+    """
+    숨긴 사용자의 행을 batch_size개씩 지우고 다 지우면 User도 지운다.
+    progress(이름, 이번 배치에서 지운 수)를 배치마다 부른다.
+    deadline(time.monotonic() 기준)이 지나면 멈추고 False, 다 지웠으면 True
+    """
+    batch_size = batch_size or settings.PYBO_PURGE_BATCH_SIZE
+    unvoted = False
+    for name, queryset, before_delete in purge_steps(user_id):
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                if unvoted:
+                    caching.bump_list_version()
+                return False
+            with transaction.atomic():
+                ids = list(
+                    queryset.order_by().values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                batch = queryset.model.objects.filter(pk__in=ids)
+                if before_delete is not None:
+                    before_delete(batch)
+                    unvoted = True
+                batch.delete()
+            logger.info("사용자 #%d 정리: %s %d개 삭제", user_id, name, len(ids))
+            if progress is not None:
+                progress(name, len(ids))
+
+    User.objects.filter(pk=user_id).delete()
+    if unvoted:
+        caching.bump_list_version()
+    return True
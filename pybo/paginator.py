@@ -0,0 +1,228 @@
+"""
+pybo 목록 페이징
+
+KeysetPaginator는 OFFSET 대신 마지막으로 본 행의 정렬키 이후를 조회하므로
+몇 번째 페이지든 첫 페이지와 같은 비용이 든다. 커서는 정렬키 값과 위치를 담은
+불투명한 토큰이다. 전체 건수는 페이지 번호 UI용 근사값으로 캐시에서 가져온다.
+페이지 번호로 이동하면 OFFSET 조회이므로 번호는 max_number까지만 준다.
+(PYBO_LIST_MAX_PAGE_NUMBER) 그 뒤의 페이지는 이전/다음 커서로만 간다.
+"""
+
+import base64
+import datetime
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def cached_count(queryset, key):
+    """
+    COUNT(*) 결과를 PYBO_COUNT_CACHE_TIMEOUT 초 동안 재사용한다.
+    """
+    cache_key = "pybo:count:" + hashlib.md5(key.encode()).hexdigest()
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(cache_key, count, settings.PYBO_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """
+    페이지 번호 방식 페이징. 전체 건수만 캐시한다.
+    """
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list, self.count_key)
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, position, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.position = position  # 첫 행의 (근사) 위치, 0부터
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def number(self):
+        return self.position // self.paginator.per_page + 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return max(self.number - 1, 1)
+
+    def start_index(self):
+        return self.position + 1
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[-1], self.position + len(self.object_list), "next"
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0],
+            max(self.position - self.paginator.per_page, 0),
+            "prev",
+        )
+
+
+class KeysetPaginator:
+    """
+    ordering은 유일한 순서가 되도록 마지막에 pk를 포함해야 한다. 예) ("-create_date", "-id")
+    """
+
+    def __init__(self, queryset, per_page, ordering, count_key, max_number=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.count_key = count_key
+        self.max_number = max_number
+
+    @cached_property
+    def count(self):
+        return cached_count(self.queryset, self.count_key)
+
+    @property
+    def num_pages(self):
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    @property
+    def page_range(self):
+        """
+        번호로 갈 수 있는 페이지 (OFFSET 조회)
+        """
+        last = self.num_pages
+        if self.max_number is not None:
+            last = min(last, self.max_number)
+        return range(1, last + 1)
+
+    def _fields(self):
+        return [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    def encode_cursor(self, obj, position, direction):
+        # DjangoJSONEncoder는 밀리초까지만 남기므로 datetime은 isoformat()으로 직접 변환
+        values = [
+            value.isoformat() if isinstance(value, datetime.datetime) else value
+            for value in (getattr(obj, name) for name, _ in self._fields())
+        ]
+        payload = json.dumps([direction, position, values], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, position, raw = json.loads(base64.urlsafe_b64decode(padded))
+            fields = self._fields()
+            if direction not in ("next", "prev") or len(raw) != len(fields):
+                raise ValueError(cursor)
+            model = self.queryset.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, raw)
+            ]
+            return direction, max(int(position), 0), values
+        except (ValueError, TypeError, LookupError, ValidationError) as e:
+            raise InvalidCursor(cursor) from e
+
+    def _after(self, values, reverse=False):
+        """
+        정렬 순서상 values 다음(reverse면 이전)에 오는 행 조건
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = "lt" if descending != reverse else "gt"
+            condition |= Q(**equal, **{"{}__{}".format(name, lookup): value})
+            equal[name] = value
+        return condition
+
+    def get_page(self, cursor=None, number=None):
+        """
+        cursor가 있으면 keyset 조회, 없으면 페이지 번호(number)로 OFFSET 조회
+        (number는 page_range 안으로 맞춘다)
+        """
+        try:
+            direction, position, values = (
+                self.decode_cursor(cursor) if cursor else ("next", 0, None)
+            )
+        except InvalidCursor:
+            direction, position, values = "next", 0, None
+
+        if values is None and number is not None:
+            try:
+                number = min(max(int(number), 1), self.page_range[-1])
+            except (TypeError, ValueError):
+                number = 1
+            position = (number - 1) * self.per_page
+            queryset = self.queryset.order_by(*self.ordering)
+            rows = list(queryset[position : position + self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            return KeysetPage(
+                rows[: self.per_page], self, position, has_next, number > 1
+            )
+
+        if direction == "next":
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after(values))
+            rows = list(queryset[: self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_previous = values is not None
+        else:
+            reverse = [
+                name[1:] if name.startswith("-") else "-" + name
+                for name in self.ordering
+            ]
+            queryset = self.queryset.order_by(*reverse).filter(
+                self._after(values, reverse=True)
+            )
+            rows = list(queryset[: self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            has_next = True
+            if not has_previous:
+                position = 0
+        return KeysetPage(rows, self, position, has_next, has_previous)
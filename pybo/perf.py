@@ -0,0 +1,202 @@
+"""
+요청별 성능 계측 (PYBO_PERF_ENABLED)
+
+PerformanceMiddleware가 요청마다 Recorder를 만들어 contextvar에 넣어두면
+- DB 시간/쿼리 수: 모든 DB 연결에 거는 execute_wrapper (_execute)
+  contextvar를 따르므로 ASGI의 sync_to_async 스레드, async_views의 스레드 풀에서도 모인다.
+- 템플릿 시간: TEMPLATES의 BACKEND인 DjangoTemplates
+- view 시간: process_view부터 응답이 돌아올 때까지
+를 모아 Server-Timing 헤더와 로그 한 줄(pybo.perf)로 남긴다.
+쿼리 수와 시간은 공개하지 않으므로 헤더는 관리자(is_staff)와 INTERNAL_IPS에만 보낸다.
+PYBO_PERF_SLOW_REQUEST_MS보다 오래 걸린 요청은 실행한 SQL도 함께 남긴다.
+꺼져 있으면 미들웨어는 MiddlewareNotUsed로 빠지고 쿼리와 템플릿은 contextvar 조회만 한다.
+"""
+
+import contextvars
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends import django as django_backend
+
+from common.db import pool
+from common.middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+_recorder = contextvars.ContextVar("pybo_perf_recorder", default=None)
+
+
+class Recorder:
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.query_count = 0
+        self.queries = []  # (alias, sql, 초), 최대 max_queries개
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db_time += duration
+            self.query_count += 1
+            if len(self.queries) < self.max_queries:
+                alias = context["connection"].alias
+                self.queries.append((alias, sql, duration))
+
+
+def current():
+    """
+    지금 요청의 Recorder. 계측 중이 아니면 None
+    """
+    return _recorder.get()
+
+
+def _execute(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install(sender, connection, **kwargs):
+    # 풀(common/db/pool.py)에서 다시 꺼낸 연결에는 이미 걸려 있다
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        recorder = _recorder.get()
+        if recorder is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    렌더링 시간을 Recorder에 더하는 Django 템플릿 백엔드
+    (include/extends는 바깥 템플릿 시간에 포함된다)
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class PerformanceMiddleware(AsyncCapableMiddleware):
+    """
+    MIDDLEWARE의 맨 앞에 두어야 다른 미들웨어 시간까지 total에 들어간다.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PYBO_PERF_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.slow = settings.PYBO_PERF_SLOW_REQUEST_MS / 1000
+        self.max_queries = settings.PYBO_PERF_MAX_QUERIES
+        if self.is_async:
+            # 동기 process_view는 Django가 요청마다 스레드로 넘기므로 코루틴을 쓴다
+            self.process_view = self.aprocess_view
+
+    def call(self, request):
+        recorder = Recorder(self.max_queries)
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        user = getattr(request, "user", None)
+        return self.finish(request, response, recorder, user)
+
+    async def acall(self, request):
+        recorder = Recorder(self.max_queries)
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        # 여기서 request.user를 처음 읽으면 DB 조회라 view가 이미 읽은 사용자만 본다
+        user = getattr(request, "_cached_user", None)
+        return self.finish(request, response, recorder, user)
+
+    def finish(self, request, response, recorder, user):
+        finished = time.perf_counter()
+        if recorder.view_started is not None:
+            recorder.view_time = finished - recorder.view_started
+        total = finished - recorder.started
+        if self.show_timing(request, user):
+            response["Server-Timing"] = ", ".join(
+                [
+                    'db;dur={};desc="{} queries"'.format(
+                        _ms(recorder.db_time), recorder.query_count
+                    ),
+                    "tpl;dur={}".format(_ms(recorder.template_time)),
+                    "view;dur={}".format(_ms(recorder.view_time)),
+                    "total;dur={}".format(_ms(total)),
+                ]
+            )
+        self.log(request, response, recorder, total)
+        return response
+
+    def show_timing(self, request, user):
+        if request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS:
+            return True
+        return user is not None and user.is_staff
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.view_started = time.perf_counter()
+
+    def log(self, request, response, recorder, total):
+        slow = total >= self.slow
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": _ms(total),
+            "view_ms": _ms(recorder.view_time),
+            "db_ms": _ms(recorder.db_time),
+            "queries": recorder.query_count,
+            "template_ms": _ms(recorder.template_time),
+            "slow": slow,
+        }
+        if not slow:
+            logger.info(json.dumps(record, ensure_ascii=False))
+            return
+        record["sql"] = [
+            {"db": alias, "ms": _ms(duration), "sql": sql}
+            for alias, sql, duration in recorder.queries
+        ]
+        pools = pool.stats()  # 연결을 기다리느라 느렸는지 (common/db/pool.py)
+        if pools:
+            record["pools"] = pools
+        logger.warning(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,139 @@
+"""
+pybo hot 순위 (so=hot)
+
+hot_score = Σ 가중치 × 2^(-(지금 - 질문/추천/답변 시각) / 반감기)
+
+지금 대신 기준 시각(HotEpoch)에 대한 값으로 저장한다.
+    hot_score = Σ 가중치 × 2^((시각 - 기준 시각) / 반감기)
+모든 질문에 같은 배율이 곱해진 값이라 순서는 같고, 새 추천/답변은 F()로 더하기만 하면 된다.
+decay_hot_scores가 주기적으로 기준 시각을 지금으로 옮기면서 점수가 있는 질문에만
+2^(-경과 시간 / 반감기)를 곱하고(값이 계속 커지지 않도록), 작아진 점수는 0으로 만든다.
+점수를 더하는 쪽은 기준 시각을 잠그고 읽으므로(get_epoch) decay와 겹쳐도
+옮기기 전 기준 시각으로 계산한 값이 옮긴 뒤의 점수에 더해지지 않는다.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .models import Question, Answer, QuestionVote, HotEpoch
+
+MAX_EXPONENT = 1000  # decay를 오래 돌리지 않았을 때 float 범위를 넘지 않도록
+
+
+def weight_at(weight, when, epoch):
+    """
+    when에 생긴 weight의 기준 시각(epoch)에서의 값
+    """
+    exponent = (when - epoch).total_seconds() / settings.PYBO_HOT_HALF_LIFE
+    return weight * 2 ** min(exponent, MAX_EXPONENT)
+
+
+def get_epoch():
+    """
+    기준 시각. 트랜잭션 안에서 부르면 그 트랜잭션이 끝날 때까지 decay()가 옮기지 못한다.
+    (PostgreSQL은 FOR SHARE라 점수를 더하는 요청끼리는 서로 기다리지 않는다.
+    SQLite는 쓰기 트랜잭션이 하나씩이라 잠글 필요가 없다)
+    """
+    sql = "SELECT id, date FROM {} WHERE id = 1".format(HotEpoch._meta.db_table)
+    if connection.vendor == "postgresql" and connection.in_atomic_block:
+        sql += " FOR SHARE"
+    for epoch in HotEpoch.objects.raw(sql):
+        return epoch.date
+    # 0012 마이그레이션이 만들어 두므로 테이블을 비운 경우(테스트 등)에만
+    epoch, _ = HotEpoch.objects.get_or_create(pk=1, defaults={"date": timezone.now()})
+    return epoch.date
+
+
+def initial_score(when):
+    """
+    새 질문의 hot_score (질문을 저장하는 트랜잭션 안에서 부른다)
+    """
+    return weight_at(settings.PYBO_HOT_QUESTION_WEIGHT, when, get_epoch())
+
+
+def add(question_id, weight, when=None):
+    """
+    질문에 when(기본은 지금)에 생긴 weight를 더한다. 지울 때는 음수 weight와 원래 시각
+    """
+    add_many(question_id, weight, [when or timezone.now()])
+
+
+def add_many(question_id, weight, dates):
+    """
+    dates의 각 시각에 생긴 weight를 한 번에 더한다. (votes.flush)
+    """
+    with transaction.atomic(savepoint=False):
+        epoch = get_epoch()
+        score = sum(weight_at(weight, when, epoch) for when in dates)
+        Question.objects.filter(pk=question_id).update(hot_score=F("hot_score") + score)
+
+
+def decay(now=None):
+    """
+    기준 시각을 now로 옮긴다. 점수를 바꾼 질문 수를 돌려준다.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        epoch, _ = HotEpoch.objects.select_for_update().get_or_create(
+            pk=1, defaults={"date": now}
+        )
+        factor = 2 ** -(
+            (now - epoch.date).total_seconds() / settings.PYBO_HOT_HALF_LIFE
+        )
+        # hot_score > 0 조건은 pybo_q_hot_idx로 점수가 있는 질문만 찾는다
+        updated = Question.objects.filter(hot_score__gt=0).update(
+            hot_score=F("hot_score") * factor
+        )
+        # 0인 질문까지 읽지 않도록 범위를 나눠서 0으로 만든다 (음수는 지운 답변의 오차)
+        Question.objects.filter(
+            hot_score__gt=0, hot_score__lt=settings.PYBO_HOT_MIN_SCORE
+        ).update(hot_score=0)
+        Question.objects.filter(hot_score__lt=0).update(hot_score=0)
+        epoch.date = now
+        epoch.save()
+    caching.bump_list_version()
+    return updated
+
+
+def recompute(chunk_size=1000):
+    """
+    질문/추천/답변 시각으로 모든 hot_score를 다시 계산한다. (데이터를 대량으로 넣은 뒤)
+    """
+    epoch = get_epoch()
+    minimum = settings.PYBO_HOT_MIN_SCORE
+    last = 0
+    while True:
+        rows = list(
+            Question.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", "create_date")[:chunk_size]
+        )
+        if not rows:
+            break
+        ids = [pk for pk, _ in rows]
+        scores = {
+            pk: weight_at(settings.PYBO_HOT_QUESTION_WEIGHT, date, epoch)
+            for pk, date in rows
+        }
+        sources = (
+            (QuestionVote.objects, settings.PYBO_HOT_VOTE_WEIGHT),
+            (Answer.objects.filter(hidden=False), settings.PYBO_HOT_ANSWER_WEIGHT),
+        )
+        for queryset, weight in sources:
+            dates = queryset.filter(question_id__in=ids).values_list(
+                "question_id", "create_date"
+            )
+            for pk, date in dates.iterator():
+                scores[pk] += weight_at(weight, date, epoch)
+        Question.objects.bulk_update(
+            [
+                Question(pk=pk, hot_score=score if score >= minimum else 0)
+                for pk, score in scores.items()
+            ],
+            ["hot_score"],
+        )
+        last = ids[-1]
+    caching.bump_list_version()
@@ -0,0 +1,61 @@
+"""
+pybo Markdown 렌더링
+
+렌더링한 HTML은 content_html에, 원문+렌더러 버전의 해시는 content_hash에 저장한다.
+렌더링 방식(확장 기능 등)을 바꾸면 RENDERER_VERSION을 올리고
+render_pybo_markdown 명령으로 기존 글을 다시 렌더링한다.
+"""
+
+import hashlib
+from functools import lru_cache
+
+import markdown
+
+RENDERER_VERSION = 1
+EXTENSIONS = ["nl2br", "fenced_code"]
+
+
+def render(text):
+    return markdown.markdown(text, extensions=EXTENSIONS)
+
+
+def digest(text):
+    return hashlib.sha256(
+        "{}:{}".format(RENDERER_VERSION, text).encode("utf-8")
+    ).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def render_cached(text):
+    """
+    저장된 HTML이 없을 때 쓰는 프로세스 단위 LRU 캐시
+    """
+    return render(text)
+
+
+def is_fresh(obj):
+    return bool(obj.content_html) and obj.content_hash == digest(obj.content)
+
+
+def render_content(obj):
+    """
+    content가 바뀌었으면 content_html, content_hash를 다시 채운다. (save 전에 호출)
+    """
+    content_hash = digest(obj.content)
+    if obj.content_hash != content_hash or not obj.content_html:
+        obj.content_html = render(obj.content)
+        obj.content_hash = content_hash
+
+
+def html_for(obj):
+    if is_fresh(obj):
+        return obj.content_html
+    return render_cached(obj.content)
+
+
+def render_rows(rows):
+    """
+    [(pk, content), ...] -> [(pk, html, hash), ...]
+    render_pybo_markdown의 프로세스 풀에서 실행된다.
+    """
+    return [(pk, render(content), digest(content)) for pk, content in rows]
@@ -0,0 +1,229 @@
+"""
+pybo 검색 인덱스
+
+질문의 제목, 내용, 글쓴이(질문+답변) 이름을 별도의 검색 테이블에 보관한다.
+질문/답변이 바뀌거나 사용자 이름이 바뀌면 signals.py가 해당 행을 다시 만든다.
+SQLite는 FTS5(trigram) 가상 테이블, PostgreSQL은 tsvector + pg_trgm 인덱스를 쓴다.
+"""
+
+from django.db import connection
+
+from .models import Answer, Question
+
+SEARCH_TABLE = "pybo_question_search"
+
+# 인덱스에 들어갈 한 행(질문 id, 제목, 내용, 글쓴이 이름들)을 만드는 SELECT
+_SQLITE_SOURCE = """
+    SELECT q.id, q.subject, q.content,
+           u.username || ' ' || coalesce((
+               SELECT group_concat(DISTINCT au.username)
+               FROM pybo_answer a JOIN auth_user au ON au.id = a.author_id
+               WHERE a.question_id = q.id
+           ), '')
+    FROM pybo_question q JOIN auth_user u ON u.id = q.author_id
+"""
+
+_POSTGRES_SOURCE = """
+    SELECT q.id, q.subject, q.content,
+           u.username || ' ' || coalesce((
+               SELECT string_agg(DISTINCT au.username, ' ')
+               FROM pybo_answer a JOIN auth_user au ON au.id = a.author_id
+               WHERE a.question_id = q.id
+           ), '')
+    FROM pybo_question q JOIN auth_user u ON u.id = q.author_id
+"""
+
+
+class SqliteBackend:
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        f"USING fts5(subject, content, authors, tokenize='trigram')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+    def index(self, cursor, question_id=None):
+        where, params = (
+            ("", []) if question_id is None else (" WHERE q.id = %s", [question_id])
+        )
+        if question_id is None:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        else:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [question_id]
+            )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, subject, content, authors) "
+            + _SQLITE_SOURCE
+            + where,
+            params,
+        )
+
+    def remove(self, cursor, question_id):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [question_id])
+
+    def search(self, queryset, kw):
+        tables = [SEARCH_TABLE]
+        join = f"{SEARCH_TABLE}.rowid = pybo_question.id"
+        if len(kw) >= 3:
+            # trigram 토크나이저: 따옴표로 묶은 구문은 부분 문자열 검색과 같다.
+            phrase = '"{}"'.format(kw.replace('"', '""'))
+            return queryset.extra(
+                tables=tables,
+                where=[join, f"{SEARCH_TABLE} MATCH %s"],
+                params=[phrase],
+                select={"search_rank": f"-bm25({SEARCH_TABLE}, 10.0, 1.0, 5.0)"},
+            )
+        # 3글자 미만은 trigram으로 찾을 수 없으므로 검색 테이블만 LIKE로 훑는다.
+        pattern = "%{}%".format(
+            kw.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        like = " OR ".join(
+            f"{SEARCH_TABLE}.{column} LIKE %s ESCAPE '\\'"
+            for column in ("subject", "content", "authors")
+        )
+        return queryset.extra(
+            tables=tables,
+            where=[join, f"({like})"],
+            params=[pattern] * 3,
+            select={"search_rank": "0"},
+        )
+
+
+class PostgresBackend:
+    create_sql = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"""
+        CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            question_id integer PRIMARY KEY
+                REFERENCES pybo_question (id)
+                ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            document text NOT NULL,
+            vector tsvector NOT NULL
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_vector "
+        f"ON {SEARCH_TABLE} USING gin (vector)",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_trgm "
+        f"ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+    def index(self, cursor, question_id=None):
+        where, params = (
+            ("", []) if question_id is None else (" WHERE q.id = %s", [question_id])
+        )
+        if question_id is None:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+        cursor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (question_id, document, vector)
+            SELECT src.id,
+                   concat_ws(' ', src.subject, src.content, src.authors),
+                   setweight(to_tsvector('simple', src.subject), 'A')
+                   || setweight(to_tsvector('simple', src.authors), 'B')
+                   || setweight(to_tsvector('simple', src.content), 'C')
+            FROM ({_POSTGRES_SOURCE}{where}) AS src (id, subject, content, authors)
+            ON CONFLICT (question_id) DO UPDATE
+                SET document = EXCLUDED.document, vector = EXCLUDED.vector
+            """,
+            params,
+        )
+
+    def remove(self, cursor, question_id):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE question_id = %s", [question_id]
+        )
+
+    def search(self, queryset, kw):
+        # tsvector는 단어 단위, document ILIKE(pg_trgm 인덱스 사용)는 부분 문자열 검색
+        pattern = "%{}%".format(
+            kw.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f"{SEARCH_TABLE}.question_id = pybo_question.id",
+                f"({SEARCH_TABLE}.vector @@ plainto_tsquery('simple', %s) "
+                f"OR {SEARCH_TABLE}.document ILIKE %s)",
+            ],
+            params=[kw, pattern],
+            select={
+                "search_rank": f"ts_rank({SEARCH_TABLE}.vector, "
+                "plainto_tsquery('simple', %s))"
+            },
+            select_params=[kw],
+        )
+
+
+_BACKENDS = {
+    "sqlite": SqliteBackend(),
+    "postgresql": PostgresBackend(),
+}
+
+
+def get_backend(conn=None):
+    conn = conn or connection
+    try:
+        return _BACKENDS[conn.vendor]
+    except KeyError:
+        raise NotImplementedError(
+            "검색 인덱스는 {} 데이터베이스를 지원하지 않습니다.".format(conn.vendor)
+        )
+
+
+def create_index_table(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for sql in get_backend(conn).create_sql:
+            cursor.execute(sql)
+
+
+def drop_index_table(conn=None):
+    conn = conn or connection
+    with conn.cursor() as cursor:
+        for sql in get_backend(conn).drop_sql:
+            cursor.execute(sql)
+
+
+def update_question(question_id):
+    """
+    질문 하나의 인덱스 행을 다시 만든다. 질문이 없으면 행도 지워진다.
+    """
+    with connection.cursor() as cursor:
+        get_backend().index(cursor, question_id)
+
+
+def update_author(user_id):
+    """
+    사용자가 쓴 질문과 답변한 질문의 인덱스 행을 다시 만든다. (사용자 이름이 바뀌었을 때)
+    """
+    question_ids = set(
+        Question.objects.filter(author_id=user_id).values_list("id", flat=True)
+    )
+    question_ids.update(
+        Answer.objects.filter(author_id=user_id).values_list("question_id", flat=True)
+    )
+    with connection.cursor() as cursor:
+        backend = get_backend()
+        for question_id in sorted(question_ids):
+            backend.index(cursor, question_id)
+
+
+def remove_question(question_id):
+    with connection.cursor() as cursor:
+        get_backend().remove(cursor, question_id)
+
+
+def rebuild():
+    """
+    전체 인덱스를 한 번의 INSERT ... SELECT로 다시 만든다.
+    """
+    with connection.cursor() as cursor:
+        get_backend().index(cursor)
+
+
+def search_questions(queryset, kw):
+    """
+    kw에 맞는 질문만 남기고 관련도(search_rank)를 붙인다.
+    """
+    return get_backend().search(queryset, kw)
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from common.models import CachedUser
+
+from . import caching, tasks
+from .models import Question, Answer
+
+
+def search_key(question_id):
+    return "search:{}".format(question_id)
+
+
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, raw=False, **kwargs):
+    """
+    질문 저장시 검색 인덱스 갱신 (커밋 후 워커에서)
+    """
+    if not raw:
+        tasks.enqueue(tasks.update_search, instance.pk, key=search_key(instance.pk))
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    # 질문이 없으면 update_search가 인덱스 행을 지운다
+    tasks.enqueue(tasks.update_search, instance.pk, key=search_key(instance.pk))
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def index_answer(sender, instance, raw=False, **kwargs):
+    """
+    답변 글쓴이도 검색 대상이므로 답변이 바뀌면 질문의 인덱스를 갱신
+    """
+    if not raw:
+        tasks.enqueue(
+            tasks.update_search,
+            instance.question_id,
+            key=search_key(instance.question_id),
+        )
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=CachedUser)
+def check_rename(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    사용자 이름이 바뀌는지 저장 전에 확인해둔다. (로그인 등 username을 빼고 저장하면 건너뛴다)
+    """
+    instance._pybo_renamed = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and "username" not in update_fields:
+        return
+    old = User.objects.filter(pk=instance.pk).values_list("username", flat=True)
+    instance._pybo_renamed = old.first() not in (None, instance.username)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=CachedUser)
+def index_author(sender, instance, **kwargs):
+    """
+    글쓴이 이름도 검색 대상이므로 이름이 바뀌면 그 사용자의 질문, 답변한 질문의 인덱스를 갱신
+    """
+    if getattr(instance, "_pybo_renamed", False):
+        tasks.enqueue(
+            tasks.update_author_search,
+            instance.pk,
+            key="search:author:{}".format(instance.pk),
+        )
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+@receiver(m2m_changed, sender=Question.voter.through)
+def invalidate_list_pages(sender, **kwargs):
+    """
+    목록에 보이는 값(질문, 답변수, 추천수)이 바뀌면 목록 캐시 버전을 올린다
+    """
+    if kwargs.get("action", "post_").startswith("post_"):
+        caching.bump_list_version()
@@ -0,0 +1,230 @@
+"""
+pybo 백그라운드 작업 큐
+
+글을 쓴 요청이 Markdown 렌더링, 검색 인덱스 갱신까지 기다리지 않도록
+요청은 enqueue()로 Task 테이블에 한 줄 넣기만 하고, run_pybo_worker가 스레드 풀로 실행한다.
+- enqueue는 transaction.on_commit으로 넣으므로 롤백된 글의 작업은 생기지 않는다.
+- key가 같은 대기 중인 작업은 하나만 둔다. (같은 질문을 연달아 고쳐도 인덱스 갱신은 한 번)
+  작업은 여러 번 실행되어도 결과가 같도록(멱등) 만든다.
+- 실패하면 PYBO_TASKS_RETRY_DELAY × 2^(시도 - 1)초 뒤에 다시 하고,
+  PYBO_TASKS_MAX_ATTEMPTS번 실패하면 status=failed로 남긴다.
+- 실행이 PYBO_TASKS_TIMEOUT초를 넘긴 작업(워커가 죽은 경우 등)은 다시 대기로 돌린다.
+- 작업마다 대기 시간(queue_ms)과 실행 시간(run_ms)을 pybo.tasks 로그에 남기고,
+  큐 길이는 stats() (run_pybo_worker --stats)로 본다.
+PYBO_TASKS_EAGER이면 큐에 넣지 않고 그 자리에서 실행한다. (개발 서버, 테스트)
+"""
+
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import moderation, rendering, search
+from .models import Answer, Question, Task
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(func):
+    """
+    enqueue()할 수 있는 함수로 등록한다. 인자는 JSON으로 저장할 수 있는 값만
+    """
+    func.task_name = "{}.{}".format(func.__module__, func.__qualname__)
+    TASKS[func.task_name] = func
+    return func
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """
+    현재 트랜잭션이 커밋되면 func(*args)를 큐에 넣는다.
+    """
+    if settings.PYBO_TASKS_EAGER:
+        func(*args)
+        return
+    item = Task(
+        name=func.task_name,
+        args=list(args),
+        key=key,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    # 같은 key가 이미 대기 중이면 넣지 않는다 (pybo_task_pending_key)
+    transaction.on_commit(
+        lambda: Task.objects.bulk_create([item], ignore_conflicts=True)
+    )
+
+
+def stats():
+    """
+    상태별 작업 수와 실행할 때가 된 가장 오래된 작업의 대기 시간(초)
+    """
+    now = timezone.now()
+    result = {Task.PENDING: 0, Task.RUNNING: 0, Task.FAILED: 0}
+    for row in Task.objects.values("status").annotate(count=Count("id")):
+        result[row["status"]] = row["count"]
+    oldest = Task.objects.filter(status=Task.PENDING, run_at__lte=now).aggregate(
+        oldest=Min("run_at")
+    )["oldest"]
+    result["lag_seconds"] = (now - oldest).total_seconds() if oldest else 0.0
+    return result
+
+
+class Worker:
+    """
+    대기 중인 작업을 가져와(claim) threads개의 스레드에서 실행한다.
+    여러 프로세스에서 띄워도 같은 작업을 두 번 가져가지 않는다.
+    """
+
+    def __init__(self, threads=None, poll_interval=None):
+        self.threads = threads or settings.PYBO_TASKS_THREADS
+        self.poll_interval = poll_interval or settings.PYBO_TASKS_POLL_INTERVAL
+        self.executor = ThreadPoolExecutor(
+            self.threads, thread_name_prefix="pybo-worker"
+        )
+
+    def run(self):
+        try:
+            while True:
+                if not self.run_once():
+                    time.sleep(self.poll_interval)
+        finally:
+            self.executor.shutdown()
+
+    def run_once(self):
+        """
+        한 번 가져온 작업을 모두 실행하고 실행한 수를 돌려준다.
+        """
+        self.requeue_stale()
+        tasks = self.claim(self.threads * 2)
+        close_old_connections()
+        list(self.executor.map(self.execute, tasks))
+        return len(tasks)
+
+    def claim(self, limit):
+        now = timezone.now()
+        token = uuid.uuid4().hex  # 이번에 가져간 작업 표시
+        with transaction.atomic():
+            ids = list(
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(status=Task.PENDING, run_at__lte=now)
+                .order_by("run_at", "id")
+                .values_list("id", flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            Task.objects.filter(id__in=ids, status=Task.PENDING).update(
+                status=Task.RUNNING,
+                worker=token,
+                started_date=now,
+                attempts=F("attempts") + 1,
+            )
+        return list(Task.objects.filter(worker=token, status=Task.RUNNING))
+
+    def requeue_stale(self):
+        limit = timezone.now() - timedelta(seconds=settings.PYBO_TASKS_TIMEOUT)
+        stale = Task.objects.filter(status=Task.RUNNING, started_date__lt=limit)
+        with transaction.atomic():
+            # 같은 key가 다시 들어와 있으면 그 작업이 대신한다
+            pending_keys = Task.objects.filter(
+                status=Task.PENDING, key__isnull=False
+            ).values("key")
+            stale.filter(key__in=pending_keys).delete()
+            count = stale.update(status=Task.PENDING, worker="")
+        if count:
+            logger.warning("시간을 넘긴 작업 %d개를 다시 대기로 돌렸습니다.", count)
+
+    def execute(self, item):
+        func = TASKS.get(item.name)
+        started = time.monotonic()
+        try:
+            if func is None:
+                raise LookupError("등록되지 않은 작업입니다: {}".format(item.name))
+            func(*item.args)
+        except Exception as e:
+            logger.exception("작업이 실패했습니다. (%s #%d)", item.name, item.id)
+            self.retry(item, "{}: {}".format(type(e).__name__, e))
+        else:
+            Task.objects.filter(pk=item.pk, worker=item.worker).delete()
+            record = {
+                "task": item.name,
+                "id": item.id,
+                "attempts": item.attempts,
+                "queue_ms": round(
+                    (item.started_date - item.run_at).total_seconds() * 1000, 1
+                ),
+                "run_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+            logger.info(json.dumps(record, ensure_ascii=False))
+        finally:
+            close_old_connections()
+
+    def retry(self, item, error):
+        mine = Task.objects.filter(pk=item.pk, worker=item.worker)
+        if item.attempts >= settings.PYBO_TASKS_MAX_ATTEMPTS:
+            mine.update(status=Task.FAILED, last_error=error)
+            return
+        delay = settings.PYBO_TASKS_RETRY_DELAY * 2 ** (item.attempts - 1)
+        try:
+            with transaction.atomic():
+                mine.update(
+                    status=Task.PENDING,
+                    worker="",
+                    run_at=timezone.now() + timedelta(seconds=delay),
+                    last_error=error,
+                )
+        except IntegrityError:
+            # 그사이 같은 key의 작업이 들어왔으면 그 작업이 대신한다
+            mine.delete()
+
+
+# 작업
+
+
+@task
+def render_post(kind, pk):
+    """
+    질문/답변의 content_html을 채운다. 그 전까지 화면은 render_cached로 보여준다.
+    """
+    model = {"question": Question, "answer": Answer}[kind]
+    post = model.objects.filter(pk=pk).only("content", "content_html", "content_hash")
+    post = post.first()
+    if post is None or rendering.is_fresh(post):
+        return
+    # 렌더링하는 동안 내용이 또 바뀌었으면 그 뒤에 넣은 작업이 다시 렌더링한다
+    model.objects.filter(pk=pk, content=post.content).update(
+        content_html=rendering.render(post.content),
+        content_hash=rendering.digest(post.content),
+    )
+
+
+@task
+def update_search(question_id):
+    search.update_question(question_id)
+
+
+@task
+def update_author_search(user_id):
+    search.update_author(user_id)
+
+
+@task
+def purge_user(user_id):
+    """
+    숨긴 사용자의 글을 지운다. PYBO_PURGE_TASK_SECONDS가 지나면 이어서 할 작업을 넣고 끝낸다.
+    (PYBO_TASKS_TIMEOUT 안에 끝나도록)
+    """
+    deadline = time.monotonic() + settings.PYBO_PURGE_TASK_SECONDS
+    if not moderation.purge(user_id, deadline=deadline):
+        enqueue(purge_user, user_id, key=purge_key(user_id))
+
+
+def purge_key(user_id):
+    return "purge:{}".format(user_id)
@@ -1,7 +1,8 @@
-import markdown
 from django import template
 from django.utils.safestring import mark_safe
 
+from pybo import rendering
+
 register = template.Library()
 
 
@@ -12,5 +13,9 @@ def sub(value, arg):
 
 @register.filter
 def mark(value):
-    extensions = ["nl2br", "fenced_code"]
-    return mark_safe(markdown.markdown(value, extensions=extensions))
\ No newline at end of file
+    """
+    질문/답변 객체면 저장된 HTML을, 문자열이거나 저장된 HTML이 낡았으면 LRU 캐시를 쓴다.
+    """
+    if isinstance(value, str):
+        return mark_safe(rendering.render_cached(value))
+    return mark_safe(rendering.html_for(value))
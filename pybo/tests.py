@@ -1,3 +1,1070 @@
-from django.test import TestCase
+import base64
+import json
+import logging
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.core.handlers.asgi import ASGIHandler
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import caching, counters, moderation, ranking, rendering, tasks, transfer, votes
+from . import urls as pybo_urls
+from .models import (
+    Question,
+    Answer,
+    Comment,
+    PendingVote,
+    Task,
+    QuestionVote,
+    load_comments,
+)
+from .paginator import InvalidCursor, KeysetPaginator
+from .views import async_views
+from .views.base_views import (
+    DETAIL_QUERY_BUDGET,
+    SORT_ORDERS,
+    list_questions,
+    paginate_questions,
+)
+
+
+def create_thread(author, answers=3, comments=2):
+    """
+    답변 answers개, 질문과 각 답변에 댓글 comments개씩 달린 질문을 만든다.
+    """
+    now = timezone.now()
+    question = Question.objects.create(
+        subject="subject", content="**content**", author=author, create_date=now
+    )
+    for _ in range(comments):
+        Comment.objects.create(
+            question=question, content="comment", author=author, create_date=now
+        )
+    for _ in range(answers):
+        answer = Answer.objects.create(
+            question=question, content="answer", author=author, create_date=now
+        )
+        for _ in range(comments):
+            Comment.objects.create(
+                answer=answer, content="comment", author=author, create_date=now
+            )
+    counters.reconcile([question.id])
+    return question
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.author = User.objects.create(username="author")
+        self.helper = User.objects.create(username="helper")
+        self.question = Question.objects.create(
+            subject="middleware ordering",
+            content="猫が好きです",
+            author=self.author,
+            create_date=now,
+        )
+        Question.objects.create(
+            subject="other", content="other", author=self.author, create_date=now
+        )
+
+    def search(self, kw):
+        questions = list_questions("recent", kw)
+        return [question.id for question in questions]
+
+    def test_full_text_match(self):
+        self.assertEqual(self.search("middleware"), [self.question.id])
+        self.assertEqual(self.search("ordering middleware"), [])  # 구문 검색
+        self.assertEqual(self.search("nothing"), [])
+
+    def test_short_keywords_use_like(self):
+        self.assertEqual(self.search("猫"), [self.question.id])
+        self.assertEqual(self.search("%"), [])  # LIKE 특수문자는 글자 그대로
+
+    def test_answer_authors_are_indexed(self):
+        answer = Answer.objects.create(
+            question=self.question,
+            content="answer",
+            author=self.helper,
+            create_date=timezone.now(),
+        )
+        self.assertEqual(self.search("helper"), [self.question.id])
+        answer.delete()
+        self.assertEqual(self.search("helper"), [])
+
+    def test_rename_reindexes_author_posts(self):
+        Answer.objects.create(
+            question=self.question,
+            content="answer",
+            author=self.helper,
+            create_date=timezone.now(),
+        )
+        self.helper.username = "renamed"
+        self.helper.save()
+        self.assertEqual(self.search("renamed"), [self.question.id])
+        self.assertEqual(self.search("helper"), [])
+        self.author.username = "writer"
+        self.author.save()
+        self.assertEqual(len(self.search("writer")), 2)
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        cache.clear()  # 요청 수 제한 버킷
+        self.author = User.objects.create(username="author")
+        self.user = User.objects.create(username="user")
+        self.question = create_thread(self.author, answers=1, comments=1)
+        self.answer = self.question.answer_set.get()
+
+    def counts(self):
+        question = Question.objects.get(pk=self.question.id)
+        answer = Answer.objects.get(pk=self.answer.id)
+        return (
+            (question.vote_count, question.answer_count, question.comment_count),
+            (answer.vote_count, answer.comment_count),
+        )
+
+    def test_views_update_counters_in_place(self):
+        self.client.force_login(self.user)
+        data = {"content": "content"}
+        self.client.post(reverse("pybo:answer_create", args=[self.question.id]), data)
+        self.client.post(
+            reverse("pybo:comment_create_question", args=[self.question.id]), data
+        )
+        self.client.post(
+            reverse("pybo:comment_create_answer", args=[self.answer.id]), data
+        )
+        self.client.get(reverse("pybo:vote_question", args=[self.question.id]))
+        self.client.get(reverse("pybo:vote_answer", args=[self.answer.id]))
+        self.assertEqual(self.counts(), ((1, 2, 2), (1, 2)))
+
+        comment = Comment.objects.get(answer=self.answer, author=self.user)
+        self.client.get(reverse("pybo:comment_delete_answer", args=[comment.id]))
+        answer = Answer.objects.get(author=self.user)
+        self.client.get(reverse("pybo:answer_delete", args=[answer.id]))
+        self.assertEqual(self.counts(), ((1, 1, 2), (1, 1)))
+        self.assertEqual(counters.reconcile(), (0, 0))  # F()로 맞게 갱신했다
+
+    def test_comment_delete_keeps_counters(self):
+        question_comment = Comment.objects.get(question=self.question, answer=None)
+        answer_comment = Comment.objects.get(answer=self.answer)
+        self.client.force_login(self.author)
+        # 답변 댓글은 질문 댓글 삭제 URL로 지울 수 없다
+        self.client.get(
+            reverse("pybo:comment_delete_question", args=[answer_comment.id])
+        )
+        self.client.get(
+            reverse("pybo:comment_delete_answer", args=[question_comment.id])
+        )
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(self.counts(), ((0, 1, 1), (0, 1)))
+
+        # 숨긴 댓글은 이미 댓글수에서 빠졌으므로 다시 빼지 않는다
+        Comment.objects.update(hidden=True)
+        counters.reconcile()
+        self.client.get(
+            reverse("pybo:comment_delete_question", args=[question_comment.id])
+        )
+        self.client.get(reverse("pybo:comment_delete_answer", args=[answer_comment.id]))
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.counts(), ((0, 1, 0), (0, 0)))
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+    def test_reconcile_repairs_only_drifted_rows(self):
+        other = create_thread(self.author, answers=1, comments=0)
+        Question.objects.filter(pk=self.question.id).update(vote_count=5)
+        Answer.objects.filter(pk=self.answer.id).update(comment_count=0)
+        Question.objects.filter(pk=other.id).update(answer_count=9)
+
+        out = StringIO()
+        call_command("reconcile_pybo_counters", str(self.question.id), stdout=out)
+        self.assertIn("질문 1건, 답변 1건", out.getvalue())
+        self.assertEqual(self.counts(), ((0, 1, 1), (0, 1)))
+        self.assertEqual(Question.objects.get(pk=other.id).answer_count, 9)
+
+        call_command("reconcile_pybo_counters", stdout=out)
+        self.assertEqual(Question.objects.get(pk=other.id).answer_count, 1)
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username="author")
+        now = timezone.now()
+        for i in range(12):
+            # 두 개씩 같은 시각: 같으면 id로 순서를 정한다
+            Question.objects.create(
+                subject="q%d" % i,
+                content="content",
+                author=author,
+                create_date=now - timedelta(minutes=i // 2),
+            )
+        self.expected = list(
+            Question.objects.order_by("-create_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.paginator = KeysetPaginator(
+            Question.objects.all(), 5, SORT_ORDERS["recent"], "test"
+        )
+
+    def ids(self, page):
+        return [question.id for question in page]
+
+    def cursor(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def test_cursor_round_trip(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(cursor=first.next_cursor)
+        third = self.paginator.get_page(cursor=second.next_cursor)
+        self.assertEqual(
+            self.ids(first) + self.ids(second) + self.ids(third), self.expected
+        )
+        self.assertEqual([page.number for page in (first, second, third)], [1, 2, 3])
+        self.assertFalse(third.has_next())
+        self.assertIsNone(third.next_cursor)
+
+        back = self.paginator.get_page(cursor=third.previous_cursor)
+        self.assertEqual((self.ids(back), back.number), (self.ids(second), 2))
+        front = self.paginator.get_page(cursor=back.previous_cursor)
+        self.assertEqual(self.ids(front), self.ids(first))
+        self.assertFalse(front.has_previous())
+        self.assertIsNone(front.previous_cursor)
+
+        question = Question.objects.get(pk=self.expected[0])
+        cursor = self.paginator.encode_cursor(question, 0, "next")
+        values = [question.create_date, question.id]  # 마이크로초까지 그대로
+        self.assertEqual(self.paginator.decode_cursor(cursor), ("next", 0, values))
+
+    def test_list_page_links(self):
+        first = paginate_questions(list_questions("recent", ""), "recent", "")
+        response = self.client.get(reverse("pybo:index"))
+        self.assertContains(response, 'data-cursor="{}"'.format(first.next_cursor))
+        second = paginate_questions(
+            list_questions("recent", ""), "recent", "", first.next_cursor
+        )
+        response = self.client.get(reverse("pybo:index"), {"cursor": first.next_cursor})
+        self.assertEqual(self.ids(response.context["question_list"]), self.ids(second))
+        self.assertContains(response, 'data-cursor="{}"'.format(second.previous_cursor))
+
+    def test_page_numbers_are_capped(self):
+        paginator = KeysetPaginator(
+            Question.objects.all(), 5, SORT_ORDERS["recent"], "test", max_number=2
+        )
+        self.assertEqual(list(paginator.page_range), [1, 2])
+        deep = paginator.get_page(number=3)  # OFFSET은 2페이지까지만
+        self.assertEqual((deep.number, self.ids(deep)), (2, self.expected[5:10]))
+        last = paginator.get_page(cursor=deep.next_cursor)
+        self.assertEqual((last.number, self.ids(last)), (3, self.expected[10:]))
+
+        with override_settings(PYBO_LIST_MAX_PAGE_NUMBER=2):
+            response = self.client.get(reverse("pybo:index"), {"page": 3})
+        self.assertEqual(response.context["question_list"].number, 2)
+        self.assertNotContains(response, ">3</a>")
+
+    def test_invalid_and_tampered_cursors_fall_back_to_first_page(self):
+        first = self.ids(self.paginator.get_page())
+        date = timezone.now().isoformat()
+        for cursor in [
+            "not a cursor!",
+            self.cursor(["next", 0, [date]]),  # 정렬키 수가 다르다
+            self.cursor(["sideways", 0, [date, 1]]),
+            self.cursor(["next", 0, ["yesterday", 1]]),
+            self.cursor({"direction": "next"}),
+        ]:
+            with self.assertRaises(InvalidCursor):
+                self.paginator.decode_cursor(cursor)
+            self.assertEqual(self.ids(self.paginator.get_page(cursor=cursor)), first)
+
+
+class RenderingTest(TestCase):
+    def setUp(self):
+        self.question = create_thread(
+            User.objects.create(username="author"), answers=1, comments=0
+        )
+        self.answer = self.question.answer_set.get()
+
+    def test_save_stores_html_and_digest(self):
+        self.assertEqual(self.question.content_html, "<p><strong>content</strong></p>")
+        self.assertEqual(self.question.content_hash, rendering.digest("**content**"))
+        self.assertTrue(rendering.is_fresh(self.question))
+        with mock.patch.object(rendering, "RENDERER_VERSION", 2):
+            # 렌더러를 바꾸면 저장된 HTML은 낡은 것이 된다
+            self.assertFalse(rendering.is_fresh(self.question))
+
+    def test_stale_hash_falls_back_to_rendering(self):
+        Question.objects.filter(pk=self.question.id).update(content="*changed*")
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual(question.content_html, "<p><strong>content</strong></p>")
+        self.assertEqual(rendering.html_for(question), "<p><em>changed</em></p>")
+
+    def test_template_filter(self):
+        Answer.objects.filter(pk=self.answer.id).update(content_html="<p>stored</p>")
+        answer = Answer.objects.get(pk=self.answer.id)
+        answer.content_hash = rendering.digest(answer.content)
+        html = Template(
+            "{% load pybo_filter %}{{ answer|mark }}|{{ text|mark }}|{{ 5|sub:2 }}"
+        ).render(Context({"answer": answer, "text": "`code`"}))
+        self.assertEqual(html, "<p>stored</p>|<p><code>code</code></p>|3")
+
+    def test_render_command_rerenders_stale_rows(self):
+        Question.objects.filter(pk=self.question.id).update(
+            content="# title", content_hash=""
+        )
+        out = StringIO()
+        call_command("render_pybo_markdown", workers=1, stdout=out)
+        self.assertIn("Question: 1건 렌더링", out.getvalue())
+        self.assertIn("Answer: 0건 렌더링", out.getvalue())
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual(question.content_html, "<h1>title</h1>")
+        self.assertTrue(rendering.is_fresh(question))
+
+        call_command("render_pybo_markdown", workers=1, force=True, stdout=out)
+        self.assertIn("Answer: 1건 렌더링", out.getvalue())
+
+
+class DetailQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create(username="user%d" % i) for i in range(3)]
+
+    def assertDetailQueries(self, question, budget=DETAIL_QUERY_BUDGET):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("pybo:detail", args=[question.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return response
+
+    def test_empty_thread(self):
+        self.assertDetailQueries(create_thread(self.users[0], answers=0, comments=0))
+
+    def test_query_count_does_not_grow_with_thread(self):
+        question = create_thread(self.users[0], answers=5, comments=4)
+        for answer in question.answer_set.all():
+            answer.voter.add(*self.users[1:])
+        response = self.assertDetailQueries(question)
+        self.assertContains(response, 'class="comment', count=4 + 5 * 4)
+        self.assertContains(response, "<strong>content</strong>")
+
+    def test_thread_comments_are_grouped_by_parent(self):
+        question = create_thread(self.users[0], answers=2, comments=2)
+        with self.assertNumQueries(3):
+            thread = Question.objects.with_thread().get(pk=question.id)
+            load_comments([thread])
+            answers = list(thread.answer_set.all())
+        self.assertEqual([c.answer_id for c in thread.thread_comments], [None, None])
+        for answer in answers:
+            self.assertEqual({c.answer_id for c in answer.thread_comments}, {answer.id})
+            self.assertEqual(len(answer.thread_comments), 2)
+
+    def test_answer_comment_must_belong_to_answer_question(self):
+        question = create_thread(self.users[0], answers=1, comments=0)
+        other = create_thread(self.users[0], answers=0, comments=0)
+        with self.assertRaises(ValidationError):
+            Comment.objects.create(
+                question=other,
+                answer=question.answer_set.get(),
+                content="comment",
+                author=self.users[0],
+                create_date=timezone.now(),
+            )
+
+    def test_logged_in_user_adds_no_queries(self):
+        question = create_thread(self.users[0], answers=5, comments=4)
+        self.client.force_login(self.users[1])
+        self.client.get(reverse("pybo:detail", args=[question.id]))
+        # 세션과 사용자는 캐시에서 읽으므로 비로그인과 같다
+        self.assertDetailQueries(question)
+
+
+class ListPageCacheTest(TransactionTestCase):
+    # 목록 버전은 커밋된 뒤에 올리므로 실제로 커밋한다
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username="author")
+
+    def test_cached_page_is_invalidated_by_new_question(self):
+        create_thread(self.user, answers=0, comments=0)
+        self.client.get(reverse("index"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index"))
+        self.assertEqual(response["X-Pybo-Cache"], "hit")
+
+        Question.objects.create(
+            subject="new question",
+            content="",
+            author=self.user,
+            create_date=timezone.now(),
+        )
+        self.assertContains(self.client.get(reverse("index")), "new question")
+
+    def test_version_is_bumped_after_commit(self):
+        version = caching.get_list_version()
+        with transaction.atomic():
+            create_thread(self.user, answers=1, comments=0)
+            # 커밋 전 데이터로 만든 페이지가 새 버전으로 저장되지 않도록
+            self.assertEqual(caching.get_list_version(), version)
+        self.assertGreater(caching.get_list_version(), version)
+
+    def test_logged_in_user_is_not_cached(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("index"))
+        self.assertFalse(self.client.get(reverse("index")).has_header("X-Pybo-Cache"))
+
+    def list_view(self, calls, delay=0):
+        def view(request):
+            calls.append(caching.get_list_version())
+            time.sleep(delay)
+            return HttpResponse("page {}".format(len(calls)) * 100)
+
+        return caching.cache_list_page(view)
+
+    def get(self, view, **extra):
+        request = RequestFactory().get("/", **extra)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_waiters_get_the_rebuilt_page_not_the_old_version(self):
+        calls = []
+        view = self.list_view(calls, delay=0.3)
+        self.get(view)
+        caching.bump_list_version()
+        responses = []
+        threads = [
+            threading.Thread(target=lambda: responses.append(self.get(view)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 다시 만든 것은 한 요청뿐이고, 모두 새 버전의 페이지를 받는다
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            {response.content for response in responses}, {b"page 2" * 100}
+        )
+
+    @override_settings(PYBO_LIST_CACHE_LOCK_TIMEOUT=0.1)
+    def test_waiter_renders_itself_when_lock_times_out(self):
+        calls = []
+        view = self.list_view(calls)
+        request = RequestFactory().get("/")
+        key = "pybo:list:{}:{}".format(
+            caching.get_list_version(), caching._params_key(request)
+        )
+        cache.add(key + ":lock", 1, 10)  # 다시 만들던 요청이 멈춘 경우
+        response = self.get(view)
+        self.assertEqual(response.content, b"page 1" * 100)
+        self.assertFalse(response.has_header("X-Pybo-Cache"))
+
+    def test_gzip_body_is_made_only_for_gzip_clients(self):
+        calls = []
+        view = self.list_view(calls)
+        response = self.get(view)
+        self.assertIsNone(getattr(response, "compressed_content", None))
+        self.assertIsNone(self.get(view).compressed_content)
+
+        response = self.get(view, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertIsNotNone(response.compressed_content)
+        # 압축한 본문은 캐시에 저장해 다음 요청이 다시 쓴다
+        with mock.patch("common.compression.compress") as compress:
+            response = self.get(view, HTTP_ACCEPT_ENCODING="gzip")
+        compress.assert_not_called()
+        self.assertIsNotNone(response.compressed_content)
+        self.assertEqual(len(calls), 1)
+
+
+class DetailConditionalGetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="author")
+        self.question = create_thread(self.user, answers=1, comments=1)
+        self.url = reverse("pybo:detail", args=[self.question.id])
+
+    def test_not_modified_skips_rendering(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # 304에도 사용자별 페이지임을 알린다
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_etag_changes_with_thread_and_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        Question.objects.filter(pk=self.question.id).update(vote_count=1)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Cookie", response["Vary"])
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        self.question = create_thread(User.objects.create(username="author"))
+        self.url = reverse("pybo:detail", args=[self.question.id])
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        timing = response["Server-Timing"]
+        self.assertIn('desc="{} queries"'.format(len(queries)), timing)
+        for metric in ("db;dur=", "tpl;dur=", "view;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+
+    @override_settings(PYBO_PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs("pybo.perf", "WARNING") as logs:
+            self.client.get(self.url)
+        self.assertIn("pybo_question", logs.output[0])
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_header_only_for_staff_and_internal_ips(self):
+        self.assertFalse(self.client.get(self.url).has_header("Server-Timing"))
+        staff = User.objects.create(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.assertTrue(self.client.get(self.url).has_header("Server-Timing"))
+
+    @override_settings(PYBO_PERF_ENABLED=False)
+    def test_disabled(self):
+        self.assertFalse(self.client.get(self.url).has_header("Server-Timing"))
+
+    async def test_async_request_counts_queries_from_threads(self):
+        response = await AsyncClient().get(self.url)
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries"')
+
+
+ASYNC_VIEW_NAMES = ("index", "detail", "vote_question", "vote_answer")
+
+
+class AsyncUrlConf:
+    """
+    PYBO_ASYNC_VIEWS=1(ASGI)일 때의 URL 설정. pybo/urls.py는 import할 때 view를 고르므로 따로 만든다.
+    """
+
+    urlpatterns = [
+        path(
+            "pybo/",
+            include(
+                (
+                    [
+                        path(
+                            str(pattern.pattern),
+                            (
+                                getattr(async_views, pattern.name)
+                                if pattern.name in ASYNC_VIEW_NAMES
+                                else pattern.callback
+                            ),
+                            name=pattern.name,
+                        )
+                        for pattern in pybo_urls.urlpatterns
+                    ],
+                    "pybo",
+                )
+            ),
+        ),
+        path("common/", include("common.urls")),
+        path("", async_views.index, name="index"),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncUrlConf)
+class AsyncViewsTest(TransactionTestCase):
+    """
+    비동기 view는 DB 스레드 풀의 다른 연결을 쓰므로 커밋된 데이터로 시험한다.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.voter = User.objects.create(username="voter")
+        self.question = create_thread(self.author, answers=1, comments=1)
+        self.answer = self.question.answer_set.get()
+        self.url = reverse("pybo:detail", args=[self.question.id])
+        self.client = AsyncClient()
+
+    async def test_detail_and_not_modified(self):
+        response = await self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<strong>content</strong>")
+        # Django 3.1의 AsyncClient는 헤더를 ASGI scope로 받는다
+        headers = [
+            (b"host", b"testserver"),
+            (b"if-none-match", response["ETag"].encode()),
+        ]
+        response = await self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    async def test_votes(self):
+        await sync_to_async(self.client.force_login)(self.voter)
+        await self.client.get(reverse("pybo:vote_question", args=[self.question.id]))
+        response = await self.client.get(
+            reverse("pybo:vote_answer", args=[self.answer.id])
+        )
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        question = await sync_to_async(Question.objects.get)(pk=self.question.id)
+        answer = await sync_to_async(Answer.objects.get)(pk=self.answer.id)
+        self.assertEqual((question.vote_count, answer.vote_count), (1, 1))
+        response = await self.client.get(self.url)
+        self.assertContains(response, "btn-primary btn-block", 2)
+
+
+class AsgiMiddlewareTest(SimpleTestCase):
+    @override_settings(
+        DEBUG=True,
+        COMMON_SERVE_STATIC=True,
+        STATIC_ROOT=tempfile.gettempdir(),
+        COMMON_DB_REPLICAS=["default"],
+    )
+    def test_no_middleware_is_adapted(self):
+        """
+        ASGI에서 동기 전용 미들웨어는 요청마다 스레드를 거치므로 모두 비동기로도 동작해야 한다.
+        """
+        with self.assertLogs("django.request", "DEBUG") as logs:
+            ASGIHandler()
+            logging.getLogger("django.request").debug("loaded")
+        self.assertEqual([line for line in logs.output if "adapted" in line], [])
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.voter = User.objects.create(username="voter")
+        question = create_thread(author, answers=2, comments=1)
+        question.voter.add(self.voter)
+        question.answer_set.first().voter.add(self.voter)
+        counters.reconcile()
+        self.lines = list(transfer.export_lines())
+
+    def assertImported(self):
+        self.assertEqual(User.objects.count(), 2)  # username이 같으면 기존 사용자
+        copy = Question.objects.order_by("-id").first()
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(copy.answer_set.count(), 2)
+        self.assertEqual(copy.comment_set.filter(answer=None).count(), 1)
+        self.assertEqual(copy.comment_set.exclude(answer=None).count(), 2)
+        self.assertEqual(list(copy.voter.all()), [self.voter])
+        self.assertEqual(copy.vote_count, 1)
+        self.assertEqual(
+            Answer.objects.filter(question=copy, voter=self.voter).count(), 1
+        )
+
+    def test_round_trip(self):
+        transfer.Importer("test", chunk_size=3).run(self.lines)
+        self.assertImported()
+
+    def test_resume_after_interruption(self):
+        def interrupted():
+            yield from self.lines[:5]
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            transfer.Importer("test", chunk_size=2).run(interrupted())
+        importer = transfer.Importer("test", chunk_size=2)
+        self.assertEqual(importer.checkpoint.line, 4)
+        importer.run(self.lines)
+        self.assertImported()
+
+    def test_round_trip_keeps_hidden_posts_hidden(self):
+        spammer = User.objects.create(username="spammer")
+        spam = create_thread(spammer, answers=1, comments=1)
+        moderation.hide(spammer)
+        lines = list(transfer.export_lines())
+        transfer.Importer("test").run(lines)
+        copy = Question.objects.order_by("-id").first()
+        self.assertNotEqual(copy.id, spam.id)
+        self.assertTrue(copy.hidden)
+        self.assertTrue(all(copy.answer_set.values_list("hidden", flat=True)))
+        self.assertTrue(all(copy.comment_set.values_list("hidden", flat=True)))
+        self.assertFalse(Question.objects.with_thread().filter(pk=copy.id))
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL 전용 (REPEATABLE READ)")
+class TransferSnapshotTest(TransactionTestCase):
+    def test_export_is_one_snapshot(self):
+        author = User.objects.create(username="author")
+        question = create_thread(author, answers=1, comments=0)
+        lines = transfer.export_lines()
+        next(lines)  # 첫 줄을 읽을 때 시점이 정해진다
+
+        def write():
+            try:
+                Answer.objects.create(
+                    question=question,
+                    content="late",
+                    author=author,
+                    create_date=timezone.now(),
+                )
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row["type"] for row in rows].count("answer"), 1)
+        self.assertEqual(Answer.objects.count(), 2)
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="author")
+        self.questions = [create_thread(self.user, answers=1) for _ in range(3)]
+
+    def test_list_reads_only_requested_fields(self):
+        url = reverse("pybo:api_question_list")
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {"fields": "subject", "limit": 2}).json()
+        self.assertEqual(list(data["results"][0]), ["subject"])
+        self.assertFalse(any("content" in query["sql"] for query in queries))
+
+        rest = self.client.get(url, {"fields": "id", "cursor": data["next"]}).json()
+        self.assertEqual([row["id"] for row in rest["results"]], [self.questions[0].id])
+        self.assertIsNone(rest["next"])
+
+    def test_unknown_field(self):
+        url = reverse("pybo:api_question_list")
+        self.assertEqual(self.client.get(url, {"fields": "password"}).status_code, 400)
+
+    def test_batch_keeps_order_and_reports_missing(self):
+        ids = [self.questions[2].id, 0, self.questions[0].id]
+        data = self.client.get(
+            reverse("pybo:api_question_batch"),
+            {"ids": ",".join(map(str, ids)), "fields": "id"},
+        ).json()
+        self.assertEqual(data["results"], [{"id": ids[0]}, {"id": ids[2]}])
+        self.assertEqual(data["missing"], [0])
+
+    def test_thread_etag(self):
+        url = reverse("pybo:api_question_thread", args=[self.questions[0].id])
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()["answers"]), 1)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+
+class HotRankingTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.voter = User.objects.create(username="voter")
+        self.old, self.new = create_thread(self.author), create_thread(self.author)
+        ranking.recompute()
+
+    def test_recent_votes_rank_higher(self):
+        ranking.add(self.old.id, 5, when=timezone.now() - timedelta(days=10))
+        ranking.add(self.new.id, 1)
+        self.client.force_login(self.voter)
+        self.client.get(reverse("pybo:vote_question", args=[self.new.id]))
+        response = self.client.get(reverse("index"), {"so": "hot"})
+        ids = [question.id for question in response.context["question_list"]]
+        self.assertEqual(ids, [self.new.id, self.old.id])
+
+    def test_add_reads_epoch_and_updates_once(self):
+        ranking.get_epoch()  # 기준 시각 행이 있으면 만들지 않는다
+        with self.assertNumQueries(2):  # 기준 시각(잠금) + UPDATE
+            ranking.add(self.old.id, 1)
+
+    def test_decay_keeps_order(self):
+        ranking.add(self.old.id, 3)
+        before = list(
+            Question.objects.order_by("-hot_score").values_list("id", "hot_score")
+        )
+        ranking.decay(timezone.now() + timedelta(days=1))
+        after = list(
+            Question.objects.order_by("-hot_score").values_list("id", "hot_score")
+        )
+        self.assertEqual([pk for pk, _ in before], [pk for pk, _ in after])
+        self.assertAlmostEqual(after[0][1], before[0][1] / 2, places=3)
+
+
+@override_settings(PYBO_VOTE_BUFFER=True)
+class VoteBufferTest(TestCase):
+    def setUp(self):
+        self.question = create_thread(User.objects.create(username="author"))
+        self.voter = User.objects.create(username="voter")
+        self.client.force_login(self.voter)
+
+    def shown_vote_count(self):
+        response = self.client.get(reverse("pybo:detail", args=[self.question.id]))
+        return response.context["question"].vote_count
+
+    def test_votes_are_buffered_and_flushed_once(self):
+        url = reverse("pybo:vote_question", args=[self.question.id])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(PendingVote.objects.count(), 2)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.vote_count, 0)
+        self.assertEqual(self.shown_vote_count(), 1)  # 추천한 사용자에게는 바로 보인다
+
+        hot_score = self.question.hot_score
+        self.assertEqual(votes.flush(), 1)
+        self.assertFalse(PendingVote.objects.exists())
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.vote_count, 1)
+        self.assertGreater(self.question.hot_score, hot_score)
+        self.assertEqual(list(self.question.voter.all()), [self.voter])
+        self.assertEqual(self.shown_vote_count(), 1)
+
+        self.client.get(url)  # 이미 반영된 추천은 버린다
+        self.assertEqual(votes.flush(), 0)
+        self.assertEqual(self.shown_vote_count(), 1)
+
+    def test_toggle_goes_through_buffer(self):
+        url = reverse("pybo:toggle_vote_question", args=[self.question.id])
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {"vote_count": 1, "voted": True})
+        self.assertEqual(PendingVote.objects.count(), 1)
+        self.assertFalse(self.question.voter.exists())
+        response = self.client.get(reverse("pybo:detail", args=[self.question.id]))
+        self.assertTrue(response.context["question"].voted)
+
+        response = self.client.post(url)  # 반영 전 취소
+        self.assertEqual(response.json(), {"vote_count": 0, "voted": False})
+        self.assertFalse(PendingVote.objects.exists())
+
+        self.client.post(url)
+        votes.flush()
+        response = self.client.post(url)  # 반영 후 취소
+        self.assertEqual(response.json(), {"vote_count": 0, "voted": False})
+        self.assertFalse(self.question.voter.exists())
+
+
+class VoteToggleTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.voter = User.objects.create(username="voter")
+        self.question = create_thread(self.author, answers=1, comments=0)
+        self.url = reverse("pybo:toggle_vote_question", args=[self.question.id])
+
+    def test_toggle_votes_and_unvotes(self):
+        self.client.force_login(self.voter)
+        hot_score = Question.objects.get(pk=self.question.id).hot_score
+        response = self.client.post(self.url)
+        self.assertEqual(response.json(), {"vote_count": 1, "voted": True})
+        self.assertEqual(list(self.question.voter.all()), [self.voter])
+        response = self.client.post(self.url)
+        self.assertEqual(response.json(), {"vote_count": 0, "voted": False})
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual((question.vote_count, question.voter.count()), (0, 0))
+        self.assertAlmostEqual(question.hot_score, hot_score, places=3)
+
+        answer = self.question.answer_set.get()
+        url = reverse("pybo:toggle_vote_answer", args=[answer.id])
+        self.assertEqual(self.client.post(url).json()["vote_count"], 1)
+
+    def test_rejected_votes(self):
+        self.assertEqual(self.client.post(self.url).status_code, 401)
+        self.client.force_login(self.author)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.question.voter.exists())
+        missing = reverse("pybo:toggle_vote_question", args=[self.question.id + 100])
+        self.assertEqual(self.client.post(missing).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_detail_shows_voted_state(self):
+        self.client.force_login(self.voter)
+        detail = reverse("pybo:detail", args=[self.question.id])
+        self.assertNotContains(self.client.get(detail), "btn-primary btn-block")
+        self.client.post(self.url)
+        answer = self.question.answer_set.get()
+        self.client.post(reverse("pybo:toggle_vote_answer", args=[answer.id]))
+        self.assertContains(self.client.get(detail), "btn-primary btn-block", 2)
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL 전용 (TOGGLE_SQL)")
+class VoteToggleSqlTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.voter = User.objects.create(username="voter")
+        self.question = create_thread(self.author, answers=1, comments=0)
+
+    def test_toggle_sql(self):
+        self.assertEqual(
+            votes.toggle("question", self.question.id, self.voter), (1, True)
+        )
+        self.assertEqual(
+            votes.toggle("question", self.question.id, self.voter), (0, False)
+        )
+        answer = self.question.answer_set.get()
+        self.assertEqual(votes.toggle("answer", answer.id, self.voter), (1, True))
+        with self.assertRaises(votes.VoteError):
+            votes.toggle("question", self.question.id, self.author)
+        with self.assertRaises(Question.DoesNotExist):
+            votes.toggle("question", self.question.id + 100, self.voter)
+
+    def test_concurrent_double_insert_counts_once(self):
+        barrier = threading.Barrier(2)
+        results = []
+
+        def run():
+            try:
+                barrier.wait()
+                results.append(votes.toggle("question", self.question.id, self.voter))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 늦은 요청은 ON CONFLICT로 아무것도 넣지 않고 vote_count도 올리지 않는다
+        self.assertEqual(len(results), 2)
+        self.assertEqual(QuestionVote.objects.filter(user=self.voter).count(), 1)
+        self.assertEqual(Question.objects.get(pk=self.question.id).vote_count, 1)
+
+
+class PurgeUserTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="user")
+        self.spammer = User.objects.create(username="spammer")
+        self.question = create_thread(self.user, answers=1, comments=1)
+        self.spam = create_thread(self.spammer, answers=1, comments=1)
+        now = timezone.now()
+        answer = Answer.objects.create(
+            question=self.question, content="spam", author=self.spammer, create_date=now
+        )
+        Comment.objects.create(
+            answer=answer, content="reply", author=self.user, create_date=now
+        )
+        Comment.objects.create(
+            question=self.question, content="spam", author=self.spammer, create_date=now
+        )
+        self.question.voter.add(self.spammer)
+        self.question.answer_set.first().voter.add(self.spammer)
+        self.spam.voter.add(self.user)
+        counters.reconcile()
+        self.before = Question.objects.get(pk=self.question.id)
+
+    def test_hide_then_purge_in_batches(self):
+        self.assertEqual(moderation.hide(self.spammer), 1)
+        self.assertFalse(User.objects.get(pk=self.spammer.id).is_active)
+        question = Question.objects.with_thread().get(pk=self.question.id)
+        load_comments([question])
+        self.assertEqual((question.answer_count, question.comment_count), (1, 1))
+        self.assertEqual(len(question.answer_set.all()), 1)
+        self.assertEqual(len(question.thread_comments), 1)
+        self.assertFalse(Question.objects.with_thread().filter(pk=self.spam.id))
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+        deleted = []
+        self.assertTrue(
+            moderation.purge(self.spammer.id, 1, lambda name, n: deleted.append(name))
+        )
+        self.assertEqual(deleted.count("question_vote"), 2)  # 배치마다 1개
+        self.assertFalse(User.objects.filter(pk=self.spammer.id).exists())
+        self.assertFalse(Question.objects.filter(pk=self.spam.id).exists())
+        self.assertFalse(QuestionVote.objects.filter(user=self.user).exists())
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual(question.vote_count, 0)
+        self.assertLess(question.hot_score, self.before.hot_score)
+        self.assertEqual(question.answer_set.get().vote_count, 0)
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+    def test_hidden_posts_reject_answers_comments_and_votes(self):
+        moderation.hide(self.spammer)
+        spam_answer = self.spam.answer_set.get()
+        self.client.force_login(self.user)
+        data = {"content": "reply"}
+        self.client.post(reverse("pybo:answer_create", args=[self.spam.id]), data)
+        self.client.post(
+            reverse("pybo:comment_create_question", args=[self.spam.id]), data
+        )
+        self.client.post(
+            reverse("pybo:comment_create_answer", args=[spam_answer.id]), data
+        )
+        self.client.get(reverse("pybo:vote_answer", args=[spam_answer.id]))
+        self.assertFalse(Answer.objects.filter(author=self.user, question=self.spam))
+        self.assertFalse(Comment.objects.filter(author=self.user, question=self.spam))
+        self.assertFalse(spam_answer.voter.exists())
+        toggle = reverse("pybo:toggle_vote_question", args=[self.spam.id])
+        self.assertEqual(self.client.post(toggle).status_code, 404)
+
+
+@tasks.task
+def failing_task():
+    raise ValueError("boom")
+
+
+@override_settings(
+    PYBO_TASKS_EAGER=False, PYBO_TASKS_MAX_ATTEMPTS=2, PYBO_TASKS_RETRY_DELAY=0
+)
+class TaskQueueTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="author")
+        self.question = create_thread(self.author, answers=0, comments=0)
+        Task.objects.all().delete()
+        self.client.force_login(self.author)
+
+    def test_post_write_work_runs_in_worker(self):
+        url = reverse("pybo:question_modify", args=[self.question.id])
+        for content in ("# first", "# second"):
+            self.client.post(url, {"subject": "subject", "content": content})
+        # 같은 key의 작업은 하나만 대기한다
+        self.assertEqual(
+            sorted(Task.objects.values_list("key", flat=True)),
+            [
+                "render:question:{}".format(self.question.id),
+                "search:{}".format(self.question.id),
+            ],
+        )
+        self.assertEqual(tasks.stats()["pending"], 2)
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual(question.content_html, "<p><strong>content</strong></p>")
+
+        with self.assertLogs("pybo.tasks", "INFO"):
+            call_command("run_pybo_worker", "--once", stdout=StringIO())
+        self.assertFalse(Task.objects.exists())
+        question = Question.objects.get(pk=self.question.id)
+        self.assertEqual(question.content_html, "<h1>second</h1>")
+
+    def test_failing_task_is_retried_then_kept(self):
+        with self.assertLogs("pybo.tasks", "ERROR"):
+            tasks.enqueue(failing_task)
+            worker = tasks.Worker(threads=1)
+            self.assertEqual(worker.run_once(), 1)
+            item = Task.objects.get()
+            self.assertEqual((item.status, item.attempts), (Task.PENDING, 1))
+            self.assertEqual(worker.run_once(), 1)
+        item = Task.objects.get()
+        self.assertEqual((item.status, item.attempts), (Task.FAILED, 2))
+        self.assertEqual(item.last_error, "ValueError: boom")
+        self.assertEqual(worker.run_once(), 0)
+        worker.executor.shutdown()
@@ -0,0 +1,364 @@
+"""
+pybo 데이터 내보내기/가져오기 (JSONL)
+
+한 줄에 행 하나를 {"type": 종류, 컬럼...} 로 쓴다. 종류는 SECTIONS 순서로 나오므로
+가져올 때 참조하는 행(글쓴이, 질문, 답변)이 항상 먼저 들어간다.
+내보내기는 .iterator()로, 가져오기는 chunk_size 줄씩 읽으므로 메모리 사용량은
+데이터 크기와 상관없이 일정하다. 원래 id -> 새 id 대응표도 메모리가 아니라
+TransferIdMap 테이블에 둔다.
+
+가져오기는 chunk마다 한 트랜잭션에서 행 추가와 TransferCheckpoint 갱신을 함께 하므로,
+중단되면 같은 job으로 다시 실행해 마지막으로 끝난 chunk 다음부터 이어서 가져온다.
+새 id는 테이블의 최대 id 다음 값을 직접 정하므로 가져오는 동안 글쓰기는 멈춰야 한다.
+"""
+
+import datetime
+import io
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import caching, counters, ranking, rendering, search
+from .models import (
+    Question,
+    Answer,
+    Comment,
+    QuestionVote,
+    AnswerVote,
+    TransferCheckpoint,
+    TransferIdMap,
+)
+
+SECTIONS = ("user", "question", "answer", "comment", "question_vote", "answer_vote")
+
+USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "password",
+    "first_name",
+    "last_name",
+    "is_active",
+    "date_joined",
+)
+CONTENT_FIELDS = (
+    "content",
+    "content_html",
+    "content_hash",
+    "create_date",
+    "modify_date",
+)
+
+
+class TransferError(Exception):
+    pass
+
+
+def _querysets(passwords):
+    user_fields = [name for name in USER_FIELDS if passwords or name != "password"]
+    return {
+        "user": User.objects.values(*user_fields),
+        "question": Question.objects.values(
+            "id",
+            "author_id",
+            "subject",
+            *CONTENT_FIELDS,
+            "vote_count",
+            "answer_count",
+            "comment_count",
+            "hidden",
+        ),
+        "answer": Answer.objects.values(
+            "id",
+            "question_id",
+            "author_id",
+            *CONTENT_FIELDS,
+            "vote_count",
+            "comment_count",
+            "hidden",
+        ),
+        "comment": Comment.objects.values(
+            "id",
+            "question_id",
+            "answer_id",
+            "author_id",
+            "content",
+            "create_date",
+            "modify_date",
+            "hidden",
+        ),
+        "question_vote": QuestionVote.objects.values(
+            "id", "question_id", "user_id", "create_date"
+        ),
+        "answer_vote": AnswerVote.objects.values(
+            "id", "answer_id", "user_id", "create_date"
+        ),
+    }
+
+
+def _default(value):
+    # DjangoJSONEncoder는 밀리초까지만 남기므로 직접 변환한다
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def export_lines(chunk_size=2000, after=None, passwords=True):
+    """
+    JSONL 줄을 하나씩 돌려준다. after=(종류, id)이면 그 행 다음부터 (내보내기 이어하기)
+    passwords=False이면 사용자의 비밀번호 해시를 빼고 내보낸다.
+    모든 종류를 한 트랜잭션에서 읽으므로 내보내는 동안 글이 써져도 같은 시점의 데이터다.
+    (PostgreSQL은 REPEATABLE READ. 이어하기는 새 트랜잭션이라 앞부분과 시점이 다르다)
+    """
+    querysets = _querysets(passwords)
+    start = SECTIONS.index(after[0]) if after else 0
+    snapshot = connection.vendor == "postgresql" and not connection.in_atomic_block
+    with transaction.atomic():
+        if snapshot:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+                )
+        for kind in SECTIONS[start:]:
+            queryset = querysets[kind].order_by("id")
+            if after and kind == after[0]:
+                queryset = queryset.filter(id__gt=after[1])
+            for row in queryset.iterator(chunk_size=chunk_size):
+                row = {"type": kind, **row}
+                yield json.dumps(row, default=_default, ensure_ascii=False) + "\n"
+
+
+def _csv_value(value):
+    # COPY ... (FORMAT csv)에서 따옴표 없는 빈 값은 NULL, "" 는 빈 문자열이다
+    if value is None:
+        return ""
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def _insert(model, rows):
+    """
+    rows([{컬럼(attname): 값}, ...])를 넣는다. PostgreSQL은 COPY, 나머지는 bulk_create
+    """
+    if not rows:
+        return
+    if connection.vendor != "postgresql":
+        model.objects.bulk_create([model(**row) for row in rows])
+        return
+    names = list(rows[0])
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(model._meta.get_field(name).column) for name in names),
+    )
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_csv_value(row[name]) for name in names) + "\n")
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+class Importer:
+    def __init__(self, job, chunk_size=2000):
+        self.checkpoint, _ = TransferCheckpoint.objects.get_or_create(job=job)
+        self.chunk_size = chunk_size
+
+    @property
+    def finished(self):
+        return self.checkpoint.finished
+
+    def run(self, lines, progress=None):
+        """
+        lines(JSONL 줄)를 가져오고 처리한 줄 수를 돌려준다.
+        progress(줄 번호)는 chunk를 커밋할 때마다 불린다.
+        """
+        skip = self.checkpoint.line
+        chunk = []
+        number = 0
+        for number, line in enumerate(lines, 1):
+            if number <= skip or not line.strip():
+                continue
+            try:
+                chunk.append(json.loads(line))
+            except ValueError as e:
+                raise TransferError("{}번째 줄: {}".format(number, e)) from e
+            if len(chunk) >= self.chunk_size:
+                self.flush(chunk, number)
+                chunk = []
+                if progress:
+                    progress(number)
+        if chunk:
+            self.flush(chunk, number)
+            if progress:
+                progress(number)
+        self.finish()
+        return max(number - skip, 0)
+
+    def flush(self, chunk, number):
+        rows = {kind: [] for kind in SECTIONS}
+        for row in chunk:
+            kind = row.pop("type", None)
+            if kind not in rows:
+                raise TransferError("알 수 없는 종류: {}".format(kind))
+            rows[kind].append(row)
+        with transaction.atomic():
+            for kind in SECTIONS:
+                if rows[kind]:
+                    getattr(self, "import_" + kind)(rows[kind])
+            self.checkpoint.line = number
+            self.checkpoint.save(update_fields=["line", "modify_date"])
+
+    def finish(self):
+        """
+        id 시퀀스, 집계 컬럼, 검색 인덱스, 목록 캐시를 맞추고 대응표를 지운다.
+        중단되어 다시 실행해도 결과는 같다.
+        """
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Question, Answer, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        counters.reconcile()
+        ranking.recompute()
+        search.rebuild()
+        caching.bump_list_version()
+        TransferIdMap.objects.filter(checkpoint=self.checkpoint).delete()
+        self.checkpoint.finished = True
+        self.checkpoint.save(update_fields=["finished", "modify_date"])
+
+    def lookup(self, kind, old_ids):
+        """
+        원래 id -> 새 id. 앞에서 가져오지 않은 id가 있으면 TransferError
+        """
+        old_ids = {old_id for old_id in old_ids if old_id is not None}
+        mapping = dict(
+            TransferIdMap.objects.filter(
+                checkpoint=self.checkpoint, kind=kind, old_id__in=old_ids
+            ).values_list("old_id", "new_id")
+        )
+        missing = old_ids - set(mapping)
+        if missing:
+            raise TransferError(
+                "{} id {}를 찾을 수 없습니다.".format(kind, sorted(missing)[:10])
+            )
+        return mapping
+
+    def remember(self, kind, pairs):
+        TransferIdMap.objects.bulk_create(
+            TransferIdMap(
+                checkpoint=self.checkpoint, kind=kind, old_id=old_id, new_id=new_id
+            )
+            for old_id, new_id in pairs
+        )
+
+    def assign_ids(self, model, kind, rows):
+        """
+        rows에 새 id를 넣고 대응표에 기록한다.
+        """
+        next_id = _next_id(model)
+        pairs = []
+        for offset, row in enumerate(rows):
+            pairs.append((row["id"], next_id + offset))
+            row["id"] = next_id + offset
+        self.remember(kind, pairs)
+
+    def import_user(self, rows):
+        # 같은 username이 있으면 그 사용자를 쓴다
+        existing = dict(
+            User.objects.filter(
+                username__in=[row["username"] for row in rows]
+            ).values_list("username", "id")
+        )
+        self.remember(
+            "user",
+            [
+                (row["id"], existing[row["username"]])
+                for row in rows
+                if row["username"] in existing
+            ],
+        )
+        rows = [row for row in rows if row["username"] not in existing]
+        for row in rows:
+            # 비밀번호 없이 내보낸 사용자는 로그인할 수 없는 상태로 만든다
+            row.setdefault("password", make_password(None))
+        self.assign_ids(User, "user", rows)
+        _insert(User, rows)
+
+    def render(self, rows):
+        for row in rows:
+            row.setdefault("hidden", False)  # hidden이 없는 예전 파일
+            if row["content_hash"] != rendering.digest(row["content"]):
+                row["content_html"] = rendering.render(row["content"])
+                row["content_hash"] = rendering.digest(row["content"])
+
+    def import_question(self, rows):
+        users = self.lookup("user", [row["author_id"] for row in rows])
+        for row in rows:
+            row["author_id"] = users[row["author_id"]]
+        self.render(rows)
+        self.assign_ids(Question, "question", rows)
+        _insert(Question, rows)
+
+    def import_answer(self, rows):
+        users = self.lookup("user", [row["author_id"] for row in rows])
+        questions = self.lookup("question", [row["question_id"] for row in rows])
+        for row in rows:
+            row["author_id"] = users[row["author_id"]]
+            row["question_id"] = questions[row["question_id"]]
+        self.render(rows)
+        self.assign_ids(Answer, "answer", rows)
+        _insert(Answer, rows)
+
+    def import_comment(self, rows):
+        users = self.lookup("user", [row["author_id"] for row in rows])
+        questions = self.lookup("question", [row["question_id"] for row in rows])
+        answers = self.lookup("answer", [row["answer_id"] for row in rows])
+        # 답변 댓글에 질문이 없는 예전 파일은 답변의 질문으로 채운다
+        owners = dict(
+            Answer.objects.filter(
+                pk__in=[
+                    answers[row["answer_id"]]
+                    for row in rows
+                    if row["question_id"] is None and row["answer_id"] is not None
+                ]
+            ).values_list("id", "question_id")
+        )
+        for row in rows:
+            row["author_id"] = users[row["author_id"]]
+            row["answer_id"] = answers.get(row["answer_id"])
+            row["question_id"] = questions.get(row["question_id"]) or owners.get(
+                row["answer_id"]
+            )
+            row.setdefault("hidden", False)
+            del row["id"]  # 댓글을 참조하는 행은 없으므로 새 id는 DB가 정한다
+        _insert(Comment, rows)
+
+    def import_votes(self, model, kind, field, rows):
+        users = self.lookup("user", [row["user_id"] for row in rows])
+        targets = self.lookup(kind, [row[field] for row in rows])
+        _insert(
+            model,
+            [
+                {
+                    field: targets[row[field]],
+                    "user_id": users[row["user_id"]],
+                    "create_date": row["create_date"],
+                }
+                for row in rows
+            ],
+        )
+
+    def import_question_vote(self, rows):
+        self.import_votes(QuestionVote, "question", "question_id", rows)
+
+    def import_answer_vote(self, rows):
+        self.import_votes(AnswerVote, "answer", "answer_id", rows)
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from .views import base_views, question_views, answer_views, comment_views, vote_views
+from .views import api_views, async_views, transfer_views
+
+# ASGI로 실행할 때(config/asgi.py)는 읽기 화면과 추천에 비동기 view를 쓴다
+read_views = async_views if settings.PYBO_ASYNC_VIEWS else base_views
+vote = async_views if settings.PYBO_ASYNC_VIEWS else vote_views
 
 app_name = "pybo"
 
 urlpatterns = [
     # base_views.py
-    path("", base_views.index, name="index"),
-    path("<int:question_id>/", base_views.detail, name="detail"),
+    path("", read_views.index, name="index"),
+    path("<int:question_id>/", read_views.detail, name="detail"),
     # question_views.py
     path("question/create/", question_views.question_create, name="question_create"),
     path(
@@ -69,8 +75,28 @@ urlpatterns = [
     # vote_views.py
     path(
         "vote/question/<int:question_id>/",
-        vote_views.vote_question,
+        vote.vote_question,
         name="vote_question",
     ),
-    path("vote/answer/<int:answer_id>/", vote_views.vote_answer, name="vote_answer"),
-]
\ No newline at end of file
+    path("vote/answer/<int:answer_id>/", vote.vote_answer, name="vote_answer"),
+    path(
+        "vote/question/<int:question_id>/toggle/",
+        vote_views.toggle_vote_question,
+        name="toggle_vote_question",
+    ),
+    path(
+        "vote/answer/<int:answer_id>/toggle/",
+        vote_views.toggle_vote_answer,
+        name="toggle_vote_answer",
+    ),
+    # api_views.py (JSON)
+    path("api/questions/", api_views.question_list, name="api_question_list"),
+    path("api/questions/batch/", api_views.question_batch, name="api_question_batch"),
+    path(
+        "api/questions/<int:question_id>/",
+        api_views.question_thread,
+        name="api_question_thread",
+    ),
+    # transfer_views.py
+    path("export/", transfer_views.export, name="export"),
+]
@@ -1,18 +1,29 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import redirect, render, get_object_or_404, resolve_url
 from django.utils import timezone
 
+from common.ratelimit import ratelimit
+
+from .. import ranking, tasks
 from ..models import Question, Answer
 from ..forms import AnswerForm
 
 
+def render_key(answer):
+    return "render:answer:{}".format(answer.id)
+
+
 @login_required(login_url="common:login")
+@ratelimit("post")
 def answer_create(request, question_id):
     """
     pybo 답변 등록
     """
-    question = get_object_or_404(Question, pk=question_id)
+    question = get_object_or_404(Question.objects.filter(hidden=False), pk=question_id)
     if request.method == "POST":
         form = AnswerForm(request.POST)
         if form.is_valid():
@@ -20,7 +31,15 @@ def answer_create(request, question_id):
             answer.author = request.user  # 추가한 속성 author 적용
             answer.create_date = timezone.now()
             answer.question = question
-            answer.save()
+            with transaction.atomic():
+                answer.save(render=False)
+                tasks.enqueue(
+                    tasks.render_post, "answer", answer.id, key=render_key(answer)
+                )
+                Question.objects.filter(pk=question.id).update(
+                    answer_count=F("answer_count") + 1
+                )
+                ranking.add(question.id, settings.PYBO_HOT_ANSWER_WEIGHT)
             return redirect(
                 "{}#answer_{}".format(
                     resolve_url("pybo:detail", question_id=question.id), answer.id
@@ -50,7 +69,10 @@ def answer_modify(request, answer_id):
             answer = form.save(commit=False)
             answer.author = request.user
             answer.modify_date = timezone.now()
-            answer.save()
+            answer.save(render=False)
+            tasks.enqueue(
+                tasks.render_post, "answer", answer.id, key=render_key(answer)
+            )
             return redirect(
                 "{}#answer_{}".format(
                     resolve_url("pybo:detail", question_id=answer.question.id),
@@ -73,5 +95,14 @@ def answer_delete(request, answer_id):
     if request.user != answer.author:
         messages.error(request, "削除権限がありません")
     else:
-        answer.delete()
-    return redirect("pybo:detail", question_id=answer.question.id)
\ No newline at end of file
+        with transaction.atomic():
+            answer.delete()
+            Question.objects.filter(pk=answer.question_id).update(
+                answer_count=F("answer_count") - 1
+            )
+            ranking.add(
+                answer.question_id,
+                -settings.PYBO_HOT_ANSWER_WEIGHT,
+                when=answer.create_date,
+            )
+    return redirect("pybo:detail", question_id=answer.question.id)
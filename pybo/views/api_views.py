@@ -0,0 +1,257 @@
+"""
+pybo 읽기 전용 JSON API
+
+목록/상세 화면과 같은 queryset(base_views.list_questions, Question.objects.with_thread)을
+쓰므로 두 화면과 결과가 어긋나지 않는다. fields=로 고른 필드의 컬럼만 읽는다.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_GET
+
+from .. import rendering
+from ..models import Question, load_comments
+from .base_views import (
+    SORT_ORDERS,
+    list_questions,
+    paginate_questions,
+    thread_version_for,
+)
+
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_BATCH = 100
+
+
+def _getter(name):
+    return lambda obj: getattr(obj, name)
+
+
+def _author(obj):
+    return obj.author.username
+
+
+# API 필드 -> (읽을 컬럼, 값을 꺼내는 함수)
+QUESTION_FIELDS = {
+    "id": (["id"], _getter("id")),
+    "subject": (["subject"], _getter("subject")),
+    "content": (["content"], _getter("content")),
+    "content_html": (["content", "content_html", "content_hash"], rendering.html_for),
+    "author": (["author__username"], _author),
+    "create_date": (["create_date"], _getter("create_date")),
+    "modify_date": (["modify_date"], _getter("modify_date")),
+    "vote_count": (["vote_count"], _getter("vote_count")),
+    "answer_count": (["answer_count"], _getter("answer_count")),
+    "comment_count": (["comment_count"], _getter("comment_count")),
+}
+LIST_FIELDS = ["id", "subject", "author", "create_date", "vote_count", "answer_count"]
+
+# 상세(thread)에서만 쓰는 필드. 답변/댓글은 모든 필드를 보낸다.
+THREAD_FIELDS = ["answers", "comments"]
+ANSWER_FIELDS = {
+    name: QUESTION_FIELDS[name]
+    for name in (
+        "id",
+        "content",
+        "content_html",
+        "author",
+        "create_date",
+        "modify_date",
+        "vote_count",
+        "comment_count",
+    )
+}
+COMMENT_FIELDS = {
+    name: QUESTION_FIELDS[name]
+    for name in ("id", "content", "author", "create_date", "modify_date")
+}
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _parse_fields(request, available, default):
+    """
+    fields=a,b,c -> 필드 목록. 모르는 필드가 있으면 None
+    """
+    raw = request.GET.get("fields", "")
+    if not raw:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(",")))
+    if any(name not in available for name in names):
+        return None
+    return names
+
+
+def _only(queryset, fields, extra=()):
+    """
+    fields에 필요한 컬럼만 읽는다. 글쓴이를 쓰지 않으면 join도 하지 않는다.
+    """
+    columns = {"id", *extra}
+    for name in fields:
+        columns.update(QUESTION_FIELDS[name][0])
+    if "author" not in fields:
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns)
+
+
+def _serialize(obj, fields, available):
+    return {name: available[name][1](obj) for name in fields}
+
+
+def _json(request, data):
+    """
+    본문 해시를 ETag로 붙이고, If-None-Match가 같으면 304
+    """
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    etag = quote_etag(hashlib.md5(content.encode("utf-8")).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
+
+def _page_cursor(number):
+    # 검색 결과는 페이지 번호로 나누므로 번호를 커서로 감싼다
+    payload = json.dumps(["page", number]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _cursor_page(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, number = json.loads(base64.urlsafe_b64decode(padded))
+        return int(number) if kind == "page" else None
+    except (ValueError, TypeError):
+        return None
+
+
+@require_GET
+def question_list(request):
+    """
+    pybo 목록 (JSON)
+    so, kw는 목록 화면과 같고, 다음/이전 페이지는 응답의 next, previous를 cursor로 넘긴다.
+    """
+    kw = request.GET.get("kw", "")
+    so = request.GET.get("so", "recent")
+    if so not in SORT_ORDERS:
+        so = "recent"
+    cursor = request.GET.get("cursor", "")
+    fields = _parse_fields(request, QUESTION_FIELDS, LIST_FIELDS)
+    if fields is None:
+        return _error("fields는 {} 중에서 고릅니다.".format(", ".join(QUESTION_FIELDS)))
+    try:
+        limit = min(max(int(request.GET.get("limit", PER_PAGE)), 1), MAX_PER_PAGE)
+    except ValueError:
+        return _error("limit은 숫자입니다.")
+
+    ordering = [name.lstrip("-") for name in SORT_ORDERS[so]]
+    question_list = _only(list_questions(so, kw), fields, ordering)
+    if kw:
+        page_obj = paginate_questions(
+            question_list, so, kw, page=_cursor_page(cursor), per_page=limit
+        )
+        next_cursor = page_obj.has_next() and _page_cursor(page_obj.number + 1)
+        previous_cursor = page_obj.has_previous() and _page_cursor(page_obj.number - 1)
+    else:
+        page_obj = paginate_questions(question_list, so, kw, cursor, per_page=limit)
+        next_cursor = page_obj.next_cursor
+        previous_cursor = page_obj.previous_cursor
+
+    data = {
+        "count": page_obj.paginator.count,
+        "next": next_cursor or None,
+        "previous": previous_cursor or None,
+        "results": [
+            _serialize(question, fields, QUESTION_FIELDS) for question in page_obj
+        ],
+    }
+    return _json(request, data)
+
+
+@require_GET
+def question_batch(request):
+    """
+    pybo 질문 여러 개 (JSON). ids=1,2,3 순서대로 돌려주고 없는 id는 missing에 담는다.
+    """
+    try:
+        ids = [int(pk) for pk in request.GET.get("ids", "").split(",") if pk]
+    except ValueError:
+        return _error("ids는 쉼표로 구분한 숫자입니다.")
+    ids = list(dict.fromkeys(ids))
+    if not ids or len(ids) > MAX_BATCH:
+        return _error("ids는 1~{}개입니다.".format(MAX_BATCH))
+    fields = _parse_fields(request, QUESTION_FIELDS, LIST_FIELDS)
+    if fields is None:
+        return _error("fields는 {} 중에서 고릅니다.".format(", ".join(QUESTION_FIELDS)))
+
+    queryset = _only(list_questions("recent", ""), fields).filter(pk__in=ids)
+    questions = {question.id: question for question in queryset}
+    data = {
+        "results": [
+            _serialize(questions[pk], fields, QUESTION_FIELDS)
+            for pk in ids
+            if pk in questions
+        ],
+        "missing": [pk for pk in ids if pk not in questions],
+    }
+    return _json(request, data)
+
+
+def thread_etag(request, question_id):
+    """
+    상세화면과 같은 스레드 버전으로 만든 ETag (스레드를 읽기 전에 확인한다)
+    """
+    version = thread_version_for(request, question_id)
+    if version is None:
+        return None
+    key = repr((sorted(version.items()), request.GET.get("fields", "")))
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+@require_GET
+@condition(etag_func=thread_etag)
+def question_thread(request, question_id):
+    """
+    pybo 질문과 답변, 댓글 (JSON)
+    fields에 answers, comments를 넣지 않으면 답변, 댓글은 읽지 않는다.
+    """
+    available = {**QUESTION_FIELDS, **dict.fromkeys(THREAD_FIELDS)}
+    fields = _parse_fields(request, available, [*QUESTION_FIELDS, *THREAD_FIELDS])
+    if fields is None:
+        return _error("fields는 {} 중에서 고릅니다.".format(", ".join(available)))
+    question_fields = [name for name in fields if name in QUESTION_FIELDS]
+    answers = "answers" in fields
+    comments = "comments" in fields
+
+    queryset = Question.objects.with_thread(answers=answers)
+    question = get_object_or_404(_only(queryset, question_fields), pk=question_id)
+    if comments:
+        load_comments([question])
+
+    def comment_list(obj):
+        return [
+            _serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+            for comment in obj.thread_comments
+        ]
+
+    data = _serialize(question, question_fields, QUESTION_FIELDS)
+    if comments:
+        data["comments"] = comment_list(question)
+    if answers:
+        data["answers"] = []
+        for answer in question.answer_set.all():
+            item = _serialize(answer, ANSWER_FIELDS, ANSWER_FIELDS)
+            if comments:
+                item["comments"] = comment_list(answer)
+            data["answers"].append(item)
+    return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
@@ -0,0 +1,120 @@
+"""
+ASGI(config/asgi.py)에서 쓰는 비동기 읽기 화면과 추천
+
+Django 3.1에는 비동기 ORM이 없고, ASGI에서 동기 view는 프로세스당 스레드 하나에서
+차례로 실행된다. 여기서는 DB 작업과 템플릿/Markdown 렌더링을 크기가 정해진 스레드 풀에서
+실행하고 이벤트 루프는 느린 클라이언트의 입출력만 기다리게 한다.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+
+from ..models import Question, load_comments
+from . import base_views, vote_views
+
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.PYBO_ASYNC_DB_THREADS, thread_name_prefix="pybo-db"
+)
+RENDER_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.PYBO_ASYNC_RENDER_THREADS, thread_name_prefix="pybo-render"
+)
+
+
+def _pool_call(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # 풀 스레드의 연결은 request_finished 신호로 닫히지 않으므로 여기서 정리한다
+        # (렌더링도 템플릿 태그나 지연 로딩으로 DB를 쓸 수 있다)
+        close_old_connections()
+
+
+async def _run(executor, func, *args):
+    loop = asyncio.get_running_loop()
+    # 요청의 contextvar(perf 계측, 복제 DB 라우팅)를 풀 스레드로 넘긴다
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, context.run, partial(_pool_call, func, *args)
+    )
+
+
+async def run_db(func, *args):
+    return await _run(DB_EXECUTOR, func, *args)
+
+
+async def run_render(func, *args):
+    return await _run(RENDER_EXECUTOR, func, *args)
+
+
+def _load_user(request):
+    """
+    세션과 사용자를 읽어 둔다. 이후 request.user는 DB를 다시 조회하지 않는다.
+    """
+    request.user.is_authenticated
+    return request.user
+
+
+async def index(request):
+    """
+    pybo 목록 출력 (비동기)
+    목록은 Markdown이 없으므로 캐시 조회부터 렌더링까지 DB 풀에서 한 번에 처리한다.
+    """
+    return await run_db(base_views.index, request)
+
+
+def _load_detail(request, question_id):
+    user = _load_user(request)
+    response, headers = base_views.detail_conditions(request, question_id)
+    if response is not None:
+        return response, headers, None
+    question = get_object_or_404(
+        Question.objects.with_thread(user=user), pk=question_id
+    )
+    load_comments([question])
+    base_views.add_pending_vote(request, question)
+    context = {
+        "question": question,
+        "user": user,
+        "messages": list(messages.get_messages(request)),
+    }
+    return None, headers, context
+
+
+@base_views.revalidate_per_user
+async def detail(request, question_id):
+    """
+    pybo 내용 출력 (비동기)
+    """
+    response, headers, context = await run_db(_load_detail, request, question_id)
+    if response is None:
+        content = await run_render(
+            render_to_string, "pybo/question_detail.html", context, request
+        )
+        response = HttpResponse(content)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+async def vote_question(request, question_id):
+    """
+    pybo 질문추천등록 (비동기)
+    로그인 확인을 포함한 동기 view 전체를 DB 풀에서 실행한다.
+    """
+    return await run_db(vote_views.vote_question, request, question_id)
+
+
+async def vote_answer(request, answer_id):
+    """
+    pybo 답변추천등록 (비동기)
+    """
+    return await run_db(vote_views.vote_answer, request, answer_id)
@@ -1,61 +1,196 @@
-from django.core.paginator import Paginator
-from django.db.models import Q, Count  # 조회용 Query 객체 생성
+import asyncio
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
 from django.shortcuts import render, get_object_or_404
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from ..caching import cache_list_page
+from ..models import Question, load_comments
+from ..paginator import CachedCountPaginator, KeysetPaginator
+from .. import search, votes
+
+# 정렬기준별 정렬키. keyset 페이징이 쓰므로 마지막은 항상 유일한 id
+SORT_ORDERS = {
+    "recent": ("-create_date", "-id"),
+    "recommend": ("-vote_count", "-create_date", "-id"),
+    "popular": ("-answer_count", "-create_date", "-id"),
+    "hot": ("-hot_score", "-create_date", "-id"),  # 최근 추천/답변 (pybo/ranking.py)
+}
 
-from ..models import Question
+# 상세화면(비로그인)의 쿼리 수 상한. 답변/댓글 수와 상관없이 일정해야 한다.
+# 조건부 GET용 thread_version() 1번 + with_thread() 2번 + load_comments() 1번
+# pybo/tests.py에서 검사한다.
+DETAIL_QUERY_BUDGET = 4
 
-import logging
 
-logger = logging.getLogger(__name__)
+def list_questions(so, kw):
+    """
+    목록 화면과 JSON API(api_views.py)가 함께 쓰는 질문 목록 queryset
+    """
+    # 정렬
+    question_list = (
+        Question.objects.filter(hidden=False)
+        .select_related("author")
+        .order_by(*SORT_ORDERS[so])
+    )
+
+    # 검색 (pybo/search.py의 검색 인덱스 사용)
+    if kw:
+        question_list = search.search_questions(question_list, kw)
+        if so == "recent":  # 기본 정렬에서는 관련도 순으로 보여준다
+            question_list = question_list.order_by("-search_rank", "-create_date")
+    return question_list
+
+
+def paginate_questions(question_list, so, kw, cursor="", page=None, per_page=10):
+    """
+    list_questions()의 결과를 페이징한다. (목록 화면과 JSON API 공용)
+    """
+    if kw:
+        # 검색 결과는 관련도 순이라 keyset을 쓸 수 없으므로 페이지 번호로 나눈다
+        paginator = CachedCountPaginator(question_list, per_page, count_key="kw:" + kw)
+        return paginator.get_page(page)
+    # 깊은 페이지도 첫 페이지와 같은 비용이 들도록 keyset 페이징
+    paginator = KeysetPaginator(
+        question_list,
+        per_page,
+        SORT_ORDERS[so],
+        "all",
+        max_number=settings.PYBO_LIST_MAX_PAGE_NUMBER,
+    )
+    return paginator.get_page(cursor=cursor, number=page)
 
 
+@cache_list_page
 def index(request):  # request는 장고에 의해 자동으로 전달되는 HTTP요청 객체이다.
     # request는 사용자가 전달한 데이터를 확인할 때 사용된다.
 
     """
     pybo 목록 출력
     """
-    logger.info("INFO レベルで出力")
 
     page = request.GET.get("page", "1")  # 페이지
+    cursor = request.GET.get("cursor", "")  # keyset 페이징 커서 (이전/다음 버튼)
     kw = request.GET.get("kw", "")  # 검색어
     so = request.GET.get("so", "recent")  # 정렬기준
-
-    # 정렬
-    if so == "recommend":
-        question_list = Question.objects.annotate(num_voter=Count("voter")).order_by(
-            "-num_voter", "-create_date"
-        )
-    elif so == "popular":
-        question_list = Question.objects.annotate(num_answer=Count("answer")).order_by(
-            "-num_answer", "-create_date"
-        )
-    else:  # recent
-        question_list = Question.objects.order_by("-create_date")
-
-    # 검색
-    if kw:
-        question_list = question_list.filter(
-            Q(subject__icontains=kw)
-            | Q(content__icontains=kw)  # 제목검색
-            | Q(author__username__icontains=kw)  # 내용검색
-            | Q(answer__author__username__icontains=kw)  # 질문 글쓴이검색  # 답변 글쓴이검색
-        ).distinct()
-
-    # 페이징 처리
-    paginator = Paginator(question_list, 10)  # 페이지당 10개씩 보여주기
-    page_obj = paginator.get_page(page)
+    if so not in SORT_ORDERS:
+        so = "recent"
+    question_list = list_questions(so, kw)
+    page_obj = paginate_questions(question_list, so, kw, cursor, page)
 
     context = {"question_list": page_obj, "page": page, "kw": kw, "so": so}
     return render(request, "pybo/question_list.html", context)
 
 
+def thread_version_for(request, question_id):
+    # etag_func, last_modified_func이 각각 부르므로 요청당 한 번만 조회
+    if not hasattr(request, "_pybo_thread_version"):
+        version = Question.objects.thread_version(question_id)
+        if version is not None and settings.PYBO_VOTE_BUFFER:
+            # 반영 전인 자기 추천도 ETag에 넣는다 (votes.py)
+            version["pending_vote"] = votes.pending(request.user, question_id)
+        request._pybo_thread_version = version
+    return request._pybo_thread_version
+
+
+def add_pending_vote(request, question):
+    """
+    추천한 사용자에게는 반영 전인 자기 추천을 추천수와 추천 여부에 더해 보여준다.
+    """
+    version = thread_version_for(request, question.id) or {}
+    if version.get("pending_vote"):
+        question.vote_count += 1
+        question.voted = True
+
+
+def detail_etag(request, question_id):
+    """
+    스레드 버전 + 사용자(수정/삭제 버튼이 사용자마다 다르다)로 만든 ETag
+    """
+    if len(messages.get_messages(request)):
+        return None  # 한 번만 보여줄 메시지가 있으면 항상 새로 그린다
+    version = thread_version_for(request, question_id)
+    if version is None:
+        return None
+    key = repr((sorted(version.items()), request.user.pk))
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def detail_last_modified(request, question_id):
+    if len(messages.get_messages(request)):
+        return None
+    version = thread_version_for(request, question_id)
+    return version and version["last_modified"]
+
+
+def detail_conditions(request, question_id):
+    """
+    상세화면의 조건부 GET (@condition과 같은 처리)
+    (304/412 응답 또는 None, 응답에 붙일 ETag/Last-Modified 헤더)
+    동기 detail과 async_views.detail이 함께 쓴다.
+    """
+    etag = detail_etag(request, question_id)
+    last_modified = detail_last_modified(request, question_id)
+    headers = {}
+    if etag:
+        headers["ETag"] = quote_etag(etag)
+    if last_modified:
+        last_modified = int(last_modified.timestamp())
+        headers["Last-Modified"] = http_date(last_modified)
+    response = get_conditional_response(
+        request, etag=headers.get("ETag"), last_modified=last_modified
+    )
+    return response, headers
+
+
+def revalidate_per_user(view):
+    """
+    브라우저가 매번 ETag로 확인하도록 하고, 사용자마다 다른 페이지이므로 공유 캐시는 막는다.
+    304 응답에도 붙도록 조건부 GET 응답까지 감싼다. (비동기 view도 감싼다)
+    """
+
+    def patch(response):
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Cookie"])
+        return response
+
+    if asyncio.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            return patch(await view(request, *args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return patch(view(request, *args, **kwargs))
+
+    return wrapper
+
+
+@revalidate_per_user
 def detail(request, question_id):
     """
     pybo 내용 출력
     """
-    question = get_object_or_404(
-        Question, pk=question_id
-    )  # 키워드 인자는 매개변수도 키워드인자의 키워드와 이름이 같아야한다.
-    context = {"question": question}
-    return render(request, "pybo/question_detail.html", context)
+    response, headers = detail_conditions(request, question_id)
+    if response is None:
+        question = get_object_or_404(
+            Question.objects.with_thread(user=request.user), pk=question_id
+        )  # 키워드 인자는 매개변수도 키워드인자의 키워드와 이름이 같아야한다.
+        load_comments([question])
+        add_pending_vote(request, question)
+        context = {"question": question}
+        response = render(request, "pybo/question_detail.html", context)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -1,19 +1,23 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import redirect, render, get_object_or_404, resolve_url
 from django.utils import timezone
 
+from common.ratelimit import ratelimit
+
 from ..models import Comment, Question, Answer
 from ..forms import CommentForm
 
 
 @login_required(login_url="common:login")
+@ratelimit("post")
 def comment_create_question(request, question_id):
-
     """
     pybo 질문댓글등록
     """
-    question = get_object_or_404(Question, pk=question_id)
+    question = get_object_or_404(Question.objects.filter(hidden=False), pk=question_id)
 
     if request.method == "POST":
         form = CommentForm(request.POST)
@@ -23,10 +27,14 @@ def comment_create_question(request, question_id):
             comment.author = request.user
             comment.question = question
             comment.create_date = timezone.now()
-            comment.save()
+            with transaction.atomic():
+                comment.save()
+                Question.objects.filter(pk=question.id).update(
+                    comment_count=F("comment_count") + 1
+                )
             return redirect(
                 "{}#comment_{}".format(
-                    resolve_url("pybo:detail", question_id=comment.question.id),
+                    resolve_url("pybo:detail", question_id=comment.question_id),
                     comment.id,
                 )
             )
@@ -39,7 +47,6 @@ def comment_create_question(request, question_id):
 
 @login_required(login_url="comment:login")
 def comment_modify_question(request, comment_id):
-
     """
     pybo 질문 댓글 수정
     """
@@ -48,7 +55,7 @@ def comment_modify_question(request, comment_id):
 
     if comment.author != request.user:
         messages.error(request, "修正権限がありません")
-        return redirect("pybo:detail", question_id=comment.question.id)
+        return redirect("pybo:detail", question_id=comment.question_id)
 
     if request.method == "POST":
         form = CommentForm(request.POST, instance=comment)
@@ -58,7 +65,7 @@ def comment_modify_question(request, comment_id):
             comment.save()
             return redirect(
                 "{}#comment_{}".format(
-                    resolve_url("pybo:detail", question_id=comment.question.id),
+                    resolve_url("pybo:detail", question_id=comment.question_id),
                     comment.id,
                 )
             )
@@ -71,30 +78,37 @@ def comment_modify_question(request, comment_id):
 
 @login_required(login_url="common:login")
 def comment_delete_question(request, comment_id):
-
     """
     pybo 질문 댓글 삭제
     """
 
-    comment = get_object_or_404(Comment, pk=comment_id)
+    # 답변 댓글은 답변의 댓글수에서 빼야 하므로 comment_delete_answer로만 지운다
+    comment = get_object_or_404(Comment.objects.filter(answer=None), pk=comment_id)
 
     if comment.author != request.user:
         messages.error(request, "削除権限がありません")
 
     else:
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            if not comment.hidden:  # 숨긴 댓글은 이미 댓글수에서 빠졌다
+                Question.objects.filter(pk=comment.question_id).update(
+                    comment_count=F("comment_count") - 1
+                )
 
-    return redirect("pybo:detail", question_id=comment.question.id)
+    return redirect("pybo:detail", question_id=comment.question_id)
 
 
 @login_required(login_url="common:login")
+@ratelimit("post")
 def comment_create_answer(request, answer_id):
-
     """
     pybo 답변 댓글 등록
     """
 
-    answer = get_object_or_404(Answer, pk=answer_id)
+    answer = get_object_or_404(
+        Answer.objects.filter(hidden=False, question__hidden=False), pk=answer_id
+    )
     if request.method == "POST":
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -102,10 +116,15 @@ def comment_create_answer(request, answer_id):
             comment.author = request.user
             comment.create_date = timezone.now()
             comment.answer = answer
-            comment.save()
+            comment.question_id = answer.question_id
+            with transaction.atomic():
+                comment.save()
+                Answer.objects.filter(pk=answer.id).update(
+                    comment_count=F("comment_count") + 1
+                )
             return redirect(
                 "{}#comment_{}".format(
-                    resolve_url("pybo:detail", question_id=comment.answer.question.id),
+                    resolve_url("pybo:detail", question_id=comment.question_id),
                     comment.id,
                 )
             )
@@ -124,7 +143,7 @@ def comment_modify_answer(request, comment_id):
     comment = get_object_or_404(Comment, pk=comment_id)
     if request.user != comment.author:
         messages.error(request, "修正権限がありません")
-        return redirect("pybo:detail", question_id=comment.answer.question.id)
+        return redirect("pybo:detail", question_id=comment.question_id)
 
     if request.method == "POST":
         form = CommentForm(request.POST, instance=comment)
@@ -135,7 +154,7 @@ def comment_modify_answer(request, comment_id):
             comment.save()
             return redirect(
                 "{}#comment_{}".format(
-                    resolve_url("pybo:detail", question_id=comment.answer.question.id),
+                    resolve_url("pybo:detail", question_id=comment.question_id),
                     comment.id,
                 )
             )
@@ -150,10 +169,17 @@ def comment_delete_answer(request, comment_id):
     """
     pybo 답글댓글삭제
     """
-    comment = get_object_or_404(Comment, pk=comment_id)
+    comment = get_object_or_404(
+        Comment.objects.filter(answer__isnull=False), pk=comment_id
+    )
     if request.user != comment.author:
         messages.error(request, "削除権限がありません")
-        return redirect("pybo:detail", question_id=comment.answer.question.id)
+        return redirect("pybo:detail", question_id=comment.question_id)
     else:
-        comment.delete()
-    return redirect("pybo:detail", question_id=comment.answer.question.id)
+        with transaction.atomic():
+            comment.delete()
+            if not comment.hidden:
+                Answer.objects.filter(pk=comment.answer_id).update(
+                    comment_count=F("comment_count") - 1
+                )
+    return redirect("pybo:detail", question_id=comment.question_id)
@@ -1,25 +1,43 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import redirect, render, get_object_or_404
 from django.utils import timezone
 
+from common.ratelimit import ratelimit
+
+from .. import ranking, tasks
 from ..models import Question
 from ..forms import QuestionForm
 
 
+def render_key(question):
+    return "render:question:{}".format(question.id)
+
+
 @login_required(login_url="common:login")
+@ratelimit("post")
 def question_create(request):
     """
     pybo 질문 등록
     """
     if request.method == "POST":
-        form = QuestionForm(request.POST)  # 아래의 form과 id는 다른 것이라고 추측, 같을 수도 있고.
+        form = QuestionForm(
+            request.POST
+        )  # 아래의 form과 id는 다른 것이라고 추측, 같을 수도 있고.
 
         if form.is_valid():  # post로 받은 데이터가 유효한지 검사.
-            question = form.save(commit=False)  # 임시저장. 이유는 create_date가 비어있어서.
+            question = form.save(
+                commit=False
+            )  # 임시저장. 이유는 create_date가 비어있어서.
             question.author = request.user
             question.create_date = timezone.now()
-            question.save()
+            with transaction.atomic():  # 저장할 때까지 hot 기준 시각을 잠근다
+                question.hot_score = ranking.initial_score(question.create_date)
+                question.save(render=False)
+            tasks.enqueue(
+                tasks.render_post, "question", question.id, key=render_key(question)
+            )
             return redirect("pybo:index")
     else:
         form = QuestionForm()
@@ -45,7 +63,10 @@ def question_modify(request, question_id):
             question = form.save(commit=False)
             question.author = request.user
             question.modify_date = timezone.now()  # 수정일시 저장
-            question.save()
+            question.save(render=False)
+            tasks.enqueue(
+                tasks.render_post, "question", question.id, key=render_key(question)
+            )
             return redirect("pybo:detail", question_id=question.id)
 
     else:
@@ -56,7 +77,6 @@ def question_modify(request, question_id):
 
 @login_required(login_url="common:login")
 def question_delete(request, question_id):
-
     """
     질문 삭제
     """
@@ -0,0 +1,19 @@
+from django.contrib.auth.decorators import user_passes_test
+from django.http import StreamingHttpResponse
+
+from .. import transfer
+
+
+@user_passes_test(lambda user: user.is_staff, login_url="common:login")
+def export(request):
+    """
+    pybo 데이터 내보내기 (staff 전용)
+    JSONL을 만드는 대로 보낸다. 비밀번호 해시는 superuser에게만 포함한다.
+    DB를 동기로 읽으므로 WSGI로 실행할 때만 쓴다. (ASGI에서는 export_pybo 명령 사용)
+    """
+    lines = transfer.export_lines(passwords=request.user.is_superuser)
+    response = StreamingHttpResponse(
+        lines, content_type="application/x-ndjson; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'attachment; filename="pybo.jsonl"'
+    return response
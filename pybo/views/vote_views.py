@@ -1,30 +1,112 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
+from django.views.decorators.http import require_POST
+
+from common.ratelimit import ratelimit
+
+from .. import ranking, votes
 from ..models import Question, Answer
 
 
 @login_required(login_url="common:login")
+@ratelimit("vote", methods=("GET", "POST"))
 def vote_question(request, question_id):
     """
     pybo 질문추천등록
     """
-    question = get_object_or_404(Question, pk=question_id)
+    if settings.PYBO_VOTE_BUFFER:
+        return vote_question_buffered(request, question_id)
+    question = get_object_or_404(Question.objects.filter(hidden=False), pk=question_id)
     if request.user == question.author:
         messages.error(request, "本人が作成した質問にはいいねはできません")
     else:
-        question.voter.add(request.user)
+        with transaction.atomic():
+            if not question.voter.filter(pk=request.user.pk).exists():
+                question.voter.add(request.user)
+                Question.objects.filter(pk=question.id).update(
+                    vote_count=F("vote_count") + 1
+                )
+                ranking.add(question.id, settings.PYBO_HOT_VOTE_WEIGHT)
     return redirect("pybo:detail", question_id=question.id)
 
 
+def vote_question_buffered(request, question_id):
+    """
+    추천을 버퍼(PendingVote)에 넣기만 하고 응답한다. 반영은 flush_pending_votes (votes.py)
+    """
+    author_id = (
+        Question.objects.filter(pk=question_id, hidden=False)
+        .values_list("author_id", flat=True)
+        .first()
+    )
+    if author_id is None:
+        raise Http404
+    if author_id == request.user.pk:
+        messages.error(request, "本人が作成した質問にはいいねはできません")
+    else:
+        votes.record(question_id, request.user)
+    return redirect("pybo:detail", question_id=question_id)
+
+
 @login_required(login_url="common:login")
+@ratelimit("vote", methods=("GET", "POST"))
 def vote_answer(request, answer_id):
     """
     pybo 답변추천등록
     """
-    answer = get_object_or_404(Answer, pk=answer_id)
+    answer = get_object_or_404(
+        Answer.objects.filter(hidden=False, question__hidden=False), pk=answer_id
+    )
     if request.user == answer.author:
         messages.error(request, "本人が作成した回答にはいいねはできません")
     else:
-        answer.voter.add(request.user)
-    return redirect("pybo:detail", question_id=answer.question.id)
\ No newline at end of file
+        with transaction.atomic():
+            if not answer.voter.filter(pk=request.user.pk).exists():
+                answer.voter.add(request.user)
+                Answer.objects.filter(pk=answer.id).update(
+                    vote_count=F("vote_count") + 1
+                )
+    return redirect("pybo:detail", question_id=answer.question.id)
+
+
+def _toggle(request, kind, object_id, own_message):
+    """
+    추천/추천 취소 (JSON). 화면을 다시 그리지 않고 추천수와 추천 여부만 돌려준다.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "ログインしてください"}, status=401)
+    post_model = votes.VOTE_TARGETS[kind][0]
+    try:
+        count, voted = votes.toggle(kind, object_id, request.user)
+    except post_model.DoesNotExist:
+        return JsonResponse({"error": "見つかりません"}, status=404)
+    except votes.VoteError:
+        return JsonResponse({"error": own_message}, status=403)
+    return JsonResponse({"vote_count": count, "voted": voted})
+
+
+@require_POST
+@ratelimit("vote")
+def toggle_vote_question(request, question_id):
+    """
+    pybo 질문추천 토글
+    """
+    return _toggle(
+        request, "question", question_id, "本人が作成した質問にはいいねはできません"
+    )
+
+
+@require_POST
+@ratelimit("vote")
+def toggle_vote_answer(request, answer_id):
+    """
+    pybo 답변추천 토글
+    """
+    return _toggle(
+        request, "answer", answer_id, "本人が作成した回答にはいいねはできません"
+    )
@@ -0,0 +1,228 @@
+"""
+pybo 추천
+
+toggle(): 추천/추천 취소 (vote_views.toggle_vote_*). PostgreSQL에서는 글쓴이 확인,
+추천 추가/삭제, vote_count 갱신을 SQL 한 문장으로 한다. 버퍼를 켜면 질문 추천은 버퍼로 간다.
+
+질문 추천 버퍼 (PYBO_VOTE_BUFFER)
+질문이 몰려서 추천될 때 요청마다 voter 테이블과 같은 Question 행(vote_count)을 갱신하면
+서로 잠금을 기다린다. 버퍼를 켜면 vote_question은 PendingVote에 한 줄 추가만 하고 바로
+응답하고, flush_pending_votes가 주기적으로 중복을 걸러 추천을 한꺼번에 넣고
+질문별 증가분을 트랜잭션 하나로 반영한다.
+반영되기 전에도 추천한 사용자에게는 상세화면의 추천수에 자기 추천이 더해져 보인다.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F
+from django.utils import timezone
+
+from . import caching, ranking
+from .models import Answer, AnswerVote, PendingVote, Question, QuestionVote
+
+# 종류 -> (글 모델, 추천 모델, 추천 모델의 글 FK 컬럼)
+VOTE_TARGETS = {
+    "question": (Question, QuestionVote, "question_id"),
+    "answer": (Answer, AnswerVote, "answer_id"),
+}
+
+# 숨기지 않은 글에서 글쓴이가 아닌 사용자의 추천을 지우고, 지운 것이 없으면 추가한 뒤
+# vote_count를 맞춘다.
+# 두 요청이 동시에 추가하면 ON CONFLICT로 하나만 들어가고 vote_count도 한 번만 오른다.
+TOGGLE_SQL = """
+WITH target AS (
+    SELECT id FROM {post} WHERE id = %(id)s AND author_id <> %(user)s AND NOT hidden
+), removed AS (
+    DELETE FROM {vote} USING target
+    WHERE {vote}.{fk} = target.id AND {vote}.user_id = %(user)s
+    RETURNING {vote}.create_date
+), added AS (
+    INSERT INTO {vote} ({fk}, user_id, create_date)
+    SELECT id, %(user)s, %(now)s FROM target
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT ({fk}, user_id) DO NOTHING
+    RETURNING create_date
+), updated AS (
+    UPDATE {post}
+    SET vote_count = vote_count
+        + (SELECT count(*) FROM added) - (SELECT count(*) FROM removed)
+    WHERE id IN (SELECT id FROM target)
+    RETURNING vote_count
+)
+SELECT
+    (SELECT vote_count FROM updated),
+    EXISTS (SELECT 1 FROM added),
+    (SELECT create_date FROM removed)
+"""
+
+
+class VoteError(Exception):
+    pass
+
+
+def toggle(kind, object_id, user):
+    """
+    추천했으면 취소하고 아니면 추천한다. (추천수, 추천 여부)를 돌려준다.
+    글이 없으면 Post.DoesNotExist, 자기 글이면 VoteError
+    """
+    post_model, vote_model, fk = VOTE_TARGETS[kind]
+    with transaction.atomic():
+        if kind == "question" and settings.PYBO_VOTE_BUFFER:
+            buffered = _toggle_buffered(object_id, user)
+            if buffered is not None:
+                return buffered
+        if connection.vendor == "postgresql":
+            count, voted, removed_date = _toggle_sql(
+                post_model, vote_model, fk, object_id, user
+            )
+        else:
+            count, voted, removed_date = _toggle_orm(
+                post_model, vote_model, fk, object_id, user
+            )
+        if count is None:
+            # 글이 없거나 글쓴이: 오류를 가릴 때만 한 번 더 읽는다
+            post_model.objects.only("id").get(pk=object_id, hidden=False)
+            raise VoteError(kind)
+        if kind == "question":
+            if settings.PYBO_VOTE_BUFFER:
+                # 이미 반영된 추천과 겹치는 버퍼 항목이 나중에 다시 들어가지 않게
+                PendingVote.objects.filter(question_id=object_id, user=user).delete()
+            if voted:
+                ranking.add(object_id, settings.PYBO_HOT_VOTE_WEIGHT)
+            elif removed_date:
+                ranking.add(object_id, -settings.PYBO_HOT_VOTE_WEIGHT, removed_date)
+    if kind == "question":
+        caching.bump_list_version()
+    return count, voted
+
+
+def _toggle_buffered(question_id, user):
+    """
+    버퍼를 켰을 때의 질문 추천. 추천은 record()로 버퍼에 넣고, 반영 전인 추천은 버퍼에서 지워
+    취소한다. 보이는 추천수는 상세화면처럼 반영 전인 자기 추천을 더한 값이다.
+    이미 반영된 추천의 취소이면 None (toggle()이 바로 지운다)
+    """
+    row = (
+        Question.objects.filter(pk=question_id, hidden=False)
+        .values_list("author_id", "vote_count")
+        .first()
+    )
+    if row is None:
+        raise Question.DoesNotExist
+    author_id, count = row
+    if author_id == user.pk:
+        raise VoteError("question")
+    if pending(user, question_id):
+        PendingVote.objects.filter(question_id=question_id, user=user).delete()
+        return count, False
+    if QuestionVote.objects.filter(question_id=question_id, user=user).exists():
+        return None
+    record(question_id, user)
+    return count + 1, True
+
+
+def _toggle_sql(post_model, vote_model, fk, object_id, user):
+    quote = connection.ops.quote_name
+    sql = TOGGLE_SQL.format(
+        post=quote(post_model._meta.db_table),
+        vote=quote(vote_model._meta.db_table),
+        fk=quote(fk),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {"id": object_id, "user": user.pk, "now": timezone.now()})
+        return cursor.fetchone()
+
+
+def _toggle_orm(post_model, vote_model, fk, object_id, user):
+    # SQLite 등: 쓰기가 DB 단위로 직렬화되므로 같은 트랜잭션 안의 여러 문장으로 한다
+    target = post_model.objects.filter(pk=object_id, hidden=False).exclude(author=user)
+    if not target.exists():
+        return None, False, None
+    votes = vote_model.objects.filter(**{fk: object_id, "user": user})
+    removed_date = votes.values_list("create_date", flat=True).first()
+    if removed_date is not None:
+        votes.delete()
+        delta, voted = -1, False
+    else:
+        vote_model.objects.create(**{fk: object_id, "user": user})
+        delta, voted = 1, True
+    target.update(vote_count=F("vote_count") + delta)
+    count = target.values_list("vote_count", flat=True).get()
+    return count, voted, removed_date
+
+
+def record(question_id, user):
+    PendingVote.objects.create(question_id=question_id, user=user)
+
+
+def pending(user, question_id):
+    """
+    user가 question_id에 추천했지만 아직 반영되지 않았으면 1, 아니면 0
+    """
+    if not settings.PYBO_VOTE_BUFFER or not user.is_authenticated:
+        return 0
+    voted = QuestionVote.objects.filter(question_id=question_id, user=user)
+    return int(
+        PendingVote.objects.filter(question_id=question_id, user=user)
+        .filter(~Exists(voted))
+        .exists()
+    )
+
+
+def flush(batch_size=5000):
+    """
+    쌓인 추천을 batch_size개씩 반영하고 새로 들어간 추천 수를 돌려준다.
+    """
+    total = 0
+    while True:
+        added = _flush_batch(batch_size)
+        if added is None:
+            break
+        total += added
+    if total:
+        caching.bump_list_version()
+    return total
+
+
+def _flush_batch(batch_size):
+    """
+    한 트랜잭션에서 batch_size개를 반영한다. 버퍼가 비어 있으면 None
+    """
+    with transaction.atomic():
+        rows = list(
+            PendingVote.objects.select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", "question_id", "user_id", "create_date")[:batch_size]
+        )
+        if not rows:
+            return None
+
+        # 같은 사용자의 중복 추천은 처음 것만, 이미 반영된 추천은 버린다
+        first = {}
+        for _, question_id, user_id, date in rows:
+            first.setdefault((question_id, user_id), date)
+        existing = set(
+            QuestionVote.objects.filter(
+                question_id__in={question_id for question_id, _ in first},
+                user_id__in={user_id for _, user_id in first},
+            ).values_list("question_id", "user_id")
+        )
+        votes = [
+            QuestionVote(question_id=question_id, user_id=user_id, create_date=date)
+            for (question_id, user_id), date in first.items()
+            if (question_id, user_id) not in existing
+        ]
+        QuestionVote.objects.bulk_create(votes, ignore_conflicts=True)
+
+        dates = defaultdict(list)
+        for vote in votes:
+            dates[vote.question_id].append(vote.create_date)
+        for question_id, question_dates in dates.items():
+            Question.objects.filter(pk=question_id).update(
+                vote_count=F("vote_count") + len(question_dates)
+            )
+            ranking.add_many(question_id, settings.PYBO_HOT_VOTE_WEIGHT, question_dates)
+        PendingVote.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return len(votes)